@@ -1872,11 +1872,8 @@ from flask import Flask, request, render_template, jsonify, session, send_from_d
 from werkzeug.utils import secure_filename
 from flask_cors import CORS 
 import openai
-from difflib import SequenceMatcher
 import re
-import requests
 import os.path
-from gtts import gTTS
 import whisper
 import warnings
 warnings.filterwarnings("ignore", category=SyntaxWarning)
@@ -1911,12 +1908,33 @@ from datetime import datetime
 import logging
 import re
 import gc
+import time
 import threading
-from functools import lru_cache
+import numpy as np
+from urllib.parse import urlencode
 from functools import wraps
 from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from database import db, Participant, Session, Interaction, Recording, UserEvent
+from database import db, Participant, Session, Interaction, Recording, UserEvent, PendingTurnUpdate
+from tts_jobs import TTSJobRegistry, SingleFlight, JobTracker, tts_job_key
+from tts_cache import TTSAudioCache, tts_cache_key
+from tts_engines import build_tts_router
+from tts_pipeline import mp3_frames
+from audio_assets import AudioAssetManifest, INTRO_TEXT, concept_intro_text
+from audio_formats import TTS_FORMATS, negotiate_format, format_for_content_type, transcode
+from local_whisper import build_local_whisper
+from whisper_batch import WhisperBatchWorker
+from transcription_cache import TranscriptionCache, audio_content_hash, decode_pcm, transcription_cache_key
+from audio_ingest import IngestedAudio, IngestMetrics, ingest_upload
+from live_transcription import LiveTranscriber
+from vad import VADStats
+from stt_segments import transcribe_segmented
+from stt_hedge import HedgedTranscriber
+from turn_stream import PendingTurnUpdates, SentenceChunker, sse_event
+from response_cache import ResponseCache
+from concept_index import ConceptEntry, ConceptStore, normalize_text, read_concepts
+from similarity import CHAR_RATIO_MAX_CHARS, EXCELLENT_THRESHOLD, SimilarityStats, timed_score
+from triage import TurnTriage
 import uuid
 
 load_dotenv()
@@ -1950,8 +1968,11 @@ def init_supabase():
         supabase_client = None
         return None
 
-def upload_file_to_supabase(local_path, dest_path=None, content_type=None):
-    """Upload a local file to Supabase storage. Returns dict with keys 'path' and 'public_url' on success, else None."""
+def upload_file_to_supabase(local_path, dest_path=None, content_type=None, data=None):
+    """Upload a local file to Supabase storage. Returns dict with keys 'path' and 'public_url' on success, else None.
+
+    Pass `data` when the file's bytes are already in memory to skip re-reading it.
+    """
     try:
         client = init_supabase()
         if not client:
@@ -1960,8 +1981,9 @@ def upload_file_to_supabase(local_path, dest_path=None, content_type=None):
         bucket = os.environ.get('SUPABASE_BUCKET', SUPABASE_BUCKET)
         dest = dest_path or os.path.basename(local_path)
 
-        with open(local_path, 'rb') as f:
-            data = f.read()
+        if data is None:
+            with open(local_path, 'rb') as f:
+                data = f.read()
 
         try:
             res = client.storage.from_(bucket).upload(dest, data)
@@ -2072,20 +2094,24 @@ def create_session_record(participant_id, trial_type, version):
         return None
 
 
-def save_audio_with_cloud_backup(audio_data, filename, session_id, recording_type, concept_name=None, attempt_number=None):
+def save_audio_with_cloud_backup(audio_data, filename, session_id, recording_type, concept_name=None, attempt_number=None,
+                                 local_path=None):
     """Save audio locally, upload to Supabase (if configured), and record metadata in DB.
 
+    If `local_path` is given the audio is already saved there and is not
+    written again; the in-memory bytes are uploaded as they are.
     Returns tuple (local_path, supabase_result_dict_or_None)
     """
     try:
-        local_path = os.path.join(UPLOAD_FOLDER, filename)
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        if local_path is None:
+            local_path = os.path.join(UPLOAD_FOLDER, filename)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-        if hasattr(audio_data, 'save'):
-            audio_data.save(local_path)
-        else:
-            with open(local_path, 'wb') as f:
-                f.write(audio_data)
+            if hasattr(audio_data, 'save'):
+                audio_data.save(local_path)
+            else:
+                with open(local_path, 'wb') as f:
+                    f.write(audio_data)
 
         file_size = None
         try:
@@ -2096,7 +2122,10 @@ def save_audio_with_cloud_backup(audio_data, filename, session_id, recording_typ
         supabase_result = None
         try:
             dest = os.path.join(str(session_id or ''), filename).replace('\\', '/')
-            supabase_result = upload_file_to_supabase(local_path, dest_path=dest)
+            supabase_result = upload_file_to_supabase(
+                local_path, dest_path=dest,
+                data=audio_data if isinstance(audio_data, (bytes, bytearray)) else None
+            )
         except Exception as e:
             print(f"Supabase upload attempt failed: {e}")
 
@@ -2209,6 +2238,18 @@ with app.app_context():
     db.create_all()
     executor = ThreadPoolExecutor(max_workers=5)
 
+tts_jobs = TTSJobRegistry(
+    ttl_seconds=int(os.environ.get('TTS_JOB_TTL_SECONDS', 600)),
+    max_entries=int(os.environ.get('TTS_JOB_MAX_ENTRIES', 128))
+)
+# Concurrent requests for the same generated audio file wait on one generation.
+audio_file_flight = SingleFlight()
+ai_audio_jobs = JobTracker(ttl_seconds=int(os.environ.get('AI_AUDIO_JOB_TTL_SECONDS', 3600)))
+# Sentence segments of long gTTS replies are synthesized here, not on `executor`.
+tts_segment_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('TTS_SEGMENT_WORKERS', 4)))
+# Backends from TTS_ENGINE_ORDER, tried in the order chosen by TTS_ENGINE_SELECTION.
+tts_router = build_tts_router(tts_segment_pool)
+
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 UPLOAD_FOLDER = os.path.normpath(os.path.join(BASE_DIR, 'uploads'))
 CONCEPT_AUDIO_FOLDER = os.path.normpath(os.path.join(UPLOAD_FOLDER, 'concept_audio'))
@@ -2225,6 +2266,43 @@ os.makedirs(CONCEPT_AUDIO_FOLDER, exist_ok=True)
 os.makedirs(INTRO_AUDIO_FOLDER, exist_ok=True)
 os.makedirs(USER_DATA_BASE_FOLDER, exist_ok=True)
 os.makedirs(STATIC_FOLDER, exist_ok=True)
+
+TTS_CACHE_FOLDER = os.environ.get('TTS_CACHE_DIR') or os.path.normpath(os.path.join(UPLOAD_FOLDER, 'tts_cache'))
+tts_cache = TTSAudioCache(
+    TTS_CACHE_FOLDER,
+    max_disk_bytes=int(os.environ.get('TTS_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+    max_memory_bytes=int(os.environ.get('TTS_CACHE_MEMORY_BYTES', 32 * 1024 * 1024)),
+    rescan_seconds=float(os.environ.get('TTS_CACHE_RESCAN_SECONDS', 10))
+)
+audio_manifest = AudioAssetManifest(os.path.join(UPLOAD_FOLDER, 'audio_manifest.json'), UPLOAD_FOLDER)
+ingest_metrics = IngestMetrics()
+
+# Session changes of streamed turns whose reply finished after the cookie was sent (stored in the DB).
+pending_turn_updates = PendingTurnUpdates(db, PendingTurnUpdate)
+# Energy-based trimming of leading/trailing silence (and, with VAD_MAX_PAUSE_MS, long pauses) before STT.
+VAD_ENABLED = os.environ.get('VAD_ENABLED', '1') == '1'
+VAD_OPTIONS = {
+    'pad_ms': int(os.environ.get('VAD_PAD_MS', 250)),
+    'max_pause_ms': int(os.environ.get('VAD_MAX_PAUSE_MS', 0)),
+    'margin_db': float(os.environ.get('VAD_MARGIN_DB', 12)),
+}
+vad_stats = VADStats()
+transcription_cache = TranscriptionCache(
+    os.environ.get('TRANSCRIPTION_CACHE_PATH') or os.path.join(UPLOAD_FOLDER, 'transcription_cache.sqlite3'),
+    max_entries=int(os.environ.get('TRANSCRIPTION_CACHE_MAX_ENTRIES', 5000)),
+    ttl_seconds=int(os.environ.get('TRANSCRIPTION_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+)
+
+# Tutor replies for repeated explanations (same concept, attempt, text and prompt).
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE', '1') == '1'
+response_cache = ResponseCache(
+    os.environ.get('RESPONSE_CACHE_PATH') or os.path.join(UPLOAD_FOLDER, 'response_cache.sqlite3'),
+    max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 2000)),
+    ttl_seconds=int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+    # Near-duplicate matching is opt-in; the threshold is word Jaccard similarity.
+    fuzzy_threshold=float(os.environ.get('RESPONSE_CACHE_FUZZY_THRESHOLD', 0.9))
+    if os.environ.get('RESPONSE_CACHE_FUZZY', '0') == '1' else None
+)
     
 def check_paths():
     """Verify all required paths exist and are writable."""
@@ -2247,18 +2325,33 @@ def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'wav', 'mp3', 'webm'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-whisper_model = None
+# Local Whisper fallback: WHISPER_MODEL_SIZE, preloaded and warmed on a background thread when WHISPER_PRELOAD=1.
+local_whisper = build_local_whisper()
 
 def get_whisper_model():
-    global whisper_model
-    if whisper_model is None:
-        try:
-            print("Loading Whisper model...")
-            whisper_model = whisper.load_model("small")
-            print("Whisper model loaded successfully")
-        except Exception as e:
-            print(f"Failed to load Whisper model: {str(e)}")
-    return whisper_model
+    return local_whisper.get()
+
+# Local transcriptions from request threads are queued to one inference thread that
+# decodes up to WHISPER_BATCH_MAX_SIZE clips per pass, waiting at most WHISPER_BATCH_MAX_WAIT_MS.
+# Opt-in: a batched pass skips transcribe()'s fallbacks and the profile's options (see README).
+WHISPER_BATCHING_ENABLED = os.environ.get('WHISPER_BATCHING', '0') == '1'
+WHISPER_BATCH_TIMEOUT_SECONDS = float(os.environ.get('WHISPER_BATCH_TIMEOUT_SECONDS', 300))
+whisper_batcher = WhisperBatchWorker(
+    local_whisper.decode_batch,
+    max_batch_size=int(os.environ.get('WHISPER_BATCH_MAX_SIZE', 8)),
+    max_wait=float(os.environ.get('WHISPER_BATCH_MAX_WAIT_MS', 50)) / 1000
+)
+
+# Incremental local transcription of recordings uploaded chunk by chunk (/recording_chunk).
+# Opt-in: the live transcript comes from the local model and replaces whisper-1 for the turn.
+LIVE_TRANSCRIPTION_ENABLED = os.environ.get('LIVE_TRANSCRIPTION', '0') == '1'
+live_transcriber = LiveTranscriber(
+    transcribe=local_whisper.transcribe,
+    ready=lambda: local_whisper.ready,
+    pool=ThreadPoolExecutor(max_workers=int(os.environ.get('LIVE_TRANSCRIPTION_WORKERS', 1))),
+    window_seconds=float(os.environ.get('LIVE_TRANSCRIPTION_WINDOW_SECONDS', 15)),
+    step_seconds=float(os.environ.get('LIVE_TRANSCRIPTION_STEP_SECONDS', 2))
+)
 
 
 def sanitize_transcript(text):
@@ -2281,55 +2374,182 @@ def sanitize_transcript(text):
 
     return cleaned
 
-@lru_cache(maxsize=32)
-def cached_transcribe(audio_file_path_hash):
-    """Helper function to enable caching of transcription results"""
-    model = get_whisper_model()
-    if model:
-        result = model.transcribe(audio_file_path_hash)
-        return result["text"]
-    return "Transcription failed."
-
-def speech_to_text(audio_file_path):
-    """Convert audio to text using OpenAI Whisper API or local fallback."""
+# Recordings longer than STT_SEGMENT_THRESHOLD_SECONDS (or too big for whisper-1's 25 MB
+# upload limit) are cut at pauses into chunks of at most STT_SEGMENT_MAX_SECONDS,
+# transcribed in parallel and stitched back in order.
+STT_SEGMENT_THRESHOLD_SECONDS = float(os.environ.get('STT_SEGMENT_THRESHOLD_SECONDS', 90))
+STT_SEGMENT_MAX_SECONDS = float(os.environ.get('STT_SEGMENT_MAX_SECONDS', 30))
+OPENAI_STT_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+stt_segment_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('STT_SEGMENT_WORKERS', 4)))
+
+def transcribe_pcm_segment(samples):
+    """Transcribe one chunk of 16kHz int16 samples; returns (text, backend)."""
+    chunk = IngestedAudio(samples.tobytes(), None, 0)
     try:
-        audio_file_path = os.path.normpath(audio_file_path)
-        
-        print(f"Processing audio file: {audio_file_path}")
-        print(f"File exists: {os.path.exists(audio_file_path)}")
-        print(f"File size: {os.path.getsize(audio_file_path) if os.path.exists(audio_file_path) else 'File not found'}")
-        
-        if not os.path.exists(audio_file_path):
-            print(f"Audio file not found at: {audio_file_path}")
-            return "Audio file not found"
-            
-        # Prefer explicit English for transcription to avoid wrong-language outputs
+        transcript = openai.Audio.transcribe_raw(
+            model="whisper-1",
+            file=chunk.wav_bytes,
+            filename="segment.wav",
+            language='en'
+        )
+        return (transcript.get("text") if isinstance(transcript, dict) else ''), 'openai'
+    except Exception as e:
+        print(f"Segment transcription via OpenAI failed, using local model: {e}")
+        return transcribe_with_local(None, chunk), 'local'
+
+def transcribe_long_audio(audio_file_path, audio, content_hash):
+    """Segmented transcription of a long recording; timestamps go to <recording>_segments.json."""
+    start = time.perf_counter()
+    result = transcribe_segmented(
+        np.frombuffer(audio.pcm, dtype=np.int16),
+        transcribe_pcm_segment,
+        stt_segment_pool,
+        max_seconds=STT_SEGMENT_MAX_SECONDS
+    )
+    text = sanitize_transcript(result['text'])
+    print(f"Transcribed {audio.duration_seconds:.0f}s in {len(result['segments'])} segments "
+          f"in {time.perf_counter() - start:.1f}s")
+    try:
+        with open(os.path.splitext(audio_file_path)[0] + '_segments.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'audio': os.path.basename(audio_file_path),
+                'duration_seconds': round(audio.duration_seconds, 2),
+                'segments': result['segments']
+            }, f, indent=2)
+    except Exception as e:
+        print(f"Could not save transcript segments: {e}")
+    if text:
+        transcription_cache.put(transcription_cache_key(content_hash, 'segmented', 'en'), text)
+    return text
+
+# Hedged STT: if whisper-1 hasn't answered within its recent p95 latency
+# (STT_HEDGE_PERCENTILE, clamped to STT_HEDGE_MIN/MAX_SECONDS), the local model
+# starts too and the first transcript wins. Off by default: a local win means a
+# lower-quality transcript and the local run can't be cancelled (see README).
+STT_HEDGE_ENABLED = os.environ.get('STT_HEDGE', '0') == '1'
+stt_hedger = HedgedTranscriber(
+    ThreadPoolExecutor(max_workers=int(os.environ.get('STT_HEDGE_WORKERS', 8))),
+    percentile=float(os.environ.get('STT_HEDGE_PERCENTILE', 95)),
+    default_delay=float(os.environ.get('STT_HEDGE_DEFAULT_SECONDS', 4)),
+    min_delay=float(os.environ.get('STT_HEDGE_MIN_SECONDS', 1)),
+    max_delay=float(os.environ.get('STT_HEDGE_MAX_SECONDS', 15))
+)
+
+def transcribe_with_openai(audio_file_path, audio=None):
+    """Transcribe with the whisper-1 API; returns sanitized text."""
+    # Prefer explicit English for transcription to avoid wrong-language outputs
+    if audio is not None:
+        transcript = openai.Audio.transcribe_raw(
+            model="whisper-1",
+            file=audio.wav_bytes,
+            filename=os.path.basename(audio_file_path),
+            language='en'
+        )
+    else:
         with open(audio_file_path, "rb") as audio_file:
             transcript = openai.Audio.transcribe(
                 model="whisper-1",
                 file=audio_file,
                 language='en'
             )
-            text = transcript.get("text") if isinstance(transcript, dict) else ''
-            return sanitize_transcript(text)
+    text = transcript.get("text") if isinstance(transcript, dict) else ''
+    return sanitize_transcript(text)
+
+def transcribe_with_local(audio_file_path, audio=None):
+    """Transcribe with the local Whisper model; returns sanitized text.
+
+    With WHISPER_BATCHING on, the clip goes through the micro-batching worker
+    and is decoded together with other requests' clips.
+    """
+    if WHISPER_BATCHING_ENABLED and local_whisper.get() is not None:
+        samples = audio.samples() if audio is not None else whisper.load_audio(audio_file_path)
+        return sanitize_transcript(whisper_batcher.transcribe(samples, timeout=WHISPER_BATCH_TIMEOUT_SECONDS))
+
+    source = audio.samples() if audio is not None else audio_file_path
+    try:
+        result = local_whisper.transcribe(source, language='en')
+    except TypeError:
+        result = local_whisper.transcribe(source)
+    if result is None:
+        raise RuntimeError("Whisper model not available")
+
+    if isinstance(result, dict):
+        text = result.get('text', '')
+    else:
+        text = getattr(result, 'text', '') or ''
+    return sanitize_transcript(text)
+
+def speech_to_text(audio_file_path, audio=None):
+    """Convert audio to text using OpenAI Whisper API or local fallback.
+
+    With `audio` (an audio_ingest.IngestedAudio) the in-memory PCM/WAV is
+    used and the file at `audio_file_path` is never read back.
+    """
+    content_hash = None
+    try:
+        audio_file_path = os.path.normpath(audio_file_path)
+
+        if audio is not None:
+            print(f"Processing ingested audio for {audio_file_path} ({audio.duration_seconds:.1f}s)")
+            content_hash = audio.content_hash
+        else:
+            print(f"Processing audio file: {audio_file_path}")
+            print(f"File exists: {os.path.exists(audio_file_path)}")
+            print(f"File size: {os.path.getsize(audio_file_path) if os.path.exists(audio_file_path) else 'File not found'}")
+
+            if not os.path.exists(audio_file_path):
+                print(f"Audio file not found at: {audio_file_path}")
+                return "Audio file not found"
+
+            content_hash = audio_content_hash(audio_file_path)
+
+        # Same audio (retries, double clicks, offline replays) is only transcribed once.
+        cached = transcription_cache.get_any([
+            transcription_cache_key(content_hash, 'openai', 'en'),
+            transcription_cache_key(content_hash, 'local', 'en'),
+            transcription_cache_key(content_hash, 'segmented', 'en')
+        ])
+        if cached is not None:
+            print("Transcription cache hit")
+            return cached
+
+        if audio is None and os.path.getsize(audio_file_path) > OPENAI_STT_MAX_UPLOAD_BYTES:
+            try:
+                audio = IngestedAudio(decode_pcm(audio_file_path), content_hash, 0)
+            except Exception as e:
+                print(f"Could not decode large recording for segmentation: {e}")
+        if audio is not None and (audio.duration_seconds > STT_SEGMENT_THRESHOLD_SECONDS
+                                  or len(audio.wav_bytes) > OPENAI_STT_MAX_UPLOAD_BYTES):
+            return transcribe_long_audio(audio_file_path, audio, content_hash)
+            
+        if STT_HEDGE_ENABLED:
+            # The local model joins in if the API is slower than its usual p95.
+            text, backend = stt_hedger.run(
+                lambda: transcribe_with_openai(audio_file_path, audio),
+                lambda: transcribe_with_local(audio_file_path, audio),
+                secondary_ready=lambda: local_whisper.ready
+            )
+        else:
+            text, backend = transcribe_with_openai(audio_file_path, audio), 'openai'
+        if backend != 'openai':
+            print("Local Whisper model answered first (hedged request)")
+        if text:
+            transcription_cache.put(transcription_cache_key(content_hash, backend, 'en'), text)
+        return text
     except Exception as e:
         print(f"Error using OpenAI Whisper API: {str(e)}")
+        if getattr(e, 'secondary_tried', False):
+            print("Local Whisper model also failed for this request")
+            return "Audio processing failed"
         print("Falling back to local Whisper model...")
         
         try:
             model = get_whisper_model()
             if model:
-                try:
-                    result = model.transcribe(audio_file_path, language='en')
-                except TypeError:
-                    result = model.transcribe(audio_file_path)
-
-                if isinstance(result, dict):
-                    text = result.get('text', '')
-                else:
-                    text = getattr(result, 'text', '') or ''
-
-                return sanitize_transcript(text)
+                text = transcribe_with_local(audio_file_path, audio)
+                if text and content_hash:
+                    transcription_cache.put(transcription_cache_key(content_hash, 'local', 'en'), text)
+                return text
             else:
                 return "Whisper model not available"
         except Exception as e2:
@@ -2378,20 +2598,6 @@ def get_general_audio_filename(prefix, concept_name=None, extension='.mp3'):
     return f"{name_part}{extension}"
 
 
-def synthesize_with_openai(text, voice='alloy', fmt='mp3'):
-    api_key = os.environ.get('OPENAI_API_KEY')
-    if not api_key:
-        raise RuntimeError('OpenAI API key not configured')
-    url = 'https://api.openai.com/v1/audio/speech'
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-    payload = {'model': 'gpt-4o-mini-tts', 'voice': voice, 'input': text}
-    resp = requests.post(url, headers=headers, json=payload, stream=True, timeout=60)
-    resp.raise_for_status()
-    audio_bytes = resp.content
-    content_type = 'audio/mpeg' if fmt.lower() in ('mp3','mpeg') else 'audio/webm'
-    return audio_bytes, content_type
-
-
 def ssml_wrap(text, rate='0%', pitch='0%', break_ms=250):
     """Wrap text in a small SSML template to improve TTS prosody.
     This escapes XML special chars and inserts small breaks after punctuation.
@@ -2436,32 +2642,44 @@ def clean_for_tts(text):
         return text
 
 
-@app.route('/synthesize', methods=['POST'])
+@app.route('/synthesize', methods=['GET', 'POST'])
 def synthesize():
+    """Stream synthesized speech for the given text as it is produced.
+
+    Accepts JSON/form bodies (POST) or query arguments (GET, so an <audio>
+    element can play the stream progressively). The page POSTs text too long
+    for gunicorn's 4094-byte request line.
+    """
     try:
-        data = request.get_json() or request.form
+        data = request.get_json(silent=True) or request.form or request.args
         text = data.get('text') if data else None
         if not text:
             return jsonify({'error': 'No text provided'}), 400
         voice = data.get('voice', 'alloy')
-        fmt = data.get('format', 'mp3')
         try:
-            ssml_text = ssml_wrap(text, rate='5%', pitch='0%', break_ms=220)
-            audio_bytes, content_type = synthesize_with_openai(ssml_text, voice=voice, fmt=fmt)
-            return (audio_bytes, 200, {'Content-Type': content_type, 'Content-Disposition': 'inline; filename="tts.' + fmt + '"'})
-        except Exception as openai_err:
-            print('OpenAI TTS failed or rejected SSML, falling back to gTTS:', str(openai_err))
+            fmt = negotiate_format(data.get('format'), request.headers.get('Accept'))
+        except ValueError as e:
+            return jsonify({'error': str(e), 'supported_formats': sorted(TTS_FORMATS)}), 400
         try:
-            from io import BytesIO
-            bio = BytesIO()
-            cleaned_for_tts = clean_for_tts(ssml_text) or clean_for_tts(text)
-            tts = gTTS(text=cleaned_for_tts, lang='en')
-            tts.write_to_fp(bio)
-            bio.seek(0)
-            return (bio.read(), 200, {'Content-Type': 'audio/mpeg', 'Content-Disposition': 'inline; filename="tts.mp3"'})
+            # Attaches to the job submit_message already started for this reply, if any.
+            job, _ = start_tts_job(text, voice=voice, fmt=fmt, background=True)
+            job.stream.wait_for_data(timeout=TTS_JOB_WAIT_SECONDS)
         except Exception as e:
-            print('gTTS fallback failed:', str(e))
+            print('TTS synthesis failed:', str(e))
             return jsonify({'error': 'TTS synthesis failed'}), 500
+
+        content_type = job.stream.content_type or TTS_FORMATS[fmt]['content_type']
+        ext = TTS_FORMATS[format_for_content_type(content_type)]['ext']
+
+        def generate():
+            try:
+                for chunk in job.stream.iter_chunks(timeout=TTS_JOB_WAIT_SECONDS):
+                    yield chunk
+            except Exception as e:
+                print('TTS stream aborted:', str(e))
+
+        return Response(generate(), content_type=content_type,
+                        headers={'Content-Disposition': 'inline; filename="tts.' + ext + '"'})
     except Exception as e:
         print('Synthesize endpoint error:', str(e))
         return jsonify({'error': str(e)}), 500
@@ -2534,6 +2752,8 @@ def change_concept():
     slide_number = data.get('slide_number', 'unknown')
     concept_name = data.get('concept_name', 'unknown')
 
+    # A streamed turn's move-on state must not land after this reset.
+    apply_pending_turn_updates()
     if 'concept_attempts' not in session:
         session['concept_attempts'] = {}
     session['concept_attempts'][concept_name] = 0
@@ -2548,69 +2768,222 @@ def change_concept():
 
     return jsonify({'status': 'success', 'message': 'Navigation and concept change logged'})
     
-def generate_audio_async(text, file_path):
-    """Generate audio asynchronously"""
-    return executor.submit(generate_audio, text, file_path)
+TTS_JOB_WAIT_SECONDS = int(os.environ.get('TTS_JOB_WAIT_SECONDS', 120))
 
-def generate_audio(text, file_path):
-    """Generate speech (audio) from the provided text.
+TTS_ENGINES = tuple(tts_router.names)
 
-    Prefer OpenAI TTS (synthesize_with_openai) and save the returned bytes to disk.
-    If OpenAI TTS is unavailable or fails, fall back to the existing gTTS + pydub logic.
-    Returns True on success, False on failure.
+def write_to_stream(stream, audio_bytes, content_type):
+    if stream is not None:
+        stream.content_type = content_type
+        stream.write(audio_bytes)
+    return audio_bytes, content_type
+
+def synthesize_speech(text, voice='alloy', fmt='mp3', stream=None):
+    """Synthesize `text` in format `fmt` (a TTS_FORMATS key) and return (audio_bytes, content_type).
+
+    Served from the TTS audio cache when a preferred engine (see
+    TTSEngineRouter.preferred) has rendered this text before. Otherwise the
+    configured TTS backends (OpenAI, gTTS, local espeak-ng) are tried in the
+    order tts_router picks from their recent latency and failures; each
+    transcodes formats it cannot emit natively. Fallback renders are returned
+    but not cached, so they are replaced once the preferred engine recovers.
+    Raises if no engine produced audio.
+    When `stream` is given, audio is written to it as it arrives, and
+    stream.engine names the engine that produced it.
     """
-    try:
+    preferred = tts_router.preferred()
+    keys = {tts_cache_key(text, voice, fmt, engine): engine for engine in preferred}
+    key, cached = tts_cache.lookup(list(keys))
+    if cached:
+        if stream is not None:
+            stream.engine = keys[key]
+        return write_to_stream(stream, *cached)
+
+    tts_text = clean_for_tts(text)
+    errors = []
+    for backend in tts_router.ordered():
+        started = time.time()
         try:
-            audio_bytes, content_type = synthesize_with_openai(text, voice='alloy', fmt='mp3')
-            if audio_bytes:
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                with open(file_path, 'wb') as f:
-                    f.write(audio_bytes)
-                print(f"Audio file (OpenAI TTS) saved: {file_path} (content_type={content_type})")
-                return True
-        except Exception as openai_err:
-            print(f"OpenAI TTS not available or failed: {openai_err}. Falling back to gTTS.")
-
-        sanitized_text = clean_for_tts(text)
-        if len(sanitized_text) > 500:
-            chunks = [sanitized_text[i:i+500] for i in range(0, len(sanitized_text), 500)]
-            temp_files = []
-
-            for i, chunk in enumerate(chunks):
-                temp_file = f"{file_path}.part{i}.mp3"
-                tts = gTTS(text=chunk, lang='en')
-                tts.save(temp_file)
-                temp_files.append(temp_file)
-
-            combined = AudioSegment.empty()
-            for temp in temp_files:
-                segment = AudioSegment.from_mp3(temp)
-                combined += segment
-
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            combined.export(file_path, format="mp3")
-
-            for temp in temp_files:
-                try:
-                    os.remove(temp)
-                except:
-                    pass
+            audio_bytes, content_type = backend.synthesize(tts_text, voice=voice, fmt=fmt, stream=stream)
+            if not audio_bytes:
+                raise RuntimeError('no audio returned')
+        except Exception as e:
+            tts_router.record(backend.name, time.time() - started, ok=False)
+            if stream is not None and stream.bytes_written:
+                # Listeners already have part of this engine's audio; splicing another engine onto it would garble playback.
+                raise
+            print(f"{backend.name} TTS not available or failed: {e}. Trying next engine.")
+            errors.append(f"{backend.name}: {e}")
+            continue
+        tts_router.record(backend.name, time.time() - started, ok=True)
+        if stream is not None:
+            stream.engine = backend.name
+        if backend.name in preferred:
+            tts_cache.put(tts_cache_key(text, voice, fmt, backend.name), audio_bytes, content_type)
         else:
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            tts = gTTS(text=text, lang='en')
-            tts.save(file_path)
+            print(f"Serving {backend.name} fallback audio without caching it")
+        return audio_bytes, content_type
 
-        if os.path.exists(file_path):
-            print(f"Audio file successfully saved (gTTS fallback): {file_path}")
-            return True
-        else:
-            print(f"Failed to save audio file: {file_path}")
-            return False
+    raise RuntimeError('All TTS engines failed: ' + '; '.join(errors or ['none available']))
+
+def start_tts_job(text, voice='alloy', fmt='mp3', background=False):
+    """Start (or attach to) the shared synthesis job for this text/voice/format.
+
+    Returns (future, started). The future resolves to (audio_bytes, content_type).
+    """
+    key = tts_job_key(text, voice, fmt)
+    return tts_jobs.start(key, synthesize_speech, text, voice, fmt,
+                          executor=executor if background else None)
+
+def save_tts_result(job, file_path):
+    """Write the bytes of a finished TTS job to `file_path`. Returns True on success.
+
+    The audio is transcoded if the job's format differs from the file
+    extension, and goes to a temporary file that is renamed into place, so
+    readers never see a half-written MP3.
+    """
+    try:
+        audio_bytes, content_type = job.result()
+        src_fmt = format_for_content_type(content_type)
+        file_fmt = file_path.rsplit('.', 1)[-1].lower()
+        if file_fmt in TTS_FORMATS and file_fmt != src_fmt:
+            audio_bytes = transcode(audio_bytes, src_fmt, file_fmt)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(audio_bytes)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        print(f"Audio file saved: {file_path} (content_type={content_type})")
+        return True
     except Exception as e:
         print(f"Error generating audio: {str(e)}")
         return False
 
+def write_audio_file(text, file_path):
+    """Synthesize `text` into `file_path` (no coalescing; see generate_audio).
 
+    Returns the name of the engine that rendered it (True if unknown), or False.
+    """
+    try:
+        job, _ = start_tts_job(text)
+    except Exception as e:
+        print(f"Error generating audio: {str(e)}")
+        return False
+    if not save_tts_result(job, file_path):
+        return False
+    return job.stream.engine or True
+
+def generate_audio_async(text, file_path, fmt='mp3'):
+    """Generate audio asynchronously.
+
+    `fmt` is the format the synthesis job runs in (the one the browser will
+    request from /synthesize); the file is written in its own extension's format.
+    """
+    flight, leader = audio_file_flight.begin(file_path)
+    if leader:
+        try:
+            job, _ = start_tts_job(text, fmt=fmt, background=True)
+            job.add_done_callback(lambda f: audio_file_flight.complete(file_path, flight, save_tts_result, f, file_path))
+        except Exception as e:
+            audio_file_flight.complete(file_path, flight, lambda: False)
+            print(f"Error generating audio: {str(e)}")
+    return flight
+
+def join_segment_audio(segments, fmt='mp3'):
+    """One MP3 of a streamed reply from its (sentence, job) segments, without synthesizing the reply again.
+
+    Segments are transcoded to MP3 when they came out in another format and
+    their MPEG frames concatenated (tts_pipeline.mp3_frames). A sentence whose
+    job failed is synthesized on its own.
+    """
+    parts = []
+    for sentence, job in segments:
+        try:
+            if job is None:
+                raise RuntimeError('its synthesis never started')
+            audio_bytes, content_type = job.result(timeout=TTS_JOB_WAIT_SECONDS)
+        except Exception as e:
+            print(f"Reply segment missing from the archived reply, synthesizing it again: {e}")
+            job, _ = start_tts_job(sentence, fmt=fmt)
+            audio_bytes, content_type = job.result()
+        src_fmt = format_for_content_type(content_type)
+        if src_fmt != 'mp3':
+            audio_bytes = transcode(audio_bytes, src_fmt, 'mp3')
+        parts.append(mp3_frames(audio_bytes))
+    return b''.join(parts), 'audio/mpeg'
+
+def generate_audio_from_segments(segments, file_path, fmt='mp3'):
+    """generate_audio_async for a streamed reply: the file is joined from its sentence audio."""
+    flight, leader = audio_file_flight.begin(file_path)
+    if leader:
+        try:
+            joined = executor.submit(join_segment_audio, segments, fmt)
+            joined.add_done_callback(lambda f: audio_file_flight.complete(file_path, flight, save_tts_result, f, file_path))
+        except Exception as e:
+            audio_file_flight.complete(file_path, flight, lambda: False)
+            print(f"Error generating audio: {str(e)}")
+    return flight
+
+def generate_audio(text, file_path):
+    """Generate speech (audio) from the provided text and save it to `file_path`.
+
+    Concurrent calls for the same path wait on one generation, and the
+    synthesis itself goes through the shared TTS job registry.
+    Returns True on success, False on failure.
+    """
+    return audio_file_flight.do(file_path, write_audio_file, text, file_path)
+
+
+@app.route('/performance_stats')
+def performance_stats():
+    """Return TTS/STT performance counters for diagnostics."""
+    try:
+        return jsonify({
+            'status': 'ok',
+            'tts_jobs': tts_jobs.stats(),
+            'tts_cache': tts_cache.stats(),
+            'tts_engines': tts_router.stats(),
+            'audio_file_flight': audio_file_flight.stats(),
+            'ai_audio_jobs': ai_audio_jobs.stats(),
+            'audio_manifest': audio_manifest.snapshot(),
+            'local_whisper': local_whisper.status(),
+            'transcription_cache': transcription_cache.stats(),
+            'response_cache': response_cache.stats(),
+            'concept_index': concept_store.stats(),
+            'similarity': similarity_stats.stats(),
+            'triage': turn_triage.stats(),
+            'audio_ingest': ingest_metrics.stats(),
+            'live_transcription': live_transcriber.stats(),
+            'vad': vad_stats.stats(),
+            'stt_hedge': stt_hedger.stats(),
+            'whisper_batching': whisper_batcher.stats(),
+            'streamed_turns': pending_turn_updates.stats()
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/ready')
+def ready():
+    """Readiness probe: 503 while the local Whisper fallback is still loading and warming.
+
+    Once loading has finished the worker is ready either way. The local model
+    is only a fallback for whisper-1, so a failed load reports status
+    'degraded' instead of taking the service down. With WHISPER_PRELOAD=0
+    the model is loaded lazily and the worker is reported ready straight away.
+    """
+    status = local_whisper.status()
+    preload = os.environ.get('WHISPER_PRELOAD', '1') == '1'
+    failed = status['state'] == 'failed'
+    is_ready = status['ready'] or failed or not preload
+    return jsonify({
+        'ready': is_ready,
+        'status': 'degraded' if failed else ('ok' if is_ready else 'starting'),
+        'local_whisper': status,
+    }), (200 if is_ready else 503)
 
 @app.route('/list_recent_recordings')
 def list_recent_recordings():
@@ -2659,51 +3032,78 @@ def download_resource(filename):
     return send_from_directory('resources', filename)
 
 
-@lru_cache(maxsize=1)
-def load_concepts():
-    """Load concepts from a JSON file with caching."""
-    try:
-        with open("concepts.json", "r") as file:
-            concepts = json.load(file)["concepts"]
-            print(f"Loaded {len(concepts)} concepts successfully")
-            return concepts
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Concepts file not found or invalid: {str(e)}. Creating default concepts...")
-        concepts = [
-            {
-                "name": "Correlation",
-                "golden_answer": "Correlation describes the strength and direction of a relationship between two variables, ranging from -1 to 1. A value close to 1 indicates a strong positive relationship, while a value close to -1 indicates a strong negative one. Importantly, correlation does not imply causation. It only shows that two variables change together. A third variable may influence both, which is why identifying extraneous variables is essential."
-            },
-            {
-                "name": "Confounders",
-                "golden_answer": "A confounder is a variable that is related to both the independent and dependent variables and can create a false impression of a relationship between them. It can make it seem like X causes Y, when in reality the confounder might be responsible for the effect. For example, physical activity may influence both the likelihood of following a diet and the amount of weight lost."
-            },
-            {
-                "name": "Moderators",
-                "golden_answer": "A moderator affects the strength or direction of the relationship between an independent and a dependent variable. It helps researchers understand under what conditions or for whom an effect occurs. For instance, stress may change how effective a diet is in producing weight loss by altering eating habits or metabolism. Identifying moderators can provide more nuanced insights into how variables interact."
-            }
-        ]
-        
+CONCEPTS_PATH = "concepts.json"
+
+DEFAULT_CONCEPTS = [
+    {
+        "name": "Correlation",
+        "golden_answer": "Correlation describes the strength and direction of a relationship between two variables, ranging from -1 to 1. A value close to 1 indicates a strong positive relationship, while a value close to -1 indicates a strong negative one. Importantly, correlation does not imply causation. It only shows that two variables change together. A third variable may influence both, which is why identifying extraneous variables is essential."
+    },
+    {
+        "name": "Confounders",
+        "golden_answer": "A confounder is a variable that is related to both the independent and dependent variables and can create a false impression of a relationship between them. It can make it seem like X causes Y, when in reality the confounder might be responsible for the effect. For example, physical activity may influence both the likelihood of following a diet and the amount of weight lost."
+    },
+    {
+        "name": "Moderators",
+        "golden_answer": "A moderator affects the strength or direction of the relationship between an independent and a dependent variable. It helps researchers understand under what conditions or for whom an effect occurs. For instance, stress may change how effective a diet is in producing weight loss by altering eating habits or metabolism. Identifying moderators can provide more nuanced insights into how variables interact."
+    }
+]
+
+def read_concepts_file():
+    """Load concepts from the JSON file; raises if it is missing or invalid (see default_concepts)."""
+    concepts = read_concepts(CONCEPTS_PATH)
+    print(f"Loaded {len(concepts)} concepts successfully")
+    return concepts
+
+def default_concepts(error):
+    """Concepts to start with when concepts.json can't be read on the first load.
+
+    The defaults are written to disk only when the file doesn't exist; an
+    existing file that fails to parse is left alone so it can be fixed.
+    """
+    concepts = [dict(concept) for concept in DEFAULT_CONCEPTS]
+    if not os.path.exists(CONCEPTS_PATH):
+        print(f"Concepts file not found: {str(error)}. Creating default concepts...")
         try:
-            with open("concepts.json", "w") as file:
+            with open(CONCEPTS_PATH, "x") as file:
                 json.dump({"concepts": concepts}, file, indent=4)
             print("Default concepts created and saved successfully")
+        except FileExistsError:
+            print("Concepts file appeared meanwhile, not overwriting it")
         except Exception as write_err:
             print(f"Error saving default concepts: {str(write_err)}")
-        
-        return concepts
+    else:
+        print(f"Concepts file invalid: {str(error)}. Using default concepts until it is fixed")
+    return concepts
+
+# Rebuilt when concepts.json changes on disk; shared by every endpoint.
+concept_store = ConceptStore(CONCEPTS_PATH, read_concepts_file, fallback=default_concepts)
+
+SIMILARITY_CHAR_CAP = int(os.environ.get('SIMILARITY_CHAR_CAP', CHAR_RATIO_MAX_CHARS))
+similarity_stats = SimilarityStats()
+
+# Empty/failed and off-topic turns get a templated reply instead of an LLM call.
+TRIAGE_ENABLED = os.environ.get('TRIAGE', '1') == '1'
+turn_triage = TurnTriage()
+
+def concept_index():
+    """The current ConceptIndex (see concept_index.py)."""
+    return concept_store.index()
+
+def load_concepts():
+    """The concept list from concepts.json (reloaded when the file changes)."""
+    return concept_index().concepts
 
 
 @app.route('/set_context', methods=['POST'])
 def set_context():
     """Set the context for a specific concept from the provided material."""
     concept_name = request.form.get('concept_name')  
-    concepts = load_concepts()
-    
-    selected_concept = next((c for c in concepts if c["name"] == concept_name), None)
+    concept = concept_index().get(concept_name)
 
-    if not selected_concept:
+    if not concept:
         return jsonify({'error': 'Invalid concept selection'})
+    selected_concept = concept.data
 
     session['concept_name'] = selected_concept["name"]
     session['golden_answer'] = selected_concept["golden_answer"]
@@ -2750,95 +3150,157 @@ def log_interaction_event():
 
     return jsonify({'status': 'success', 'message': 'Event logged successfully'})
 
+def stale_prompt_engines():
+    """Engines whose prompt audio should be rendered again: the fallbacks, unless the preferred engine is failing."""
+    preferred = tts_router.preferred()
+    if not preferred or tts_router.cooling(preferred[-1]):
+        return ()
+    return tuple(name for name in TTS_ENGINES if name not in preferred)
+
+# Asset ids whose fallback render is being replaced on the executor.
+prompt_rerenders = set()
+prompt_rerenders_lock = threading.Lock()
+
+def rerender_prompt_audio(asset_id, text, file_path):
+    """Render a prompt asset again if it is still a fallback render (runs on the executor)."""
+    try:
+        audio_file_flight.do(file_path, audio_manifest.ensure, asset_id, text, file_path, write_audio_file,
+                             stale_engines=stale_prompt_engines())
+    except Exception as e:
+        print(f"Re-rendering {asset_id} failed: {str(e)}")
+    finally:
+        with prompt_rerenders_lock:
+            prompt_rerenders.discard(asset_id)
+
+def ensure_prompt_audio(asset_id, text, file_path, rerender_now=False):
+    """Return the manifest entry for a prompt asset, rendering it only if it is missing or its text changed.
+
+    A fallback render is served as is and replaced on the executor once the
+    preferred engine is usable (in place with `rerender_now`, for prerendering).
+    """
+    stale_engines = stale_prompt_engines()
+    entry = audio_file_flight.do(file_path, audio_manifest.ensure, asset_id, text, file_path, write_audio_file,
+                                 stale_engines=stale_engines if rerender_now else ())
+    if entry and not rerender_now and entry.get('engine') in stale_engines:
+        with prompt_rerenders_lock:
+            queued = asset_id in prompt_rerenders
+            prompt_rerenders.add(asset_id)
+        if not queued:
+            executor.submit(rerender_prompt_audio, asset_id, text, file_path)
+    return entry
+
+def ensure_intro_audio(rerender_now=False):
+    """Return the manifest entry for the intro audio (see ensure_prompt_audio)."""
+    intro_audio_path = os.path.join(app.config['INTRO_AUDIO_FOLDER'], get_general_audio_filename('intro_message'))
+    return ensure_prompt_audio('intro', INTRO_TEXT, intro_audio_path, rerender_now)
+
+def ensure_concept_audio(concept_name, rerender_now=False):
+    """Return the manifest entry for a concept intro (see ensure_prompt_audio)."""
+    concept_audio_filename = get_general_audio_filename('concept_intro', concept_name=secure_filename(concept_name))
+    concept_audio_path = os.path.join(app.config['CONCEPT_AUDIO_FOLDER'], concept_audio_filename)
+    return ensure_prompt_audio(f"concept_intro:{concept_name}", concept_intro_text(concept_name),
+                               concept_audio_path, rerender_now)
+
+def prerender_prompt_audio():
+    """Render the intro and every concept intro from concepts.json that is missing or stale."""
+    results = {'intro': bool(ensure_intro_audio(rerender_now=True))}
+    for concept in load_concepts():
+        results[concept['name']] = bool(ensure_concept_audio(concept['name'], rerender_now=True))
+    print(f"Prompt audio prerendered: {results}")
+    return results
+
+@app.cli.command('prerender-audio')
+def prerender_audio_command():
+    """Render prompt audio ahead of time and update the audio manifest."""
+    results = prerender_prompt_audio()
+    if not all(results.values()):
+        raise SystemExit(1)
+
 @app.route('/get_intro_audio', methods=['GET'])
 def get_intro_audio():
-    """Generate the introductory audio message for the chatbot."""
-    participant_id = session.get('participant_id')
-    interaction_id = session.get('interaction_id')
+    """Return the URL of the prerendered introductory audio message."""
+    entry = ensure_intro_audio()
+    log_interaction("AI", "Introduction", INTRO_TEXT)
 
-    intro_text = "Hello, let us begin the self-explanation journey! We'll be exploring the concept of Extraneous Variables, focusing on Correlation, Confounders, and Moderators. Please go through each concept and explain what you understand about them in your own words!"
-    intro_audio_filename = get_general_audio_filename('intro_message')
-    intro_audio_path = os.path.join(app.config['INTRO_AUDIO_FOLDER'], intro_audio_filename)
-
-    if not os.path.exists(intro_audio_path): 
-        generate_audio(intro_text, intro_audio_path)
-        log_interaction("AI", "Introduction", intro_text)
-    
-    if os.path.exists(intro_audio_path):
-        intro_audio_url = f"/uploads/intro_audio/{intro_audio_filename}"
+    if entry:
+        intro_audio_url = f"/uploads/{entry['file']}?v={entry['text_hash'][:12]}-{entry.get('engine') or ''}"
         return jsonify({'intro_audio_url': intro_audio_url})
     else:
         return jsonify({'error': 'Failed to generate introduction audio'}), 500
 
 @app.route('/get_concept_audio/<concept_name>', methods=['GET'])
 def get_concept_audio(concept_name):
-    """Generate concept introduction audio message."""
+    """Serve the prerendered concept introduction audio message."""
+    concept = concept_index().get(concept_name)
+    if concept is None:
+        # Only concepts.json entries are rendered; arbitrary names would spend TTS and grow the manifest.
+        return jsonify({'error': f"Unknown concept: {concept_name}"}), 404
+    concept_name = concept.name
     try:
-        interaction_id = session.get('interaction_id', get_interaction_id())
-        safe_concept = secure_filename(concept_name)
-        
-        concept_audio_filename = get_general_audio_filename('concept_intro', concept_name=safe_concept)
-        concept_audio_path = os.path.join(app.config['CONCEPT_AUDIO_FOLDER'], concept_audio_filename)
-        
-        concept_intro_text = f"Now go through this concept of {concept_name}, and try explaining what you understood from this concept in your own words!"
-        
-        if not os.path.exists(concept_audio_path) or \
-           getattr(get_concept_audio, 'last_concept', None) != concept_name: 
-            
-            success = generate_audio(concept_intro_text, concept_audio_path)
-            if not success:
-                return jsonify({'error': 'Failed to generate audio'}), 500
-                
-            log_interaction("AI", concept_name, concept_intro_text)
-            get_concept_audio.last_concept = concept_name
-        
-        if os.path.exists(concept_audio_path):
-            return send_from_directory(
-                app.config['CONCEPT_AUDIO_FOLDER'], 
-                concept_audio_filename,
-                mimetype='audio/mpeg'
-            )
-        else:
-            return jsonify({'error': 'Audio file not found'}), 404
-            
+        entry = ensure_concept_audio(concept_name)
+        if not entry:
+            return jsonify({'error': 'Failed to generate audio'}), 500
+
+        log_interaction("AI", concept_name, concept_intro_text(concept_name))
+
+        return send_from_directory(
+            app.config['UPLOAD_FOLDER'],
+            entry['file'],
+            mimetype='audio/mpeg'
+        )
     except Exception as e:
         print(f"Error in get_concept_audio: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-get_concept_audio.last_concept = None
+def prerender_prompt_audio_at_boot():
+    """prerender_prompt_audio under the manifest's render lock, so N workers booting together render each asset once."""
+    try:
+        with audio_manifest.render_lock():
+            return prerender_prompt_audio()
+    except Exception as e:
+        print(f"Prompt audio prerender failed: {e}")
+
+if os.environ.get('PRERENDER_AUDIO_ON_BOOT', '1') == '1':
+    executor.submit(prerender_prompt_audio_at_boot)
 
-@app.route('/submit_message', methods=['POST'])
-def submit_message():
-    """Handle the submission of user messages and generate AI responses."""
+def begin_turn():
+    """Validate a turn submission and read the session state it starts from.
+
+    Shared by submit_message and stream_submit_message. Returns (turn, None),
+    or (None, error) where `error` is the response to return as is.
+    """
     user_message = request.form.get('message')
     audio_file = request.files.get('audio')
     concept_name = request.form.get('concept_name')
     participant_id = session.get('participant_id')
     trial_type = session.get('trial_type')
-    interaction_id = session.get('interaction_id', get_interaction_id())
 
     if not participant_id or not trial_type:
-        return jsonify({'error': 'Missing participant ID or trial type'}), 400
+        return None, (jsonify({'error': 'Missing participant ID or trial type'}), 400)
 
     print(f"Received concept from frontend: {concept_name}")
       
     if not user_message and not audio_file:
         print("Error: No message or audio received!")  
-        return jsonify({'error': 'Message or audio is required.'})
+        return None, jsonify({'error': 'Message or audio is required.'})
 
     if not concept_name:
         print("Error: No concept detected!")  
-        return jsonify({'error': 'Concept not detected.'})
+        return None, jsonify({'error': 'Concept not detected.'})
 
-    concepts = load_concepts()
-    selected_concept = next((c for c in concepts if c["name"] == concept_name), None)
+    concept = concept_index().get(concept_name)
 
-    if not selected_concept:
+    if not concept:
         print("Error: Concept not found in system!")  
-        return jsonify({'error': 'Concept not found.'})
+        return None, jsonify({'error': 'Concept not found.'})
 
+    selected_concept = concept.data
+    concept_name = concept.name
     print(f"Using concept: {selected_concept}")
 
+    # Streamed turns that finished after their session cookie was sent.
+    apply_pending_turn_updates()
+
     if 'concept_attempts' not in session:
         session['concept_attempts'] = {}
 
@@ -2847,76 +3309,133 @@ def submit_message():
 
     current_attempt_count = session['concept_attempts'][concept_name]
     print(f"Current attempt count for {concept_name}: {current_attempt_count}")
-    
-    # Get conversation history for this concept
-    conversation_history = session.get('conversation_history', {}).get(concept_name, [])
 
-    if audio_file and getattr(audio_file, 'filename', None):
-        task_folder = create_user_folders(participant_id, trial_type)
-        user_audio_filename = get_audio_filename('user', participant_id, trial_type, current_attempt_count + 1, '.wav')
-        audio_path = os.path.join(task_folder, user_audio_filename)
-        
-        print(f"Saving audio file to: {audio_path}")
-        print(f"Directory exists: {os.path.exists(os.path.dirname(audio_path))}")
-            
-        os.makedirs(os.path.dirname(audio_path), exist_ok=True)
-        audio_file.save(audio_path)
-            
-        if os.path.exists(audio_path):
-            print(f"Audio file saved successfully at: {audio_path}")
-            print(f"File size: {os.path.getsize(audio_path)}")
-                
-            try:
-                audio = AudioSegment.from_file(audio_path)
-                # Normalize to 16kHz, mono, 16-bit PCM which works well with Whisper
-                try:
-                    audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
-                except Exception:
-                    pass
-                audio.export(audio_path, format="wav")
-                print("Audio converted/resampled to WAV (16kHz mono PCM) for transcription")
-            except Exception as e:
-                print(f"Error converting audio: {str(e)}")
-                
-            user_message = speech_to_text(audio_path)
-            # Ensure any stray SSML/TTS tokens are removed from transcribed text
-            user_message = sanitize_transcript(user_message)
-        else:
-            print(f"Failed to save audio file at: {audio_path}")
-            return jsonify({'error': 'Failed to save audio file'}), 500
+    return {
+        'participant_id': participant_id,
+        'trial_type': trial_type,
+        'concept': selected_concept,
+        'concept_entry': concept,
+        'concept_name': concept_name,
+        'attempt_count': current_attempt_count,
+        # Get conversation history for this concept
+        'conversation_history': session.get('conversation_history', {}).get(concept_name, []),
+        'user_message': user_message,
+        'audio_file': audio_file,
+        'audio_path': None,
+        'user_audio_filename': None,
+        'ingested': None,
+        'speech_audio': None,
+        # Where the reply came from (llm, cache, canned); see generate_response.
+        'provenance': {},
+    }, None
+
+def save_turn_audio(turn):
+    """Ingest and save the turn's audio upload, if any, and prepare the copy sent to STT.
+
+    Returns an error response if the recording could not be saved, else None.
+    """
+    audio_file = turn['audio_file']
+    if not (audio_file and getattr(audio_file, 'filename', None)):
+        return None
+    concept_name = turn['concept_name']
+    task_folder = create_user_folders(turn['participant_id'], turn['trial_type'])
+    user_audio_filename = get_audio_filename('user', turn['participant_id'], turn['trial_type'],
+                                             turn['attempt_count'] + 1, '.wav')
+    audio_path = os.path.join(task_folder, user_audio_filename)
+    turn['audio_path'] = audio_path
+    turn['user_audio_filename'] = user_audio_filename
     
-    log_interaction("USER", concept_name, user_message)
+    print(f"Saving audio file to: {audio_path}")
 
-    session['concept_attempts'][concept_name] = current_attempt_count + 1
-    print(f"Updated attempt count for {concept_name}: {session['concept_attempts'][concept_name]}")
+    # Read the upload once, decoding it to 16kHz mono PCM (which works well with
+    # Whisper) in memory; that buffer feeds the transcriber, the saved WAV and the backup.
+    ingested = None
+    try:
+        ingested = ingest_upload(audio_file.stream)
+        ingested.save(audio_path)
+        print(f"Audio ingested ({ingested.duration_seconds:.1f}s, {ingested.bytes_read} bytes read) "
+              f"and saved as WAV at: {audio_path}")
+    except Exception as e:
+        print(f"Error converting audio: {str(e)}")
+        raw = getattr(e, 'raw', None)
+        try:
+            os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+            if raw is not None:
+                with open(audio_path, 'wb') as f:
+                    f.write(raw)
+            else:
+                audio_file.stream.seek(0)
+                audio_file.save(audio_path)
+        except Exception as save_error:
+            print(f"Failed to save audio file at: {audio_path}: {save_error}")
+            return jsonify({'error': 'Failed to save audio file'}), 500
+        size = os.path.getsize(audio_path)
+        ingest_metrics.record(size, size, fallback=True)
+    turn['ingested'] = ingested
 
-    # Pass zero-based attempt count to the generator (0 == first attempt)
-    ai_response = generate_response(
-        user_message,
-        selected_concept["name"],
-        selected_concept["golden_answer"],
-        current_attempt_count,
-        conversation_history
-    )
+    # Silence is cut from the copy sent to STT only; the archived WAV stays untouched.
+    speech_audio = ingested
+    if ingested is not None and VAD_ENABLED:
+        try:
+            speech_audio, vad_info = ingested.trimmed(**VAD_OPTIONS)
+            vad_stats.record(vad_info)
+            log_interaction("SYSTEM", concept_name,
+                            f"Speech detected: {vad_info['speech_seconds']}s of {vad_info['original_seconds']}s recording "
+                            f"(trimmed {vad_info['trimmed_seconds']}s: leading {vad_info['leading_seconds']}s, "
+                            f"trailing {vad_info['trailing_seconds']}s, pauses {vad_info['squashed_seconds']}s)")
+        except Exception as e:
+            print(f"Voice activity trimming failed, transcribing full recording: {e}")
+            speech_audio = ingested
+    turn['speech_audio'] = speech_audio
+    return None
 
-    if not ai_response:
-        print("Error: AI response generation failed!")  
-        return jsonify({'error': 'AI response generation failed.'})
+def transcribe_turn(turn):
+    """Set turn['user_message'] from the saved recording (typed messages are kept)."""
+    if turn['audio_path'] is None:
+        return turn['user_message']
+    live_transcript = None
+    recording_id = request.form.get('recording_id')
+    if recording_id and LIVE_TRANSCRIPTION_ENABLED:
+        live_transcript = live_transcriber.finalize(recording_id, turn['participant_id'])
+    if live_transcript:
+        print("Using live transcript from chunked upload")
+        user_message = live_transcript
+    else:
+        user_message = speech_to_text(turn['audio_path'], audio=turn['speech_audio'])
+    # Ensure any stray SSML/TTS tokens are removed from transcribed text
+    turn['user_message'] = sanitize_transcript(user_message)
+    return turn['user_message']
+
+def count_turn_attempt(turn):
+    concept_name = turn['concept_name']
+    session['concept_attempts'][concept_name] = turn['attempt_count'] + 1
+    session.modified = True
+    print(f"Updated attempt count for {concept_name}: {session['concept_attempts'][concept_name]}")
 
-    print(f"AI Response: {ai_response}")
+MOVE_TO_NEXT_PHRASES = [
+    "please move to the next concept",
+    "move to the next concept",
+    "move on to the next concept",
+    "please move on to the next concept",
+    "correct answer:"
+]
 
+def turn_session_update(turn, ai_response):
+    """The session changes a finished turn makes, as data (see apply_turn_update)."""
     ai_lower = (ai_response or "").lower()
-    move_phrases = [
-        "please move to the next concept",
-        "move to the next concept",
-        "move on to the next concept",
-        "please move on to the next concept",
-        "correct answer:"
-    ]
-    should_move = any(p in ai_lower for p in move_phrases)
-    if should_move:
+    should_move = any(p in ai_lower for p in MOVE_TO_NEXT_PHRASES)
+    return {
+        'concept_name': turn['concept_name'],
+        'user_message': turn['user_message'],
+        'ai_response': ai_response,
+        'should_move': should_move,
+    }
+
+def apply_turn_update(update):
+    concept_name = update['concept_name']
+    if update['should_move']:
         try:
-            session['concept_attempts'][concept_name] = 3
+            session.setdefault('concept_attempts', {})[concept_name] = 3
         except Exception:
             pass
 
@@ -2925,115 +3444,331 @@ def submit_message():
     if concept_name not in session['conversation_history']:
         session['conversation_history'][concept_name] = []
     
-    session['conversation_history'][concept_name].append(f"User: {user_message}")
-    session['conversation_history'][concept_name].append(f"AI: {ai_response}")
+    session['conversation_history'][concept_name].append(f"User: {update['user_message']}")
+    session['conversation_history'][concept_name].append(f"AI: {update['ai_response']}")
     
     if len(session['conversation_history'][concept_name]) > 10:
         session['conversation_history'][concept_name] = session['conversation_history'][concept_name][-10:]
     
     session.modified = True
 
+def apply_pending_turn_updates(turn_id=None):
+    """Write the session changes of this participant's finished streamed turns (only `turn_id`'s if given)."""
+    participant_id = session.get('participant_id')
+    if not participant_id:
+        return 0
+    updates = pending_turn_updates.pop(participant_id, turn_id)
+    for update in updates:
+        apply_turn_update(update)
+    return len(updates)
+
+def finish_turn(turn, ai_response, segments=None):
+    """Log and persist a finished turn and start its reply audio; returns the response fields.
+
+    `segments` are a streamed reply's (sentence, TTS job) pairs, reused for the reply audio file.
+    """
+    concept_name = turn['concept_name']
+    attempt_number = turn['attempt_count'] + 1
+
     log_interaction("AI", concept_name, ai_response)
+    provenance = turn.get('provenance') or {}
+    if provenance.get('source') == 'cache':
+        origin = provenance.get('origin') or {}
+        log_interaction("SYSTEM", concept_name,
+                        f"AI reply served from response cache ({provenance['tier']} match, "
+                        f"similarity {provenance['similarity']}, entry {provenance['entry'][-12:]} "
+                        f"first generated for participant {origin.get('participant_id')})")
     
     try:
-        log_interaction_to_db_only("USER", concept_name, user_message, current_attempt_count + 1)
-        log_interaction_to_db_only("AI", concept_name, ai_response, current_attempt_count + 1)
+        log_interaction_to_db_only("USER", concept_name, turn['user_message'], attempt_number)
+        log_interaction_to_db_only("AI", concept_name, ai_response, attempt_number)
     except Exception as e:
         print(f"Database logging failed, but continuing: {str(e)}")
 
+    participant_id, trial_type = turn['participant_id'], turn['trial_type']
     task_folder = create_user_folders(participant_id, trial_type)
-    ai_response_filename = get_audio_filename('AI', participant_id, trial_type, current_attempt_count + 1)
+    ai_response_filename = get_audio_filename('AI', participant_id, trial_type, attempt_number)
     audio_response_path = os.path.join(task_folder, ai_response_filename)
+    session_id = session.get('session_id')
 
+    trial_folder_map = {
+        'Trial_1': 'main_task_1', 'Trial_2': 'main_task_2', 'Test': 'test_task'
+    }
+    trial_folder_name = trial_folder_map.get(trial_type, trial_type.lower())
+    ai_audio_url = f"/uploads/UserData/{participant_id}/{trial_folder_name}/{ai_response_filename}"
+
+    ai_audio_job_id = start_ai_audio_job(
+        ai_response, audio_response_path, ai_audio_url, session_id,
+        ai_response_filename, concept_name, attempt_number,
+        tts_format=turn_tts_format(), segments=segments
+    )
+    return {
+        'response': ai_response,
+        'ai_audio_url': ai_audio_url,
+        'ai_audio_job_id': ai_audio_job_id,
+        'ai_audio_status_url': f"/ai_audio_status/{ai_audio_job_id}" if ai_audio_job_id else None,
+        'user_transcript': turn['user_message'],
+        'response_source': provenance.get('source'),
+    }
+
+def backup_turn_audio(turn):
+    """Back up the user's recording for this turn and record the turn's ingest I/O."""
+    ingested, audio_path = turn['ingested'], turn['audio_path']
+    session_id = session.get('session_id')
+    attempt_number = turn['attempt_count'] + 1
     try:
-        executor.submit(generate_audio, ai_response, audio_response_path)
-    except Exception as e:
-        print(f"Failed to start async audio generation: {e}")
-    
-    try:
-        session_id = session.get('session_id')
-        if session_id and audio_file and os.path.exists(audio_path):
-            with open(audio_path, 'rb') as f:
-                audio_data = f.read()
+        if session_id and ingested is not None:
             save_audio_with_cloud_backup(
-                audio_data, user_audio_filename, session_id, 
-                'user_audio', concept_name, current_attempt_count + 1
+                ingested.wav_bytes, turn['user_audio_filename'], session_id,
+                'user_audio', turn['concept_name'], attempt_number,
+                local_path=audio_path
             )
-            
-        if session_id and os.path.exists(audio_response_path):
-            with open(audio_response_path, 'rb') as f:
-                ai_audio_data = f.read()
+        elif session_id and turn['audio_file'] and audio_path and os.path.exists(audio_path):
+            with open(audio_path, 'rb') as f:
+                audio_data = f.read()
             save_audio_with_cloud_backup(
-                ai_audio_data, ai_response_filename, session_id, 
-                'ai_audio', concept_name, current_attempt_count + 1
+                audio_data, turn['user_audio_filename'], session_id, 
+                'user_audio', turn['concept_name'], attempt_number,
+                local_path=audio_path
             )
     except Exception as e:
         print(f"Audio backup failed, but continuing: {str(e)}")
+    if ingested is not None:
+        ingest_metrics.record(ingested.bytes_read, ingested.bytes_written, ingested.duration_seconds)
 
-    trial_folder_map = {
-        'Trial_1': 'main_task_1', 'Trial_2': 'main_task_2', 'Test': 'test_task'
-    }
-    trial_folder_name = trial_folder_map.get(trial_type, trial_type.lower())
-    ai_audio_url = f"/uploads/UserData/{participant_id}/{trial_folder_name}/{ai_response_filename}"
+def turn_tts_format():
+    try:
+        return negotiate_format(request.form.get('tts_format'))
+    except ValueError:
+        return 'mp3'
 
-    return jsonify({
-        'response': ai_response,
-        'ai_audio_url': ai_audio_url,
-        'user_transcript': user_message,
-        'attempt_count': session.get('concept_attempts', {}).get(concept_name, current_attempt_count + 1),
-        'should_move_to_next': bool(should_move)
+@app.route('/submit_message', methods=['POST'])
+def submit_message():
+    """Handle the submission of user messages and generate AI responses."""
+    turn, error = begin_turn()
+    if error is not None:
+        return error
+    error = save_turn_audio(turn)
+    if error is not None:
+        return error
+    user_message = transcribe_turn(turn)
+    concept_name = turn['concept_name']
+    
+    log_interaction("USER", concept_name, user_message)
+    count_turn_attempt(turn)
+
+    # Pass zero-based attempt count to the generator (0 == first attempt)
+    ai_response = generate_response(
+        user_message,
+        turn['concept']["name"],
+        turn['concept']["golden_answer"],
+        turn['attempt_count'],
+        turn['conversation_history'],
+        provenance=turn['provenance']
+    )
+
+    if not ai_response:
+        print("Error: AI response generation failed!")  
+        return jsonify({'error': 'AI response generation failed.'})
+
+    print(f"AI Response: {ai_response}")
+
+    update = turn_session_update(turn, ai_response)
+    apply_turn_update(update)
+    payload = finish_turn(turn, ai_response)
+    backup_turn_audio(turn)
+
+    payload.update({
+        'attempt_count': session.get('concept_attempts', {}).get(concept_name, turn['attempt_count'] + 1),
+        'should_move_to_next': bool(update['should_move'])
     })
+    return jsonify(payload)
+
+def backup_ai_audio(job_id, file_path, session_id, filename, concept_name, attempt_number):
+    """Completion callback for AI reply audio: back it up and record it in the DB."""
+    if not session_id:
+        return
+    try:
+        with open(file_path, 'rb') as f:
+            ai_audio_data = f.read()
+        with app.app_context():
+            _, supabase_result = save_audio_with_cloud_backup(
+                ai_audio_data, filename, session_id,
+                'ai_audio', concept_name, attempt_number
+            )
+        ai_audio_jobs.update(job_id, backed_up=True, cloud_backup=bool(supabase_result))
+    except Exception as e:
+        ai_audio_jobs.update(job_id, backed_up=False)
+        print(f"AI audio backup failed: {str(e)}")
+
+def start_ai_audio_job(text, file_path, ai_audio_url, session_id, filename, concept_name, attempt_number,
+                       tts_format='mp3', segments=None):
+    """Generate the AI reply audio in the background and return a job id the client can poll.
+
+    The synthesis runs in `tts_format`, the format the page will stream from
+    /synthesize. For a streamed reply, `segments` holds its (sentence, TTS job)
+    pairs and the file is joined from them instead. Backup and DB recording
+    run once the file exists instead of racing the synthesis.
+    """
+    try:
+        if segments:
+            audio_job = generate_audio_from_segments(segments, file_path, fmt=tts_format)
+        else:
+            audio_job = generate_audio_async(text, file_path, fmt=tts_format)
+    except Exception as e:
+        print(f"Failed to start async audio generation: {e}")
+        return None
+
+    job_id = ai_audio_jobs.track(audio_job, {'ai_audio_url': ai_audio_url})
+
+    def on_done(f):
+        if f.exception() is None and f.result():
+            backup_ai_audio(job_id, file_path, session_id, filename, concept_name, attempt_number)
+
+    audio_job.add_done_callback(on_done)
+    return job_id
+
+AI_AUDIO_STATUS_MAX_WAIT_SECONDS = float(os.environ.get('AI_AUDIO_STATUS_MAX_WAIT_SECONDS', 5))
+
+@app.route('/ai_audio_status/<job_id>')
+def ai_audio_status(job_id):
+    """Report whether the background AI reply audio is ready.
+
+    Pass ?wait=<seconds> to block until the job finishes, for at most
+    AI_AUDIO_STATUS_MAX_WAIT_SECONDS so a waiting client doesn't hold a worker
+    for long; the page polls again while the status is 'pending'.
+    """
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), AI_AUDIO_STATUS_MAX_WAIT_SECONDS)
+    except ValueError:
+        wait = 0
+    status = ai_audio_jobs.status(job_id, wait=wait)
+    if status is None:
+        return jsonify({'job_id': job_id, 'status': 'unknown'}), 404
+    return jsonify(status)
+
+@app.route('/recording_chunk', methods=['POST'])
+def recording_chunk():
+    """Accept one MediaRecorder timeslice of an in-progress recording.
+
+    Form fields: recording_id, seq (0-based) and the `chunk` blob. The
+    recording is transcribed incrementally with the local Whisper model, and
+    submit_message uses that transcript when it gets the same recording_id.
+    """
+    if not LIVE_TRANSCRIPTION_ENABLED:
+        return jsonify({'enabled': False})
+    participant_id = session.get('participant_id')
+    recording_id = request.form.get('recording_id')
+    chunk = request.files.get('chunk')
+    if not participant_id or not recording_id or chunk is None:
+        return jsonify({'error': 'recording_id, seq and chunk are required'}), 400
+    try:
+        seq = int(request.form.get('seq', ''))
+    except ValueError:
+        return jsonify({'error': 'seq must be an integer'}), 400
+    try:
+        status = live_transcriber.add_chunk(recording_id, participant_id, seq, chunk.read())
+    except PermissionError as e:
+        return jsonify({'error': str(e)}), 403
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    status['enabled'] = True
+    return jsonify(status)
+
+MISSING_CONTEXT_RESPONSE = (
+    "I can’t provide feedback yet because the concept context isn’t set. "
+    "Please make sure both the concept and golden answer are defined."
+)
+EXCELLENT_RESPONSE = (
+    "Excellent — your explanation is clear and accurate. "
+    "You’ve captured the main idea correctly. "
+    "You can now move on to the next concept."
+)
+NON_ENGLISH_RESPONSE = "Please repeat your explanation in English so I can provide feedback."
+
+CANNED_RESPONSES = (MISSING_CONTEXT_RESPONSE, EXCELLENT_RESPONSE, NON_ENGLISH_RESPONSE)
+
+TTS_WARM_FORMATS = [f.strip() for f in os.environ.get('TTS_WARM_FORMATS', 'mp3,opus').split(',') if f.strip() in TTS_FORMATS]
+
+def warm_canned_tts():
+    """Pin the canned replies and triage templates in the TTS cache and render any that are missing.
+
+    Only preferred-engine renders are pinned; a fallback render made while the
+    network is down is served but not cached, so the next request renders it
+    properly.
+    """
+    for text in CANNED_RESPONSES + tuple(turn_triage.template_texts(concept_index().names)):
+        for fmt in TTS_WARM_FORMATS:
+            for engine in tts_router.preferred():
+                tts_cache.pin(tts_cache_key(text, 'alloy', fmt, engine))
+            try:
+                start_tts_job(text, fmt=fmt)
+            except Exception as e:
+                print(f"Failed to warm TTS cache for canned reply: {e}")
+
+executor.submit(warm_canned_tts)
 
-def generate_response(user_message, concept_name, golden_answer, attempt_count, conversation_history=None):
-    """Generate short, supportive feedback for a 3-attempt self-explanation loop."""
+# Part of the response cache key; bump when the prompt in response_messages changes.
+RESPONSE_PROMPT_VERSION = 'v2'
+RESPONSE_MODEL = "gpt-4o-mini"
+
+def cached_response(user_message, concept_name, attempt_count, provenance):
+    """A cached reply for this turn, or None. Fills `provenance` on a hit."""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    reply, info = response_cache.get(
+        concept_name, attempt_count, user_message, RESPONSE_PROMPT_VERSION,
+        served_to={'participant_id': session.get('participant_id'), 'session_id': session.get('session_id')}
+    )
+    if reply is not None:
+        print(f"Response cache {info['tier']} hit (similarity {info['similarity']})")
+        provenance.update(info)
+    return reply
+
+def store_response(user_message, concept_name, attempt_count, ai_response):
+    if not RESPONSE_CACHE_ENABLED or not ai_response:
+        return
+    response_cache.put(
+        concept_name, attempt_count, user_message, RESPONSE_PROMPT_VERSION, ai_response,
+        source={
+            'model': RESPONSE_MODEL,
+            'participant_id': session.get('participant_id'),
+            'session_id': session.get('session_id'),
+            'trial_type': session.get('trial_type'),
+        }
+    )
+
+def response_messages(user_message, concept_name, golden_answer, attempt_count, conversation_history=None,
+                      provenance=None):
+    """The tutor prompt for one turn: (canned_reply, None) if no LLM call is needed, else (None, messages).
+
+    `provenance`, if given, gets the turn's triage class, and source 'triage'
+    when the reply is a triage template.
+    """
 
     import re
-    import openai
 
     if not golden_answer or not concept_name:
-        return (
-            "I can’t provide feedback yet because the concept context isn’t set. "
-            "Please make sure both the concept and golden answer are defined."
-        )
+        return MISSING_CONTEXT_RESPONSE, None
 
     history_context = ""
     if conversation_history and len(conversation_history) > 0:
         history_context = "\nRecent conversation:\n" + "\n".join(conversation_history[-3:])
 
     # === 2️⃣ Simple Similarity Check ===
-    def normalize(text):
-        return re.sub(r'[^a-z0-9\s]', '', (text or '').lower().strip())
+    # The golden answer's normalized text and word set come precomputed from the concept index.
+    concept = concept_index().get(concept_name)
+    if concept is None or concept.golden_answer != golden_answer:
+        concept = ConceptEntry(concept_name, golden_answer)
 
-    # Character-level similarity (robust to small differences)
-    user_norm = normalize(user_message)
-    golden_norm = normalize(golden_answer)
+    # Best of character-level similarity (robust to small differences) and word-level
+    # Jaccard (semantic overlap, match V1). The character ratio is only computed when
+    # it could still reach the threshold, so long transcripts cost linear time.
+    scored = timed_score(similarity_stats, normalize_text(user_message), concept,
+                         threshold=EXCELLENT_THRESHOLD, char_cap=SIMILARITY_CHAR_CAP)
 
-    try:
-        char_ratio = SequenceMatcher(None, user_norm, golden_norm).ratio()
-    except Exception:
-        char_ratio = 0.0
-
-    # Word-level Jaccard similarity to capture semantic overlap (match V1)
-    def _word_jaccard(a, b):
-        a_set = set(a.split())
-        b_set = set(b.split())
-        if not a_set and not b_set:
-            return 0.0
-        try:
-            return len(a_set & b_set) / len(a_set | b_set)
-        except Exception:
-            return 0.0
-
-    word_ratio = _word_jaccard(user_norm, golden_norm)
-
-    similarity = max(char_ratio, word_ratio)
-
-    if similarity >= 0.8:
-        return (
-            "Excellent — your explanation is clear and accurate. "
-            "You’ve captured the main idea correctly. "
-            "You can now move on to the next concept."
-        )
+    if scored['score'] >= EXCELLENT_THRESHOLD:
+        return EXCELLENT_RESPONSE, None
 
     # ==== Base prompt ====
     base_prompt = f"""
@@ -3107,164 +3842,229 @@ def generate_response(user_message, concept_name, golden_answer, attempt_count,
 
     non_english = re.compile(r"[\u0590-\u05FF\u0600-\u06FF\u0400-\u04FF\u0900-\u097F\u4E00-\u9FFF\u3040-\u30FF\uAC00-\uD7AF]")
     if non_english.search(user_message):
-        return "Please repeat your explanation in English so I can provide feedback."
+        return NON_ENGLISH_RESPONSE, None
+
+    if TRIAGE_ENABLED:
+        turn_class, templated, _ = turn_triage.triage(user_message, concept, attempt_count, concept_index())
+        if provenance is not None:
+            provenance['triage'] = turn_class
+        if templated is not None:
+            print(f"Triage: {turn_class} turn answered from template, no LLM call")
+            if provenance is not None:
+                provenance['source'] = 'triage'
+            return templated, None
 
     messages = [
         {"role": "system", "content": enforcement_system},
         {"role": "system", "content": base_prompt},
         {"role": "user", "content": user_prompt},
     ]
+    return None, messages
+
+
+def generate_response(user_message, concept_name, golden_answer, attempt_count, conversation_history=None,
+                      provenance=None):
+    """Generate short, supportive feedback for a 3-attempt self-explanation loop.
+
+    Replies to explanations seen before (same concept, attempt bucket and
+    normalized text) come from the response cache. `provenance`, if given, is
+    filled with where the reply came from: 'canned', 'triage' (a template
+    for an empty or off-topic turn), 'cache' (with the entry it was served
+    from), 'llm' or 'error', plus the turn's triage class. Conversation history is not part
+    of the cache key.
+    """
+
+    import openai
+
+    provenance = provenance if provenance is not None else {}
+    canned, messages = response_messages(user_message, concept_name, golden_answer, attempt_count,
+                                         conversation_history, provenance=provenance)
+    if canned is not None:
+        provenance.setdefault('source', 'canned')
+        return canned
+
+    cached = cached_response(user_message, concept_name, attempt_count, provenance)
+    if cached is not None:
+        return cached
 
     try:
         response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
+            model=RESPONSE_MODEL,
             messages=messages,
             max_tokens=80,
             temperature=0.4,
         )
         ai_response = response.choices[0].message.content.strip()
+        provenance.update({'source': 'llm', 'model': RESPONSE_MODEL})
+        store_response(user_message, concept_name, attempt_count, ai_response)
         return ai_response
 
     except Exception as e:
+        provenance['source'] = 'error'
         return f"Error generating AI response: {str(e)}"
 
 
+def stream_response(user_message, concept_name, golden_answer, attempt_count, conversation_history=None,
+                    provenance=None):
+    """generate_response as a stream of text deltas: same prompt, canned replies, cache and error text.
 
-    def detect_non_english(text):
-        if not text:
-            return False
-        non_latin_regex = re.compile(r"[\u0590-\u05FF\u0600-\u06FF\u0400-\u04FF\u0900-\u097F\u4E00-\u9FFF\u3040-\u30FF\uAC00-\uD7AF]")
-        return bool(non_latin_regex.search(text))
+    Canned, cached and error replies arrive as a single delta.
+    """
+    import openai
 
-    if detect_non_english(user_message):
-        return "Please repeat your explanation in English so I can provide feedback. This interaction uses English only."
+    provenance = provenance if provenance is not None else {}
+    canned, messages = response_messages(user_message, concept_name, golden_answer, attempt_count,
+                                         conversation_history, provenance=provenance)
+    if canned is not None:
+        provenance.setdefault('source', 'canned')
+        yield canned
+        return
 
-    try:
-        messages = [
-            {"role": "system", "content": enforcement_system},
-            {"role": "system", "content": base_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+    cached = cached_response(user_message, concept_name, attempt_count, provenance)
+    if cached is not None:
+        yield cached
+        return
 
+    reply = ''
+    try:
         response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
+            model=RESPONSE_MODEL,
             messages=messages,
             max_tokens=80,
             temperature=0.4,
+            stream=True,
         )
-
-        ai_response = response.choices[0].message.content
-        attempt_count += 1
-        session['attempt_count'] = attempt_count
-        return ai_response
+        for chunk in response:
+            choices = chunk.get('choices') or [{}]
+            token = (choices[0].get('delta') or {}).get('content')
+            if token:
+                reply += token
+                yield token
     except Exception as e:
-        return f"Error generating AI response: {str(e)}"
+        provenance['source'] = 'error'
+        yield f"Error generating AI response: {str(e)}"
+        return
+    provenance.update({'source': 'llm', 'model': RESPONSE_MODEL})
+    store_response(user_message, concept_name, attempt_count, reply.strip())
 
 
 @app.route('/stream_submit_message', methods=['POST'])
 def stream_submit_message():
-    """Streaming variant of /submit_message — returns partial text as it's generated."""
-    try:
-        participant_id = session.get('participant_id')
-        trial_type = session.get('trial_type')
-        if not participant_id or not trial_type:
-            return jsonify({'status': 'error', 'message': 'Participant ID or trial type not found in session'}), 400
-
-        concept_name = request.form.get('concept_name', '').strip()
-        # concepts = load_concepts()
-        concept_list = load_concepts()
-        concepts = {c["name"]: c for c in concept_list}     # FIX
-
-        concept_found = False
-        for concept in concepts:
-            if concept.lower() == concept_name.lower():
-                concept_name = concept
-                concept_found = True
-                break
-
-        if not concept_found:
-            return jsonify({'status': 'error', 'message': 'Concept not found'}), 400
-
-        golden_answer = concepts[concept_name]['golden_answer']
-
-        user_transcript = ''
-        if 'audio' in request.files:
-            audio_file = request.files['audio']
-            if audio_file:
-                folders = get_participant_folder(participant_id, trial_type)
-                audio_filename = get_audio_filename('user', participant_id, 1)
-                audio_path = os.path.join(folders['participant_folder'], audio_filename)
-                audio_file.save(audio_path)
-                try:
-                    with open(audio_path, 'rb') as f:
-                        resp = openai.Audio.transcribe(model='whisper-1', file=f, language='en')
-                        user_transcript = resp.get('text') if isinstance(resp, dict) else ''
-                        user_transcript = sanitize_transcript(user_transcript)
-                except Exception:
-                    user_transcript = speech_to_text(audio_path)
-
-        base_prompt = f"""
-        Context: {concept_name}
-        Golden Answer: {golden_answer}
-        User Explanation: {user_transcript}
-        """
-
-        enforcement_system = (
-            "Respond only in English. "
-            "If the student's input is not in English, ask politely in English to repeat it in English."
-        )
-
-        length_rule = (
-            "IMPORTANT: Your entire response must be at most 2 short sentences "
-            "and no more than 40 words in total. Do not exceed this length."
-        )
-        
-        messages = [
-            {"role": "system", "content": base_prompt},
-            {"role": "user", "content": user_transcript},
-            {"role": "system", "content": length_rule},
-            {"role": "system", "content": enforcement_system}
-        ]
-
-        def generate():
-            try:
-                stream_resp = openai.ChatCompletion.create(
-                    model='gpt-4o-mini',
-                    messages=messages,
-                    max_tokens=250,
-                    temperature=0.4,
-                    stream=True
-                )
+    """Streaming /submit_message: the same turn, reported as server-sent events.
+
+    Takes the same form fields and keeps the same attempt counting,
+    conversation history, file/DB logs, reply audio file and backups. Events,
+    each with a JSON payload:
+      transcript     {text}                once the recording is transcribed
+      token          {text}                LLM reply deltas
+      response       {response, should_move_to_next, attempt_count, ai_audio_url,
+                      ai_audio_job_id, ai_audio_status_url, user_transcript, turn_id}
+      audio_segment  {index, text, url}    a sentence of the reply is synthesized;
+                                           url streams it (null if synthesis failed)
+      error          {error}
+      done           {turn_id}
+    The session cookie is sent before the reply exists, so the turn's history
+    and move-on state are applied by POST /stream_submit_message/<turn_id>/commit
+    (or by the participant's next turn if that never arrives).
+    """
+    turn, error = begin_turn()
+    if error is not None:
+        return error
+    error = save_turn_audio(turn)
+    if error is not None:
+        return error
+    # Everything that must reach the session cookie happens before the stream starts.
+    count_turn_attempt(turn)
+    tts_format = turn_tts_format()
+
+    def segment_event(index, text, job):
+        event = {'index': index, 'text': text, 'url': None}
+        try:
+            job.result(timeout=TTS_JOB_WAIT_SECONDS)
+            event['url'] = '/synthesize?' + urlencode({'text': text, 'format': tts_format})
+        except Exception as e:
+            print(f"Reply segment synthesis failed: {e}")
+        return sse_event('audio_segment', event)
 
-                accumulator = ''
-                for event in stream_resp:
+    def generate():
+        turn_id = None
+        try:
+            user_message = transcribe_turn(turn)
+            concept_name = turn['concept_name']
+            yield sse_event('transcript', {'text': user_message})
+            log_interaction("USER", concept_name, user_message)
+
+            # Each finished sentence goes to TTS while the rest of the reply streams.
+            chunker = SentenceChunker()
+            segments = []
+            sent = 0
+
+            def speak(sentences):
+                for sentence in sentences:
                     try:
-                        token = ''
-                        if isinstance(event, dict) and 'choices' in event:
-                            ch = event['choices'][0]
-                            if 'delta' in ch:
-                                token = ch['delta'].get('content', '')
-                            elif 'text' in ch:
-                                token = ch.get('text', '')
-                        elif hasattr(event, 'choices'):
-                            try:
-                                token = event.choices[0].delta.get('content', '')
-                            except Exception:
-                                token = ''
-
-                        if token:
-                            accumulator += token
-                            yield token
-                    except Exception:
-                        continue
-
-                yield '\n'
-            except Exception as e:
-                yield f"[error] {str(e)}"
-
-        return Response(stream_with_context(generate()), content_type='text/plain; charset=utf-8')
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+                        job, _ = start_tts_job(sentence, fmt=tts_format, background=True)
+                    except Exception as e:
+                        print(f"Failed to start reply segment synthesis: {e}")
+                        job = None
+                    segments.append((len(segments), sentence, job))
+
+            def ready_segments(block=False):
+                """Events for synthesized segments, in order; with `block`, waits for the rest."""
+                nonlocal sent
+                while sent < len(segments):
+                    index, sentence, job = segments[sent]
+                    if job is not None and not job.done() and not block:
+                        return
+                    sent += 1
+                    if job is None:
+                        yield sse_event('audio_segment', {'index': index, 'text': sentence, 'url': None})
+                    else:
+                        yield segment_event(index, sentence, job)
+
+            for token in stream_response(
+                user_message,
+                turn['concept']["name"],
+                turn['concept']["golden_answer"],
+                turn['attempt_count'],
+                turn['conversation_history'],
+                provenance=turn['provenance']
+            ):
+                yield sse_event('token', {'text': token})
+                speak(chunker.feed(token))
+                yield from ready_segments()
+
+            ai_response = chunker.text.strip()
+            if not ai_response:
+                print("Error: AI response generation failed!")
+                yield sse_event('error', {'error': 'AI response generation failed.'})
+                return
+            speak(chunker.flush())
+            print(f"AI Response: {ai_response}")
+
+            update = turn_session_update(turn, ai_response)
+            turn_id = pending_turn_updates.add(turn['participant_id'], update)
+            payload = finish_turn(turn, ai_response, segments=[(sentence, job) for _, sentence, job in segments])
+            payload.update({
+                'attempt_count': 3 if update['should_move'] else turn['attempt_count'] + 1,
+                'should_move_to_next': bool(update['should_move']),
+                'turn_id': turn_id,
+            })
+            yield sse_event('response', payload)
+            yield from ready_segments(block=True)
+            backup_turn_audio(turn)
+        except Exception as e:
+            print(f"Streaming turn failed: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+        yield sse_event('done', {'turn_id': turn_id})
+
+    return Response(stream_with_context(generate()), content_type='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/stream_submit_message/<turn_id>/commit', methods=['POST'])
+def commit_streamed_turn(turn_id):
+    """Write the session changes of one finished streamed turn."""
+    applied = apply_pending_turn_updates(turn_id)
+    return jsonify({'status': 'success', 'turn_id': turn_id, 'applied': applied})
 
 @app.route('/uploads/concept_audio/<filename>')
 def serve_concept_audio(filename):
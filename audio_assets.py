@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock is all there is
+    fcntl = None
+
+# Bump when the rendering itself changes (voice, engine, format) so every asset is regenerated.
+MANIFEST_VERSION = 2
+
+INTRO_TEXT = "Hello, let us begin the self-explanation journey! We'll be exploring the concept of Extraneous Variables, focusing on Correlation, Confounders, and Moderators. Please go through each concept and explain what you understand about them in your own words!"
+
+
+def concept_intro_text(concept_name):
+    return f"Now go through this concept of {concept_name}, and try explaining what you understood from this concept in your own words!"
+
+
+def text_hash(text):
+    return hashlib.sha256((text or '').strip().encode('utf-8')).hexdigest()
+
+
+class AudioAssetManifest:
+    """Versioned manifest of prerendered prompt audio (intro and concept intros).
+
+    Each asset records the hash of the text it was rendered from and the TTS
+    engine that rendered it, so audio is only regenerated when that text (or
+    MANIFEST_VERSION) changes, or when the caller marks the engine as stale
+    (a fallback render made while the preferred engine was down). The manifest
+    is a JSON file under the uploads folder, shared by all workers; updates
+    hold an flock on `<path>.lock` so concurrent workers don't drop each
+    other's entries.
+    """
+
+    def __init__(self, path, base_folder):
+        self.path = path
+        self.base_folder = base_folder
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._data = {'version': MANIFEST_VERSION, 'assets': {}}
+
+    def _reload_locked(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read audio manifest {self.path}: {e}")
+            return
+        self._mtime = mtime
+        if data.get('version') != MANIFEST_VERSION:
+            data = {'version': MANIFEST_VERSION, 'assets': {}}
+        self._data = data
+
+    @contextmanager
+    def _file_lock(self, suffix='lock'):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.{suffix}", 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def render_lock(self):
+        """Cross-process lock (flock on `<path>.render.lock`) for a full prerender pass.
+
+        Workers that prerender at boot take turns under it: the first renders
+        what is missing or stale, the others then find every entry current.
+        """
+        return self._file_lock('render.lock')
+
+    def _save_locked(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def current(self, asset_id, text):
+        """Return the manifest entry if its audio was rendered from `text` and still exists."""
+        with self._lock:
+            self._reload_locked()
+            entry = self._data['assets'].get(asset_id)
+        if not entry or entry.get('text_hash') != text_hash(text):
+            return None
+        if not os.path.exists(os.path.join(self.base_folder, entry['file'])):
+            return None
+        return entry
+
+    def record(self, asset_id, text, file_path, engine=None):
+        entry = {
+            'text_hash': text_hash(text),
+            'engine': engine,
+            'file': os.path.relpath(file_path, self.base_folder).replace('\\', '/'),
+            'text': text,
+            'rendered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with self._lock, self._file_lock():
+            self._reload_locked()
+            self._data['assets'][asset_id] = entry
+            self._save_locked()
+        return entry
+
+    def ensure(self, asset_id, text, file_path, render, stale_engines=()):
+        """Return the entry for `asset_id`, calling render(text, file_path) only if it is stale.
+
+        `render` returns the engine name (or just True) on success. An entry
+        rendered by one of `stale_engines` is rendered again; if that fails
+        the old audio keeps being served.
+        """
+        entry = self.current(asset_id, text)
+        if entry and entry.get('engine') not in stale_engines:
+            return entry
+        rendered = render(text, file_path)
+        if not rendered:
+            return entry
+        return self.record(asset_id, text, file_path, engine=rendered if isinstance(rendered, str) else None)
+
+    def snapshot(self):
+        with self._lock:
+            self._reload_locked()
+            return json.loads(json.dumps(self._data))
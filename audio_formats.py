@@ -0,0 +1,105 @@
+from io import BytesIO
+
+# Output formats /synthesize can serve. `openai` is the response_format the
+# OpenAI speech API emits natively (None = transcode from mp3); `export` is
+# how pydub/ffmpeg produces the format from another one.
+TTS_FORMATS = {
+    'mp3': {
+        'content_type': 'audio/mpeg', 'ext': 'mp3', 'openai': 'mp3',
+        'export': {'format': 'mp3', 'bitrate': '64k'},
+    },
+    'opus': {
+        'content_type': 'audio/ogg; codecs=opus', 'ext': 'ogg', 'openai': 'opus',
+        'export': {'format': 'ogg', 'codec': 'libopus', 'bitrate': '32k'},
+    },
+    'webm': {
+        'content_type': 'audio/webm; codecs=opus', 'ext': 'webm', 'openai': None,
+        'export': {'format': 'webm', 'codec': 'libopus', 'bitrate': '32k'},
+    },
+    'aac': {
+        'content_type': 'audio/aac', 'ext': 'aac', 'openai': 'aac',
+        'export': {'format': 'adts', 'codec': 'aac', 'bitrate': '48k'},
+    },
+    'wav': {
+        'content_type': 'audio/wav', 'ext': 'wav', 'openai': 'wav',
+        'export': {'format': 'wav'},
+    },
+    # Raw 16-bit little-endian mono PCM at 24 kHz, as the OpenAI API emits it.
+    'pcm': {
+        'content_type': 'audio/L16; rate=24000; channels=1', 'ext': 'pcm', 'openai': 'pcm',
+        'export': None,
+    },
+}
+
+PCM_SAMPLE_RATE = 24000
+
+_ALIASES = {
+    'mpeg': 'mp3', 'audio/mpeg': 'mp3', 'audio/mp3': 'mp3',
+    'ogg': 'opus', 'audio/ogg': 'opus', 'audio/opus': 'opus',
+    'audio/webm': 'webm',
+    'adts': 'aac', 'm4a': 'aac', 'audio/aac': 'aac', 'audio/mp4': 'aac',
+    'audio/wav': 'wav', 'audio/wave': 'wav', 'audio/x-wav': 'wav',
+    'l16': 'pcm', 'audio/l16': 'pcm', 'raw': 'pcm', 'audio/pcm': 'pcm',
+}
+
+
+def normalize_format(name):
+    """Map a format name or MIME type to a key of TTS_FORMATS, or None if unsupported."""
+    if not name:
+        return None
+    name = name.split(';')[0].strip().lower()
+    name = _ALIASES.get(name, name)
+    return name if name in TTS_FORMATS else None
+
+
+def negotiate_format(requested=None, accept_header=None, default='mp3'):
+    """Pick the output format from an explicit request field, else the Accept header.
+
+    Raises ValueError for an explicitly requested format that is not supported.
+    """
+    if requested:
+        fmt = normalize_format(requested)
+        if fmt is None:
+            raise ValueError(f"Unsupported audio format: {requested}")
+        return fmt
+
+    candidates = []
+    for position, part in enumerate((accept_header or '').split(',')):
+        params = [p.strip() for p in part.split(';')]
+        q = 1.0
+        for p in params[1:]:
+            if p.startswith('q='):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        fmt = normalize_format(part)
+        if fmt and q > 0:
+            candidates.append((-q, position, fmt))
+    return min(candidates)[2] if candidates else default
+
+
+def format_for_content_type(content_type):
+    for fmt, spec in TTS_FORMATS.items():
+        if spec['content_type'] == content_type:
+            return fmt
+    return normalize_format(content_type) or 'mp3'
+
+
+def transcode(audio_bytes, src_fmt, dst_fmt):
+    """Convert audio between TTS_FORMATS entries with pydub/ffmpeg."""
+    if src_fmt == dst_fmt:
+        return audio_bytes
+    from pydub import AudioSegment
+
+    if src_fmt == 'pcm':
+        segment = AudioSegment(data=audio_bytes, sample_width=2, frame_rate=PCM_SAMPLE_RATE, channels=1)
+    else:
+        segment = AudioSegment.from_file(BytesIO(audio_bytes), format=TTS_FORMATS[src_fmt]['export']['format'])
+
+    if dst_fmt == 'pcm':
+        return segment.set_frame_rate(PCM_SAMPLE_RATE).set_channels(1).set_sample_width(2).raw_data
+
+    out = BytesIO()
+    segment.export(out, **TTS_FORMATS[dst_fmt]['export'])
+    return out.getvalue()
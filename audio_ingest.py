@@ -0,0 +1,242 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+import wave
+from io import BytesIO
+
+from transcription_cache import PCM_SAMPLE_RATE
+
+INGEST_CHUNK_BYTES = 64 * 1024
+
+
+class IngestedAudio:
+    """One user recording decoded once to 16 kHz mono 16-bit PCM, held in memory.
+
+    `content_hash` matches transcription_cache.audio_content_hash for the same
+    audio, `wav_bytes` is what gets persisted and backed up, and samples()
+    feeds the local Whisper model directly.
+    """
+
+    def __init__(self, pcm, content_hash, bytes_read):
+        self.pcm = pcm
+        self.content_hash = content_hash
+        self.bytes_read = bytes_read
+        self.bytes_written = 0
+        self._wav_bytes = None
+
+    @property
+    def duration_seconds(self):
+        return len(self.pcm) / (2 * PCM_SAMPLE_RATE)
+
+    @property
+    def wav_bytes(self):
+        if self._wav_bytes is None:
+            out = BytesIO()
+            with wave.open(out, 'wb') as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(PCM_SAMPLE_RATE)
+                w.writeframes(self.pcm)
+            self._wav_bytes = out.getvalue()
+        return self._wav_bytes
+
+    def samples(self):
+        """Float32 samples in [-1, 1], the array form whisper's transcribe() accepts."""
+        import numpy as np
+        return np.frombuffer(self.pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def trimmed(self, **vad_options):
+        """Copy with silence removed by vad.trim_silence, for transcription only.
+
+        Keeps this recording's content_hash so transcript cache entries stay
+        keyed by the original audio. Returns (audio, vad_info).
+        """
+        import numpy as np
+        from vad import trim_silence
+
+        samples, info = trim_silence(np.frombuffer(self.pcm, dtype=np.int16), PCM_SAMPLE_RATE, **vad_options)
+        if not info['trimmed_seconds']:
+            return self, info
+        return IngestedAudio(samples.tobytes(), self.content_hash, 0), info
+
+    def save(self, path):
+        """Write the WAV to `path` atomically; the only disk write of the turn."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(self.wav_bytes)
+        os.replace(tmp, path)
+        self.bytes_written += len(self.wav_bytes)
+        return path
+
+
+def ingest_upload(stream, chunk_bytes=INGEST_CHUNK_BYTES):
+    """Decode an uploaded audio stream (any container ffmpeg reads) in a single pass.
+
+    The upload is piped into ffmpeg as it is read and the resampled PCM is
+    hashed as it comes out, so nothing touches disk. Raises RuntimeError if
+    ffmpeg is missing or cannot decode the input; `raw` on the error holds the
+    bytes consumed so the caller can still save them.
+    """
+    binary = shutil.which('ffmpeg')
+    if not binary:
+        raise RuntimeError('ffmpeg is not installed')
+    proc = subprocess.Popen(
+        [binary, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+         '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(PCM_SAMPLE_RATE), 'pipe:1'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    raw = BytesIO()
+
+    def feed():
+        try:
+            while True:
+                chunk = stream.read(chunk_bytes)
+                if not chunk:
+                    break
+                raw.write(chunk)
+                proc.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    errors = []
+    writer = threading.Thread(target=feed, daemon=True)
+    reader = threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)
+    writer.start()
+    reader.start()
+
+    digest = hashlib.sha256()
+    pcm = BytesIO()
+    while True:
+        chunk = proc.stdout.read(chunk_bytes)
+        if not chunk:
+            break
+        digest.update(chunk)
+        pcm.write(chunk)
+    writer.join()
+    reader.join()
+    returncode = proc.wait()
+
+    if returncode != 0 or not pcm.tell():
+        message = (errors[0] if errors else b'').decode('utf-8', 'replace').strip()
+        error = RuntimeError(f"ffmpeg could not decode upload: {message or f'exit code {returncode}'}")
+        error.raw = raw.getvalue()
+        raise error
+    return IngestedAudio(pcm.getvalue(), 'pcm:' + digest.hexdigest(), raw.tell())
+
+
+class StreamingDecoder:
+    """Incremental decode of a recording that arrives in pieces (MediaRecorder timeslices).
+
+    One ffmpeg process lives for the whole recording: write() pipes each new
+    piece into it and a reader thread collects the PCM it emits, so each byte
+    is decoded once no matter how often the audio so far is read. close()
+    ends the input and waits for the remaining PCM.
+    """
+
+    def __init__(self, chunk_bytes=INGEST_CHUNK_BYTES):
+        binary = shutil.which('ffmpeg')
+        if not binary:
+            raise RuntimeError('ffmpeg is not installed')
+        # Small probe and flushed packets so PCM comes out while input is still arriving.
+        self.proc = subprocess.Popen(
+            [binary, '-hide_banner', '-loglevel', 'error', '-probesize', '32768', '-analyzeduration', '0',
+             '-i', 'pipe:0', '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(PCM_SAMPLE_RATE),
+             '-flush_packets', '1', 'pipe:1'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self.bytes_read = 0
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, args=(chunk_bytes,), daemon=True)
+        self._reader.start()
+
+    def _read(self, chunk_bytes):
+        while True:
+            chunk = self.proc.stdout.read1(chunk_bytes)
+            if not chunk:
+                return
+            with self._lock:
+                self._pcm.extend(chunk)
+
+    def write(self, data):
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+        self.bytes_read += len(data)
+
+    @property
+    def pcm_bytes(self):
+        with self._lock:
+            return len(self._pcm)
+
+    def pcm(self, start=0):
+        """PCM decoded so far, from byte offset `start`."""
+        with self._lock:
+            return bytes(self._pcm[start:])
+
+    def close(self, timeout=30):
+        """End the input and wait for ffmpeg to drain. Raises RuntimeError if it produced nothing."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self._reader.join(timeout)
+        try:
+            returncode = self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+            raise RuntimeError('ffmpeg did not finish decoding the recording')
+        if returncode != 0 and not self.pcm_bytes:
+            raise RuntimeError(f"ffmpeg could not decode recording: exit code {returncode}")
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(5)
+        except Exception:
+            pass
+
+
+class IngestMetrics:
+    """Bytes read from the upload and written to disk per submit_message turn."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.fallback_turns = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.last_turn = None
+
+    def record(self, bytes_read, bytes_written, audio_seconds=None, fallback=False):
+        with self._lock:
+            self.turns += 1
+            self.fallback_turns += int(fallback)
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+            self.last_turn = {
+                'bytes_read': bytes_read,
+                'bytes_written': bytes_written,
+                'audio_seconds': round(audio_seconds, 2) if audio_seconds is not None else None,
+                'fallback': fallback,
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'turns': self.turns,
+                'fallback_turns': self.fallback_turns,
+                'bytes_read': self.bytes_read,
+                'bytes_written': self.bytes_written,
+                'avg_bytes_read': self.bytes_read // self.turns if self.turns else 0,
+                'avg_bytes_written': self.bytes_written // self.turns if self.turns else 0,
+                'last_turn': self.last_turn,
+            }
@@ -0,0 +1,106 @@
+"""Disk traffic and time for ingesting one user recording, old path vs single-pass ingest.
+
+Generates a speech-length Opus/WebM clip (what the browser uploads) with
+ffmpeg, then runs both pipelines on it:
+
+  old: save upload -> AudioSegment.from_file -> export WAV over it ->
+       decode again for the transcript cache hash -> read for the Whisper
+       API -> read for backup -> write backup copy -> read for Supabase
+  new: audio_ingest.ingest_upload on the upload stream -> one WAV write;
+       transcriber and backup use the in-memory buffer
+
+and reports bytes read from / written to disk and wall time per turn.
+The transcription and upload calls themselves are not made.
+
+Usage: python benchmarks/bench_ingest.py [--seconds 20] [--runs 5]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from audio_ingest import ingest_upload  # noqa: E402
+from transcription_cache import audio_content_hash  # noqa: E402
+
+
+def make_clip(path, seconds):
+    subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+         '-f', 'lavfi', '-i', f'sine=frequency=220:duration={seconds}:sample_rate=48000',
+         '-c:a', 'libopus', '-b:a', '32k', path],
+        check=True
+    )
+
+
+def old_pipeline(upload, workdir):
+    from pydub import AudioSegment
+
+    read = written = 0
+    audio_path = os.path.join(workdir, 'user.wav')
+    with open(audio_path, 'wb') as f:           # audio_file.save
+        f.write(upload)
+    written += len(upload)
+    audio = AudioSegment.from_file(audio_path)  # re-read the upload
+    read += len(upload)
+    audio.set_frame_rate(16000).set_channels(1).set_sample_width(2).export(audio_path, format='wav')
+    wav_size = os.path.getsize(audio_path)
+    written += wav_size
+    audio_content_hash(audio_path)              # speech_to_text: decode for cache key
+    read += wav_size
+    with open(audio_path, 'rb') as f:           # speech_to_text: body for the Whisper API
+        f.read()
+    read += wav_size
+    with open(audio_path, 'rb') as f:           # submit_message: read for backup
+        data = f.read()
+    read += wav_size
+    backup_path = os.path.join(workdir, 'backup.wav')
+    with open(backup_path, 'wb') as f:          # save_audio_with_cloud_backup: second copy
+        f.write(data)
+    written += wav_size
+    with open(backup_path, 'rb') as f:          # upload_file_to_supabase
+        f.read()
+    read += wav_size
+    return read, written
+
+
+def new_pipeline(upload, workdir):
+    ingested = ingest_upload(BytesIO(upload))
+    ingested.save(os.path.join(workdir, 'user.wav'))
+    ingested.wav_bytes                          # Whisper API body and backup upload, from memory
+    return 0, ingested.bytes_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    if not shutil.which('ffmpeg'):
+        sys.exit('ffmpeg is required')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        clip = os.path.join(workdir, 'upload.webm')
+        make_clip(clip, args.seconds)
+        with open(clip, 'rb') as f:
+            upload = f.read()
+        print(f"upload: {len(upload)} bytes ({args.seconds:.0f}s Opus/WebM)\n")
+        print(f"{'pipeline':<8} {'disk read':>12} {'disk written':>13} {'median time':>12}")
+        for name, pipeline in (('old', old_pipeline), ('new', new_pipeline)):
+            times = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                read, written = pipeline(upload, workdir)
+                times.append(time.perf_counter() - start)
+            print(f"{name:<8} {read:>12} {written:>13} {statistics.median(times) * 1000:>10.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Similarity scoring cost across transcript lengths: SequenceMatcher baseline vs similarity.py.
+
+For every concept in concepts.json the script builds explanations of
+increasing length: the golden answer itself, copies with a growing share of
+words dropped or swapped (around the 0.8 threshold), unrelated text, and
+rambling transcripts that repeat the golden answer's words among filler up
+to --max-chars. Each is scored with the pre-engine logic
+(max(SequenceMatcher ratio, word Jaccard) >= 0.8) and with
+similarity.score_explanation, and the script reports time per call by
+length bucket, how the engine settled each score, and every case where the
+two disagree on the fast-path (EXCELLENT) decision. Exits non-zero on any
+disagreement.
+
+Usage: python benchmarks/bench_similarity.py [--max-chars 32000] [--repeats 5]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from concept_index import ConceptIndex, normalize_text  # noqa: E402
+from similarity import EXCELLENT_THRESHOLD, score_explanation  # noqa: E402
+
+FILLER = ("um so basically I think that like you know the thing is that it kind of depends on "
+          "what we were talking about earlier in the lecture and sort of how it all fits together").split()
+UNRELATED = ("the weather was nice yesterday and we went to the park to play football with friends "
+             "before going home for dinner and watching a film about space travel").split()
+BUCKETS = (100, 400, 1000, 4000, 16000, 64000)
+
+
+def baseline_score(user_message, golden_answer):
+    user_norm, golden_norm = normalize_text(user_message), normalize_text(golden_answer)
+    try:
+        char_ratio = SequenceMatcher(None, user_norm, golden_norm).ratio()
+    except Exception:
+        char_ratio = 0.0
+    a, b = set(user_norm.split()), set(golden_norm.split())
+    word_ratio = len(a & b) / len(a | b) if (a or b) else 0.0
+    return max(char_ratio, word_ratio)
+
+
+def explanations(golden, rng, max_chars):
+    words = golden.split()
+    cases = [('golden', golden), ('golden_lower', golden.lower())]
+    for share in (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4):
+        kept = [w for w in words if rng.random() > share]
+        cases.append((f'dropped_{int(share * 100)}', ' '.join(kept)))
+        swapped = [rng.choice(FILLER) if rng.random() < share else w for w in words]
+        cases.append((f'swapped_{int(share * 100)}', ' '.join(swapped)))
+    cases.append(('unrelated', ' '.join(rng.choice(UNRELATED) for _ in range(40))))
+    cases.append(('golden_twice', golden + ' ' + golden))
+    length = 200
+    while length <= max_chars:
+        out = []
+        while sum(len(w) + 1 for w in out) < length:
+            out.append(rng.choice(words) if rng.random() < 0.5 else rng.choice(FILLER))
+        cases.append((f'rambling_{length}', ' '.join(out)))
+        length *= 2
+    return cases
+
+
+def bucket(chars):
+    return next((b for b in BUCKETS if chars <= b), BUCKETS[-1])
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        value = fn()
+    return value, (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-chars', type=int, default=32000)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'concepts.json'), 'r') as f:
+        index = ConceptIndex(json.load(f)['concepts'])
+    rng = random.Random(args.seed)
+
+    rows = defaultdict(lambda: {'n': 0, 'base': 0.0, 'engine': 0.0, 'paths': Counter()})
+    mismatches = []
+    decisions = Counter()
+    for concept in index.entries:
+        for name, text in explanations(concept.golden_answer, rng, args.max_chars):
+            expected, base_seconds = timed(lambda: baseline_score(text, concept.golden_answer), args.repeats)
+            result, engine_seconds = timed(
+                lambda: score_explanation(normalize_text(text), concept), args.repeats)
+            before, after = expected >= EXCELLENT_THRESHOLD, result['score'] >= EXCELLENT_THRESHOLD
+            decisions[before] += 1
+            if before != after:
+                mismatches.append((concept.name, name, len(text), round(expected, 4), round(result['score'], 4)))
+            row = rows[bucket(len(text))]
+            row['n'] += 1
+            row['base'] += base_seconds
+            row['engine'] += engine_seconds
+            row['paths'][result['path']] += 1
+
+    print(f"{'chars <=':>9} {'cases':>6} {'baseline ms':>12} {'engine ms':>10} {'speedup':>8}  paths")
+    for size in sorted(rows):
+        row = rows[size]
+        base_ms, engine_ms = 1000 * row['base'] / row['n'], 1000 * row['engine'] / row['n']
+        paths = ', '.join(f"{p}={c}" for p, c in row['paths'].most_common())
+        print(f"{size:>9} {row['n']:>6} {base_ms:>12.3f} {engine_ms:>10.3f} {base_ms / max(engine_ms, 1e-9):>7.1f}x  {paths}")
+
+    total = sum(decisions.values())
+    print(f"\n{total} explanations, {decisions[True]} on the EXCELLENT fast path; "
+          f"{len(mismatches)} decision mismatches")
+    for concept_name, name, chars, expected, got in mismatches:
+        print(f"  MISMATCH {concept_name} {name} ({chars} chars): baseline {expected}, engine {got}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
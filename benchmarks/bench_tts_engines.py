@@ -0,0 +1,90 @@
+"""Compare TTS engines on the project's real prompts.
+
+Renders the intro, every concept intro and every golden answer from
+concepts.json with each available backend (OpenAI needs OPENAI_API_KEY,
+gTTS needs network, espeak needs espeak-ng installed) and reports
+time-to-first-byte, total synthesis time and output size per engine.
+
+Usage: python benchmarks/bench_tts_engines.py [--engines openai,gtts,espeak] [--format mp3] [--runs 1]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from audio_assets import INTRO_TEXT, concept_intro_text  # noqa: E402
+from tts_engines import build_tts_router  # noqa: E402
+from tts_jobs import AudioStream  # noqa: E402
+
+
+def load_prompts():
+    with open(os.path.join(ROOT, 'concepts.json'), 'r') as f:
+        concepts = json.load(f)['concepts']
+    prompts = [('intro', INTRO_TEXT)]
+    prompts += [(f"concept_intro:{c['name']}", concept_intro_text(c['name'])) for c in concepts]
+    prompts += [(f"golden_answer:{c['name']}", c['golden_answer']) for c in concepts]
+    return prompts
+
+
+def measure(backend, text, fmt):
+    stream = AudioStream()
+    first = {}
+    write = stream.write
+
+    def timed_write(data):
+        first.setdefault('t', time.perf_counter())
+        return write(data)
+
+    stream.write = timed_write
+    start = time.perf_counter()
+    audio_bytes, _ = backend.synthesize(text, fmt=fmt, stream=stream)
+    end = time.perf_counter()
+    return first.get('t', end) - start, end - start, len(audio_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', default='openai,gtts,espeak')
+    parser.add_argument('--format', default='mp3')
+    parser.add_argument('--runs', type=int, default=1)
+    args = parser.parse_args()
+
+    pool = ThreadPoolExecutor(max_workers=4)
+    router = build_tts_router(pool, order=args.engines, selection='fixed')
+    prompts = load_prompts()
+    print(f"{len(prompts)} prompts, {sum(len(t) for _, t in prompts)} chars, format={args.format}\n")
+    print(f"{'engine':<8} {'ok':>4} {'fail':>4} {'ttfb med':>10} {'total med':>10} {'total max':>10} {'KB/prompt':>10}")
+
+    for backend in router.backends:
+        if not backend.available():
+            print(f"{backend.name:<8} skipped (not available)")
+            continue
+        ttfbs, totals, sizes, failures = [], [], [], 0
+        for _ in range(args.runs):
+            for _, text in prompts:
+                try:
+                    ttfb, total, size = measure(backend, text, args.format)
+                except Exception as e:
+                    failures += 1
+                    print(f"  {backend.name} failed: {e}")
+                    continue
+                ttfbs.append(ttfb)
+                totals.append(total)
+                sizes.append(size)
+        if not totals:
+            print(f"{backend.name:<8} {0:>4} {failures:>4}")
+            continue
+        print(f"{backend.name:<8} {len(totals):>4} {failures:>4} "
+              f"{statistics.median(ttfbs) * 1000:>8.0f}ms {statistics.median(totals) * 1000:>8.0f}ms "
+              f"{max(totals) * 1000:>8.0f}ms {statistics.mean(sizes) / 1024:>10.1f}")
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Time-to-first-byte of /synthesize audio, buffered vs streamed.
+
+Starts a local fake TTS server that emits an MP3-sized body in chunks with a
+delay between them (like a TTS engine producing audio progressively), then
+measures when the first audio bytes become available to the response:
+
+- before: requests.post(..., stream=True).content (the old synthesize_with_openai)
+- after:  tts_engines.synthesize_with_openai writing into a TTSJob stream
+
+Usage: python benchmarks/bench_tts_streaming.py [--chunks 20] [--chunk-delay 0.05] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_handler(chunks, chunk_bytes, chunk_delay):
+    class FakeTTSHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(200)
+            self.send_header('Content-Type', 'audio/mpeg')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for _ in range(chunks):
+                time.sleep(chunk_delay)
+                data = b'\xff' * chunk_bytes
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    return FakeTTSHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=20)
+    parser.add_argument('--chunk-bytes', type=int, default=4096)
+    parser.add_argument('--chunk-delay', type=float, default=0.05)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.chunks, args.chunk_bytes, args.chunk_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/audio/speech"
+
+    os.environ['OPENAI_TTS_URL'] = url
+    os.environ.setdefault('OPENAI_API_KEY', 'bench')
+    import requests
+    import tts_engines
+    from tts_jobs import TTSJobRegistry, tts_job_key
+    tts_engines.OPENAI_TTS_URL = url
+
+    def buffered():
+        start = time.perf_counter()
+        resp = requests.post(url, json={'input': 'x'}, stream=True, timeout=60)
+        resp.raise_for_status()
+        body = resp.content
+        return time.perf_counter() - start, len(body)
+
+    executor = ThreadPoolExecutor(max_workers=2)
+
+    def streamed(run):
+        registry = TTSJobRegistry()
+        start = time.perf_counter()
+        job, _ = registry.start(tts_job_key(f"bench {run}"), tts_engines.synthesize_with_openai,
+                                f"bench {run}", executor=executor)
+        chunks = job.stream.iter_chunks(timeout=60)
+        first = next(chunks)
+        ttfb = time.perf_counter() - start
+        total = len(first) + sum(len(c) for c in chunks)
+        return ttfb, total
+
+    before = [buffered() for _ in range(args.runs)]
+    after = [streamed(i) for i in range(args.runs)]
+    server.shutdown()
+
+    body_bytes = args.chunks * args.chunk_bytes
+    print(f"fake TTS: {args.chunks} chunks x {args.chunk_bytes} B, {args.chunk_delay * 1000:.0f} ms apart ({body_bytes} B)")
+    print(f"before (buffered) time-to-first-byte: median {statistics.median(t for t, _ in before) * 1000:.1f} ms")
+    print(f"after  (streamed) time-to-first-byte: median {statistics.median(t for t, _ in after) * 1000:.1f} ms")
+    assert all(n == body_bytes for _, n in before + after), 'body size mismatch'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Effect of voice activity trimming on STT upload size and latency.
+
+Fixtures are the archived participant recordings (uploads/User Data/**/user_*.wav,
+16 kHz mono WAV as saved by submit_message) or any WAV files passed with
+--files. Without either, synthetic recordings are built: speech-like bursts
+with the leading/trailing silence and mid-answer pauses typical of the
+study (2-4 s before speaking, 3-5 s after, one long pause), over room noise.
+
+For each fixture the script reports the VAD time, duration and WAV size
+before and after trimming, and, with --stt local|openai, the transcription
+latency of the full and trimmed audio.
+
+Usage: python benchmarks/bench_vad.py [--files a.wav b.wav] [--max-pause-ms 700] [--stt none|local|openai]
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+import wave
+from io import BytesIO
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from vad import trim_silence  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as w:
+        if w.getsampwidth() != 2:
+            raise ValueError('16-bit WAV required')
+        samples = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+        if w.getnchannels() > 1:
+            samples = samples.reshape(-1, w.getnchannels()).mean(axis=1).astype(np.int16)
+        if w.getframerate() != SAMPLE_RATE:
+            positions = np.arange(0, len(samples), w.getframerate() / SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    return samples
+
+
+def to_wav(samples):
+    out = BytesIO()
+    with wave.open(out, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(samples.astype(np.int16).tobytes())
+    return out.getvalue()
+
+
+def synthetic_fixtures(count=6, seed=7):
+    rng = np.random.default_rng(seed)
+
+    def noise(seconds):
+        return rng.normal(0, 40, int(seconds * SAMPLE_RATE))
+
+    def speech(seconds):
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        syllables = (0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 5) * t)) ** 2
+        pitch = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        return 4000 * syllables * voiced + noise(seconds)
+
+    fixtures = []
+    for i in range(count):
+        parts = [noise(rng.uniform(2, 4)), speech(rng.uniform(6, 15)), noise(rng.uniform(1.5, 3)),
+                 speech(rng.uniform(4, 10)), noise(rng.uniform(3, 5))]
+        fixtures.append((f'synthetic_{i}', np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)))
+    return fixtures
+
+
+def make_transcriber(kind):
+    if kind == 'local':
+        from local_whisper import LocalWhisperModel
+        model = LocalWhisperModel(model_size=os.environ.get('WHISPER_MODEL_SIZE', 'small'))
+        if model.get() is None:
+            sys.exit('Local Whisper model could not be loaded')
+        return lambda samples: model.transcribe(samples.astype(np.float32) / 32768.0, language='en', fp16=False)
+    if kind == 'openai':
+        import openai
+        openai.api_key = os.environ.get('OPENAI_API_KEY')
+        if not openai.api_key:
+            sys.exit('OPENAI_API_KEY is required for --stt openai')
+        return lambda samples: openai.Audio.transcribe_raw('whisper-1', to_wav(samples), 'clip.wav', language='en')
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', nargs='*')
+    parser.add_argument('--max-pause-ms', type=int, default=0)
+    parser.add_argument('--stt', choices=['none', 'local', 'openai'], default='none')
+    args = parser.parse_args()
+
+    paths = args.files if args.files is not None else glob.glob(
+        os.path.join(ROOT, 'uploads', 'User Data', '**', 'user_*.wav'), recursive=True)
+    fixtures = []
+    for path in paths:
+        try:
+            fixtures.append((os.path.basename(path), read_wav(path)))
+        except Exception as e:
+            print(f"skipping {path}: {e}")
+    if not fixtures:
+        print('No recordings found, using synthetic fixtures\n')
+        fixtures = synthetic_fixtures()
+    transcribe = make_transcriber(args.stt)
+
+    print(f"{'fixture':<28} {'vad ms':>7} {'orig s':>7} {'trim s':>7} {'orig KB':>8} {'trim KB':>8}"
+          + (f" {'stt orig':>9} {'stt trim':>9}" if transcribe else ''))
+    totals = {'orig_s': [], 'trim_s': [], 'orig_kb': [], 'trim_kb': [], 'stt_orig': [], 'stt_trim': []}
+    for name, samples in fixtures:
+        start = time.perf_counter()
+        trimmed, info = trim_silence(samples, SAMPLE_RATE, max_pause_ms=args.max_pause_ms)
+        vad_ms = (time.perf_counter() - start) * 1000
+        orig_kb, trim_kb = len(to_wav(samples)) / 1024, len(to_wav(trimmed)) / 1024
+        row = f"{name[:28]:<28} {vad_ms:>7.1f} {info['original_seconds']:>7.1f} {info['speech_seconds']:>7.1f} " \
+              f"{orig_kb:>8.0f} {trim_kb:>8.0f}"
+        totals['orig_s'].append(info['original_seconds'])
+        totals['trim_s'].append(info['speech_seconds'])
+        totals['orig_kb'].append(orig_kb)
+        totals['trim_kb'].append(trim_kb)
+        if transcribe:
+            for key, clip in (('stt_orig', samples), ('stt_trim', trimmed)):
+                start = time.perf_counter()
+                transcribe(clip)
+                totals[key].append(time.perf_counter() - start)
+            row += f" {totals['stt_orig'][-1]:>8.2f}s {totals['stt_trim'][-1]:>8.2f}s"
+        print(row)
+
+    saved = 1 - sum(totals['trim_kb']) / sum(totals['orig_kb'])
+    print(f"\naudio sent to STT: {sum(totals['orig_s']):.0f}s -> {sum(totals['trim_s']):.0f}s "
+          f"({saved:.0%} smaller upload)")
+    if transcribe:
+        print(f"median STT latency: {statistics.median(totals['stt_orig']):.2f}s -> "
+              f"{statistics.median(totals['stt_trim']):.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Load test: per-request local Whisper calls vs the micro-batching worker.
+
+N client threads each transcribe clips back to back for a fixed number of
+requests, either calling LocalWhisperModel.transcribe directly (the
+per-request path) or through WhisperBatchWorker. Reports throughput and
+latency percentiles per concurrency level.
+
+Clips are archived participant recordings (uploads/User Data/**/user_*.wav)
+or, with none available, 5-20 s synthetic clips (throughput only; the text
+is meaningless).
+
+Usage: python benchmarks/bench_whisper_batching.py [--model tiny] [--concurrency 1,4,8,16]
+       [--requests 32] [--max-batch 8] [--max-wait-ms 50]
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_vad import read_wav, synthetic_fixtures  # noqa: E402
+from local_whisper import LocalWhisperModel  # noqa: E402
+from whisper_batch import WhisperBatchWorker  # noqa: E402
+
+
+def load_clips(limit=16):
+    clips = []
+    for path in glob.glob(os.path.join(ROOT, 'uploads', 'User Data', '**', 'user_*.wav'), recursive=True)[:limit]:
+        try:
+            clips.append(read_wav(path))
+        except Exception:
+            pass
+    if not clips:
+        rng = np.random.default_rng(3)
+        clips = [samples[:int(rng.uniform(5, 20) * 16000)] for _, samples in synthetic_fixtures(limit)]
+    return [c.astype(np.float32) / 32768.0 for c in clips]
+
+
+def run(transcribe, clips, concurrency, requests):
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        transcribe(clips[i % len(clips)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'throughput': requests / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.environ.get('WHISPER_MODEL_SIZE', 'small'))
+    parser.add_argument('--concurrency', default='1,4,8,16')
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    model = LocalWhisperModel(model_size=args.model)
+    if not model.warmup():
+        sys.exit(f"Could not load Whisper model '{args.model}': {model.error}")
+    worker = WhisperBatchWorker(model.decode_batch, max_batch_size=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    clips = load_clips()
+    print(f"model={args.model} clips={len(clips)} requests={args.requests} "
+          f"max_batch={args.max_batch} max_wait={args.max_wait_ms}ms\n")
+    print(f"{'clients':>7} {'mode':<10} {'clips/s':>8} {'p50 s':>7} {'p95 s':>7}")
+
+    modes = {
+        'direct': lambda clip: model.transcribe(clip, language='en', fp16=False),
+        'batched': lambda clip: worker.transcribe(clip),
+    }
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        for mode, transcribe in modes.items():
+            result = run(transcribe, clips, concurrency, args.requests)
+            print(f"{concurrency:>7} {mode:<10} {result['throughput']:>8.2f} {result['p50']:>7.2f} {result['p95']:>7.2f}")
+    print(f"\nbatch worker: {worker.stats()}")
+
+
+if __name__ == '__main__':
+    main()
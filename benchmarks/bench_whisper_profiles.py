@@ -0,0 +1,144 @@
+"""Real-time factor and word error rate of each local Whisper inference profile.
+
+Fixtures are WAV files with a same-named .txt reference transcript in
+benchmarks/fixtures/ (or --fixtures DIR). None are committed (the directory
+is gitignored); real participant-style recordings give the meaningful WER.
+If the directory is empty, fixtures are rendered once from the project's own
+prompts (the intro, every concept intro and every golden answer in
+concepts.json) with the first available TTS engine and kept there, so later
+runs on the same machine compare on the same audio. Synthetic speech is far
+cleaner than a participant's microphone, so treat WER on it as a lower bound.
+
+For each profile the script loads the model (load time reported separately),
+transcribes every fixture and reports RTF (transcription time / audio
+duration, lower is faster) and WER (word-level edit distance over the
+reference length, after lowercasing and dropping punctuation).
+
+Usage: python benchmarks/bench_whisper_profiles.py [--profiles fast,balanced,accurate]
+       [--fixtures DIR] [--engines espeak,gtts,openai] [--threads N]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_vad import SAMPLE_RATE, read_wav, to_wav  # noqa: E402
+from local_whisper import WHISPER_PROFILES, LocalWhisperModel  # noqa: E402
+
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+def render_fixtures(directory, engines):
+    from audio_assets import INTRO_TEXT, concept_intro_text
+    from tts_engines import build_tts_router
+
+    with open(os.path.join(ROOT, 'concepts.json'), 'r') as f:
+        concepts = json.load(f)['concepts']
+    prompts = [('intro', INTRO_TEXT)]
+    prompts += [(f"concept_intro_{c['name']}", concept_intro_text(c['name'])) for c in concepts]
+    prompts += [(f"golden_answer_{c['name']}", c['golden_answer']) for c in concepts]
+
+    router = build_tts_router(ThreadPoolExecutor(max_workers=4), order=engines, selection='fixed')
+    backend = next((b for b in router.ordered() if b.available()), None)
+    if backend is None:
+        sys.exit(f"No TTS engine available to render fixtures (tried {engines})")
+    os.makedirs(directory, exist_ok=True)
+    for name, text in prompts:
+        slug = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+        audio_bytes, _ = backend.synthesize(text, fmt='wav')
+        tmp = os.path.join(directory, f'{slug}.tmp.wav')
+        with open(tmp, 'wb') as f:
+            f.write(audio_bytes)
+        # Normalise to the 16 kHz mono 16-bit layout the app transcribes.
+        samples = read_wav(tmp)
+        os.remove(tmp)
+        with open(os.path.join(directory, f'{slug}.wav'), 'wb') as f:
+            f.write(to_wav(samples))
+        with open(os.path.join(directory, f'{slug}.txt'), 'w') as f:
+            f.write(text)
+    print(f"Rendered {len(prompts)} fixtures with {backend.name} into {directory}\n")
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        txt_path = os.path.splitext(wav_path)[0] + '.txt'
+        if not os.path.exists(txt_path):
+            continue
+        with open(txt_path, 'r') as f:
+            reference = f.read()
+        samples = read_wav(wav_path).astype(np.float32) / 32768.0
+        fixtures.append((os.path.basename(wav_path), samples, reference))
+    return fixtures
+
+
+def normalize_words(text):
+    return re.sub(r"[^a-z0-9' ]+", ' ', (text or '').lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """(edit distance in words, reference word count)."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default=','.join(WHISPER_PROFILES))
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--engines', default='espeak,gtts,openai')
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        os.environ['WHISPER_THREADS'] = str(args.threads)
+    if not load_fixtures(args.fixtures):
+        render_fixtures(args.fixtures, args.engines)
+    fixtures = load_fixtures(args.fixtures)
+    audio_seconds = sum(len(samples) for _, samples, _ in fixtures) / SAMPLE_RATE
+    print(f"fixtures={len(fixtures)} audio={audio_seconds:.0f}s threads={args.threads or 'torch default'}\n")
+    print(f"{'profile':<10} {'model':<7} {'int8':<5} {'load s':>7} {'RTF':>6} {'p95 RTF':>8} {'WER':>6}")
+
+    for name in args.profiles.split(','):
+        model = LocalWhisperModel(profile=name)
+        start = time.perf_counter()
+        if model.get() is None:
+            print(f"{name:<10} could not load model: {model.error}")
+            continue
+        load_seconds = time.perf_counter() - start
+        model.transcribe(fixtures[0][1], language='en')  # warm up
+
+        rtfs, errors, words, busy = [], 0, 0, 0.0
+        for _, samples, reference in fixtures:
+            start = time.perf_counter()
+            result = model.transcribe(samples, language='en')
+            elapsed = time.perf_counter() - start
+            busy += elapsed
+            rtfs.append(elapsed / (len(samples) / SAMPLE_RATE))
+            e, n = word_errors(reference, (result or {}).get('text', ''))
+            errors += e
+            words += n
+        rtfs.sort()
+        p95 = rtfs[min(len(rtfs) - 1, int(len(rtfs) * 0.95))]
+        print(f"{name:<10} {model.model_size:<7} {str(model.profile['quantize']).lower():<5} {load_seconds:>7.1f} "
+              f"{busy / audio_seconds:>6.3f} {p95:>8.3f} {errors / max(words, 1):>6.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Measure per-worker memory of the app under gunicorn, with and without pre-fork Whisper loading.
+
+For each worker count (default 1, 4 and 8) and each mode (WHISPER_PREFORK=0
+and 1) this starts gunicorn, waits until /ready answers and the workers'
+memory settles, then reads /proc/<pid>/smaps_rollup for every worker:
+
+  rss  resident set size (counts shared pages in full)
+  uss  unique set size = Private_Clean + Private_Dirty, the memory that
+       would be freed if the worker exited
+  pss  proportional set size (shared pages divided among the sharers)
+
+With pre-fork loading the Whisper weights live in the master and are shared
+copy-on-write, so per-worker USS should drop by roughly the model size.
+Linux only (needs /proc).
+
+Usage: python benchmarks/measure_worker_rss.py [--workers 1,4,8] [--port 8099] [--settle 20]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss_mb': fields.get('Rss', 0) / 1024,
+        'pss_mb': fields.get('Pss', 0) / 1024,
+        'uss_mb': (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024,
+    }
+
+
+def child_pids(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def wait_ready(port, workers, timeout):
+    """Wait until /ready has answered 200 several times in a row (requests spread over workers)."""
+    deadline = time.time() + timeout
+    streak = 0
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=5) as resp:
+                streak = streak + 1 if resp.status == 200 else 0
+        except Exception:
+            streak = 0
+        if streak >= workers * 3:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def measure(workers, prefork, port, settle, timeout):
+    env = dict(os.environ, WHISPER_PREFORK='1' if prefork else '0', WHISPER_PRELOAD='1',
+               PRERENDER_AUDIO_ON_BOOT='0')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--timeout', '600', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        ready = wait_ready(port, workers, timeout)
+        time.sleep(settle)
+        master = smaps_rollup(proc.pid)
+        per_worker = [smaps_rollup(pid) for pid in child_pids(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return ready, master, per_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,4,8')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--settle', type=float, default=20, help='seconds to wait after /ready before measuring')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds to wait for /ready')
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'prefork':>7} {'ready':>5} {'master rss':>11} {'worker uss avg':>15} "
+          f"{'worker pss avg':>15} {'worker rss avg':>15} {'total pss':>10}")
+    for workers in [int(n) for n in args.workers.split(',')]:
+        for prefork in (False, True):
+            ready, master, per_worker = measure(workers, prefork, args.port, args.settle, args.timeout)
+            if not per_worker:
+                print(f"{workers:>7} {str(prefork):>7} {str(ready):>5}  no worker processes found")
+                continue
+
+            def avg(key):
+                return sum(w[key] for w in per_worker) / len(per_worker)
+
+            total_pss = master['pss_mb'] + sum(w['pss_mb'] for w in per_worker)
+            print(f"{workers:>7} {str(prefork):>7} {str(ready):>5} {master['rss_mb']:>9.0f}MB "
+                  f"{avg('uss_mb'):>13.0f}MB {avg('pss_mb'):>13.0f}MB {avg('rss_mb'):>13.0f}MB {total_pss:>8.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+
+def normalize_text(text):
+    """Lowercase and drop everything but letters, digits and whitespace (generate_response's normalization)."""
+    return re.sub(r'[^a-z0-9\s]', '', (text or '').lower().strip())
+
+
+def word_ngrams(words, n=2):
+    return [' '.join(words[i:i + n]) for i in range(len(words) - n + 1)]
+
+
+def char_ngrams(normalized, n=3):
+    text = ' '.join(normalized.split())
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def tfidf_terms(words):
+    """Terms of a TF-IDF vector: words plus word bigrams."""
+    return words + word_ngrams(words, 2)
+
+
+def cosine(a, b):
+    """Cosine similarity of two L2-normalized sparse vectors (dicts)."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+class ConceptEntry:
+    """One concept with its golden answer preprocessed for scoring."""
+
+    def __init__(self, name, golden_answer, data=None):
+        self.name = name
+        self.golden_answer = golden_answer
+        self.data = data if data is not None else {'name': name, 'golden_answer': golden_answer}
+        self.normalized = normalize_text(golden_answer)
+        self.words = self.normalized.split()
+        self.tokens = set(self.words)
+        self.bigrams = set(word_ngrams(self.words, 2))
+        self.char_counts = Counter(self.normalized)
+        self.char_trigrams = char_ngrams(self.normalized, 3)
+        self.name_tokens = set(normalize_text(name).split())
+        # Set by the ConceptIndex the entry belongs to.
+        self.tfidf = {}
+        self.tfidf_index = None
+
+
+class ConceptIndex:
+    """The concepts from concepts.json with everything scoring needs precomputed.
+
+    Per concept: normalized golden answer, word/bigram sets, character and
+    character trigram counts and a TF-IDF vector (IDF over the golden answers), plus a
+    case-insensitive name map. `concepts` is the raw list as loaded.
+    """
+
+    def __init__(self, concepts, mtime=None):
+        self.concepts = concepts
+        self.mtime = mtime
+        self.entries = [ConceptEntry(c['name'], c.get('golden_answer', ''), c) for c in concepts]
+        self._by_name = {e.name: e for e in self.entries}
+        self._by_lower = {e.name.lower(): e for e in self.entries}
+
+        documents = len(self.entries)
+        df = Counter()
+        for entry in self.entries:
+            df.update(set(tfidf_terms(entry.words)))
+        self.idf = {term: math.log((1 + documents) / (1 + count)) + 1 for term, count in df.items()}
+        # Terms no golden answer uses get the largest IDF.
+        self.default_idf = math.log(1 + documents) + 1
+        for entry in self.entries:
+            entry.tfidf = self.vectorize(entry.words)
+            entry.tfidf_index = self
+
+    @property
+    def names(self):
+        return [e.name for e in self.entries]
+
+    def get(self, name):
+        """ConceptEntry by exact name, else case-insensitively; None if unknown."""
+        if not name:
+            return None
+        entry = self._by_name.get(name)
+        if entry is None:
+            entry = self._by_lower.get(name.strip().lower())
+        return entry
+
+    def vectorize(self, words):
+        """L2-normalized TF-IDF vector of a word list (see tfidf_terms)."""
+        counts = Counter(tfidf_terms(words))
+        vector = {term: count * self.idf.get(term, self.default_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return {term: w / norm for term, w in vector.items()} if norm else {}
+
+    def stats(self):
+        return {
+            'concepts': len(self.entries),
+            'vocabulary': len(self.idf),
+            'mtime': self.mtime,
+        }
+
+
+class ConceptStore:
+    """Serves the current ConceptIndex, rebuilding it when the concepts file changes.
+
+    `load()` returns the raw concept list; the file's mtime and size are
+    checked on every index() call, which costs one stat. If `load()` raises
+    on a rebuild (a half-written or broken edit), the error is logged and the
+    previous index stays in service until the file changes again. On the
+    first build, `fallback(error)` supplies the concepts instead, if given.
+    """
+
+    def __init__(self, path, load, fallback=None):
+        self.path = path
+        self._load = load
+        self._fallback = fallback
+        self._lock = threading.Lock()
+        self._index = None
+        self._signature = None
+        self.builds = 0
+        self.load_errors = 0
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def index(self):
+        signature = self._stat()
+        index = self._index
+        if index is not None and signature == self._signature:
+            return index
+        with self._lock:
+            signature = self._stat()
+            if self._index is None or signature != self._signature:
+                try:
+                    concepts = self._load()
+                except Exception as e:
+                    self.load_errors += 1
+                    if self._index is not None:
+                        print(f"Could not reload {self.path}, keeping the previous concepts: {e}")
+                        self._signature = signature
+                        return self._index
+                    if self._fallback is None:
+                        raise
+                    concepts = self._fallback(e)
+                signature = self._stat()
+                self._index = ConceptIndex(concepts, mtime=signature[0] / 1e9 if signature else None)
+                self._signature = signature
+                self.builds += 1
+                if self.builds > 1:
+                    print(f"{self.path} changed on disk, rebuilt concept index ({len(concepts)} concepts)")
+            return self._index
+
+    def stats(self):
+        out = self._index.stats() if self._index is not None else {}
+        out['builds'] = self.builds
+        out['load_errors'] = self.load_errors
+        return out
+
+
+def read_concepts(path):
+    with open(path, 'r') as f:
+        return json.load(f)['concepts']
@@ -60,4 +60,13 @@ class UserEvent(db.Model):
     session_id = db.Column(db.String(100), db.ForeignKey('sessions.session_id'), nullable=False)
     event_type = db.Column(db.String(50), nullable=False) 
     event_data = db.Column(db.JSON)  
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PendingTurnUpdate(db.Model):
+    __tablename__ = 'pending_turn_updates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    turn_id = db.Column(db.String(32), unique=True, nullable=False)
+    participant_id = db.Column(db.String(50), nullable=False, index=True)
+    session_update = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
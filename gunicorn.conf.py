@@ -0,0 +1,15 @@
+import os
+
+# Threaded workers: a streamed turn (/stream_submit_message) holds its request
+# until the reply audio is done, and the page fetches each sentence's
+# /synthesize audio meanwhile. With sync workers those fetches (and every
+# other request) would wait for the whole turn.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def on_starting(server):
+    """With WHISPER_PREFORK=1, load the local Whisper model in the master before workers fork."""
+    if os.environ.get('WHISPER_PREFORK', '0') == '1':
+        from local_whisper import prefork_load
+        prefork_load()
@@ -0,0 +1,247 @@
+import threading
+import time
+
+from audio_ingest import StreamingDecoder
+from transcription_cache import PCM_SAMPLE_RATE
+
+
+class LiveRecording:
+    """Buffer of MediaRecorder timeslices for one recording, plus its transcript so far.
+
+    The transcript is `committed_text` (segments that ended well before the
+    newest audio and will not be revisited) followed by `tail_text` (the
+    latest hypothesis for the audio after `committed_seconds`). Chunks are
+    fed, in order, to a StreamingDecoder started with the first one.
+    """
+
+    def __init__(self, recording_id, owner, decoder_factory=StreamingDecoder):
+        self.recording_id = recording_id
+        self.owner = owner
+        self.lock = threading.Lock()
+        self.decoder_factory = decoder_factory
+        self.decoder = None
+        self.decode_error = None
+        self.bytes_received = 0
+        self.pending = {}
+        self.next_seq = 0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.committed_text = ''
+        self.committed_seconds = 0.0
+        self.tail_text = ''
+        self.transcribed_seconds = 0.0
+        self.last_step_at = 0.0
+        self.step_running = False
+        self.step_done = threading.Event()
+        self.step_done.set()
+        self.finalized = False
+
+    def add_chunk(self, seq, data):
+        """Append chunks in sequence order; out-of-order ones wait in `pending`."""
+        with self.lock:
+            if seq < self.next_seq:
+                return
+            self.pending[seq] = data
+            self.bytes_received += len(data)
+            while self.next_seq in self.pending:
+                chunk = self.pending.pop(self.next_seq)
+                self.next_seq += 1
+                if self.decode_error is None:
+                    try:
+                        if self.decoder is None:
+                            self.decoder = self.decoder_factory()
+                        self.decoder.write(chunk)
+                    except Exception as e:
+                        # The recording is still uploaded; submit_message just won't get a live transcript.
+                        self.decode_error = str(e)
+                        self.close()
+            self.updated_at = time.time()
+
+    def close(self):
+        if self.decoder is not None:
+            self.decoder.kill()
+
+    @property
+    def transcript(self):
+        return f"{self.committed_text} {self.tail_text}".strip()
+
+
+class LiveTranscriber:
+    """Incremental local transcription of recordings uploaded in chunks while the user speaks.
+
+    Every `step_seconds` a background pass transcribes the audio decoded
+    since the committed point (decoding itself is incremental, see
+    StreamingDecoder). Once that window is
+    longer than `window_seconds`, segments ending more than `keep_seconds`
+    before its end are committed, so each pass (and the final one at
+    finalize()) only covers the last stretch of speech.
+
+    `transcribe(samples, **options)` runs the local Whisper model and `ready()`
+    says whether it is loaded; passes are skipped while it isn't, so an
+    unready model never blocks chunk uploads.
+    """
+
+    def __init__(self, transcribe, ready, pool, window_seconds=15.0, step_seconds=2.0, keep_seconds=5.0,
+                 max_recordings=32, max_bytes=20 * 1024 * 1024, ttl_seconds=600):
+        self.transcribe = transcribe
+        self.ready = ready
+        self.pool = pool
+        self.window_seconds = window_seconds
+        self.step_seconds = step_seconds
+        self.keep_seconds = keep_seconds
+        self.max_recordings = max_recordings
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._recordings = {}
+        self._counters = {
+            'recordings': 0, 'chunks': 0, 'steps': 0, 'step_failures': 0,
+            'finalized': 0, 'finalize_misses': 0, 'step_seconds_total': 0.0, 'final_tail_seconds_total': 0.0,
+        }
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def _prune_locked(self):
+        now = time.time()
+        for recording_id, rec in list(self._recordings.items()):
+            if now - rec.updated_at > self.ttl_seconds:
+                del self._recordings[recording_id]
+                rec.close()
+        while len(self._recordings) >= self.max_recordings:
+            oldest = min(self._recordings.values(), key=lambda r: r.updated_at)
+            del self._recordings[oldest.recording_id]
+            oldest.close()
+
+    def add_chunk(self, recording_id, owner, seq, data):
+        """Store one timeslice and schedule a transcription pass if one is due. Returns a status dict."""
+        with self._lock:
+            rec = self._recordings.get(recording_id)
+            if rec is None:
+                self._prune_locked()
+                rec = self._recordings[recording_id] = LiveRecording(recording_id, owner)
+                self._counters['recordings'] += 1
+        if rec.owner != owner:
+            raise PermissionError('Recording belongs to another participant')
+        if rec.finalized:
+            raise ValueError('Recording already submitted')
+        if rec.bytes_received + len(data) > self.max_bytes:
+            raise ValueError('Recording too large')
+        rec.add_chunk(seq, data)
+        self._count('chunks')
+        self._maybe_schedule(rec)
+        return {
+            'recording_id': recording_id,
+            'received_chunks': rec.next_seq,
+            'transcribed_seconds': round(rec.transcribed_seconds, 2),
+            'partial_transcript': rec.transcript,
+        }
+
+    def _maybe_schedule(self, rec):
+        if not self.ready():
+            return
+        with rec.lock:
+            if rec.finalized or rec.step_running or time.time() - rec.last_step_at < self.step_seconds:
+                return
+            rec.step_running = True
+            rec.step_done.clear()
+            rec.last_step_at = time.time()
+        self.pool.submit(self._run_step, rec)
+
+    def _run_step(self, rec):
+        try:
+            self._step(rec, final=False)
+        except Exception as e:
+            self._count('step_failures')
+            print(f"Live transcription step failed for {rec.recording_id}: {e}")
+        finally:
+            with rec.lock:
+                rec.step_running = False
+                rec.step_done.set()
+
+    def _step(self, rec, final):
+        """Transcribe the audio after the committed point; returns seconds of audio covered."""
+        import numpy as np
+
+        with rec.lock:
+            decoder = rec.decoder
+            committed_seconds = rec.committed_seconds
+            prompt = rec.committed_text[-200:]
+        if decoder is None:
+            return 0.0
+        if final:
+            decoder.close()
+        pcm = decoder.pcm(2 * int(committed_seconds * PCM_SAMPLE_RATE))
+        window = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        window_seconds = len(window) / PCM_SAMPLE_RATE
+        if window_seconds < 0.5:
+            return 0.0
+
+        start = time.perf_counter()
+        result = self.transcribe(
+            window, language='en', fp16=False,
+            initial_prompt=prompt or None, condition_on_previous_text=False
+        ) or {}
+        self._count('steps')
+        self._count('step_seconds_total', time.perf_counter() - start)
+
+        segments = result.get('segments') or []
+        if final:
+            commit, tail = segments, []
+        elif window_seconds > self.window_seconds:
+            cutoff = window_seconds - self.keep_seconds
+            commit = [s for s in segments if s['end'] <= cutoff]
+            tail = segments[len(commit):]
+        else:
+            commit, tail = [], segments
+
+        with rec.lock:
+            if commit:
+                rec.committed_text = f"{rec.committed_text} {' '.join(s['text'].strip() for s in commit)}".strip()
+                rec.committed_seconds = committed_seconds + commit[-1]['end']
+            rec.tail_text = ' '.join(s['text'].strip() for s in tail)
+            if final and not segments:
+                rec.tail_text = (result.get('text') or '').strip()
+            rec.transcribed_seconds = committed_seconds + window_seconds
+        return window_seconds
+
+    def finalize(self, recording_id, owner, timeout=30):
+        """Finish a recording: transcribe the remaining tail and return the full transcript.
+
+        Returns None (and the caller should transcribe the upload normally) if
+        the recording is unknown, incomplete, or the local model isn't ready.
+        """
+        with self._lock:
+            rec = self._recordings.pop(recording_id, None)
+        if rec is None or rec.owner != owner:
+            self._count('finalize_misses')
+            return None
+        with rec.lock:
+            rec.finalized = True
+            complete = not rec.pending and rec.decode_error is None
+        if not complete or not self.ready():
+            rec.close()
+            self._count('finalize_misses')
+            return None
+        rec.step_done.wait(timeout)
+        try:
+            tail_seconds = self._step(rec, final=True)
+        except Exception as e:
+            print(f"Live transcription finalize failed for {recording_id}: {e}")
+            rec.close()
+            self._count('finalize_misses')
+            return None
+        self._count('finalized')
+        self._count('final_tail_seconds_total', tail_seconds)
+        return rec.transcript or None
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out['active'] = len(self._recordings)
+        steps = out.pop('step_seconds_total')
+        tails = out.pop('final_tail_seconds_total')
+        out['avg_step_seconds'] = round(steps / out['steps'], 3) if out['steps'] else None
+        out['avg_final_tail_seconds'] = round(tails / out['finalized'], 2) if out['finalized'] else None
+        return out
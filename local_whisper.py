@@ -0,0 +1,275 @@
+import gc
+import os
+import threading
+import time
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Set in the gunicorn master by prefork_load(); inherited by every forked worker.
+_prefork_model = None
+
+# Named CPU inference profiles (WHISPER_PROFILE). `decode` holds transcribe()
+# options; 'standard' keeps whisper's own defaults at full precision (the
+# behaviour before profiles existed), 'accurate' is beam search with the full
+# temperature fallback and conditioning on previous text, the slowest and most
+# robust setting. Quantized profiles change transcripts, so they are opt-in.
+WHISPER_PROFILES = {
+    'standard': {
+        'model_size': 'small', 'quantize': False, 'threads': None,
+        'decode': {},
+    },
+    'fast': {
+        'model_size': 'base', 'quantize': True, 'threads': None,
+        'decode': {'beam_size': None, 'best_of': None, 'temperature': 0.0,
+                   'condition_on_previous_text': False},
+    },
+    'balanced': {
+        'model_size': 'small', 'quantize': True, 'threads': None,
+        'decode': {'beam_size': None, 'best_of': None, 'temperature': (0.0, 0.4, 0.8),
+                   'condition_on_previous_text': False},
+    },
+    'accurate': {
+        'model_size': 'small', 'quantize': False, 'threads': None,
+        'decode': {'beam_size': 5, 'best_of': 5, 'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                   'condition_on_previous_text': True},
+    },
+}
+DEFAULT_WHISPER_PROFILE = 'standard'
+
+
+def resolve_profile(name=None):
+    """Profile settings for `name` (default WHISPER_PROFILE), with WHISPER_MODEL_SIZE,
+    WHISPER_QUANTIZE and WHISPER_THREADS overriding the profile's values."""
+    name = name or os.environ.get('WHISPER_PROFILE', DEFAULT_WHISPER_PROFILE)
+    if name not in WHISPER_PROFILES:
+        print(f"Unknown Whisper profile '{name}', using '{DEFAULT_WHISPER_PROFILE}'")
+        name = DEFAULT_WHISPER_PROFILE
+    profile = dict(WHISPER_PROFILES[name], name=name)
+    profile['decode'] = dict(profile['decode'])
+    if os.environ.get('WHISPER_MODEL_SIZE'):
+        profile['model_size'] = os.environ['WHISPER_MODEL_SIZE']
+    if os.environ.get('WHISPER_QUANTIZE') in ('0', '1'):
+        profile['quantize'] = os.environ['WHISPER_QUANTIZE'] == '1'
+    if os.environ.get('WHISPER_THREADS'):
+        profile['threads'] = int(os.environ['WHISPER_THREADS'])
+    return profile
+
+
+def quantize_linear_int8(model):
+    """Dynamic int8 quantization of the model's Linear layers (int8 weights, activations quantized per call)."""
+    import torch
+
+    for module in model.modules():
+        # whisper.model.Linear only adds a dtype cast to nn.Linear, but quantize_dynamic
+        # swaps exact nn.Linear instances only.
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_whisper(model_size, quantize=False, threads=None):
+    """Load a Whisper model on CPU for inference only, optionally int8-quantized."""
+    import torch
+    import whisper
+
+    if threads:
+        torch.set_num_threads(threads)
+    model = whisper.load_model(model_size, device='cpu')
+    model.eval()
+    for param in model.parameters():
+        param.requires_grad_(False)
+    if quantize:
+        model = quantize_linear_int8(model)
+    return model
+
+
+def synthetic_clip(seconds=1.0, sample_rate=WHISPER_SAMPLE_RATE):
+    """A short quiet tone with a little noise, enough to run the whole decode path once."""
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    rng = np.random.default_rng(0)
+    clip = 0.05 * np.sin(2 * np.pi * 220 * t) + 0.005 * rng.standard_normal(t.shape)
+    return clip.astype(np.float32)
+
+
+class LocalWhisperModel:
+    """The local Whisper fallback model, loaded lazily or preloaded at boot.
+
+    state is one of 'idle' (not loaded yet), 'loading', 'warming', 'ready' or
+    'failed'. preload() loads the model on a background thread and runs one
+    warmup transcription so the first real fallback request doesn't pay for
+    model load or first-inference setup. get() still loads synchronously when
+    called before preload() finished, as the original lazy loader did.
+
+    A `model` passed in (the pre-fork shared model) is used as is; only the
+    warmup runs in the worker. `profile` names an entry of WHISPER_PROFILES that
+    sets model size, quantization, threads and the default decoding options.
+    """
+
+    def __init__(self, model_size=None, loader=None, model=None, profile=None):
+        self.profile = resolve_profile(profile)
+        self.model_size = model_size or self.profile['model_size']
+        self.decode_options = {k: v for k, v in self.profile['decode'].items() if v is not None}
+        self._loader = loader
+        self._lock = threading.Lock()
+        # Whisper installs kv-cache hooks on the shared modules for each call, so
+        # inference on one model instance must not run concurrently.
+        self._inference_lock = threading.Lock()
+        self._model = model
+        self._thread = None
+        self._warming = False
+        self.state = 'idle' if model is None else 'ready'
+        self.shared = model is not None
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.ready_at = None if model is None else time.time()
+
+    def _load(self):
+        if self._loader is not None:
+            return self._loader(self.model_size)
+        return load_whisper(self.model_size, quantize=self.profile['quantize'], threads=self.profile['threads'])
+
+    def get(self):
+        """Return the loaded model (loading it now if needed), or None if loading failed."""
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                self.state = 'loading'
+                start = time.perf_counter()
+                try:
+                    print(f"Loading Whisper model '{self.model_size}'...")
+                    self._model = self._load()
+                    self.load_seconds = round(time.perf_counter() - start, 2)
+                    print(f"Whisper model loaded in {self.load_seconds}s")
+                    if not self._warming:
+                        self.state = 'ready'
+                        self.ready_at = time.time()
+                except Exception as e:
+                    self.state = 'failed'
+                    self.error = str(e)
+                    print(f"Failed to load Whisper model: {e}")
+        return self._model
+
+    def transcribe(self, audio, **options):
+        """Run model.transcribe(audio, **options) serialized with other callers; None if no model.
+
+        The profile's decoding options apply unless overridden in `options`.
+        """
+        model = self.get()
+        if model is None:
+            return None
+        options = {'fp16': False, **self.decode_options, **options}
+        with self._inference_lock:
+            return model.transcribe(audio, **options)
+
+    def decode_batch(self, clips):
+        """Decode up to 30 s float32 clips in one batched encoder/decoder pass; returns their texts.
+
+        Uses the profile's beam size (greedy if none) without timestamps and
+        without transcribe()'s temperature fallback. A clip the model judges to be silence comes back as ''.
+        """
+        model = self.get()
+        if model is None:
+            raise RuntimeError('Whisper model not available')
+        import torch
+        import whisper
+
+        n_mels = getattr(model.dims, 'n_mels', 80)
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(np.asarray(clip, dtype=np.float32))), n_mels)
+            for clip in clips
+        ]).to(model.device)
+        options = whisper.DecodingOptions(language='en', fp16=False, without_timestamps=True,
+                                          beam_size=self.decode_options.get('beam_size'))
+        with self._inference_lock:
+            results = whisper.decode(model, mels, options)
+        # Same no-speech rule transcribe() applies to each window.
+        return ['' if r.no_speech_prob > 0.6 and r.avg_logprob < -1.0 else r.text.strip() for r in results]
+
+    def warmup(self):
+        self._warming = True
+        model = self.get()
+        if model is None:
+            self._warming = False
+            return False
+        self.state = 'warming'
+        start = time.perf_counter()
+        try:
+            self.transcribe(synthetic_clip(), language='en', fp16=False)
+        except Exception as e:
+            # A failed warmup still leaves a usable model; report it and carry on.
+            print(f"Whisper warmup transcription failed: {e}")
+        self.warmup_seconds = round(time.perf_counter() - start, 2)
+        self._warming = False
+        self.state = 'ready'
+        self.ready_at = time.time()
+        print(f"Whisper model warmed up in {self.warmup_seconds}s")
+        return True
+
+    def preload(self):
+        """Load and warm the model on a daemon thread; returns immediately."""
+        with self._lock:
+            if self._thread is not None:
+                return self._thread
+            self._thread = threading.Thread(target=self.warmup, name='whisper-preload', daemon=True)
+            self._thread.start()
+            return self._thread
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def status(self):
+        return {
+            'profile': self.profile['name'],
+            'model_size': self.model_size,
+            'quantized': self.profile['quantize'],
+            'state': self.state,
+            'shared_prefork': self.shared,
+            'ready': self.ready,
+            'preloading': self._thread is not None and self._thread.is_alive(),
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'ready_at': self.ready_at,
+            'error': self.error,
+        }
+
+
+def prefork_load(profile=None):
+    """Load the model in the gunicorn master so forked workers share its weights copy-on-write.
+
+    Called from gunicorn.conf.py when WHISPER_PREFORK=1. No inference runs
+    here: torch's thread pools are not fork-safe, so warmup happens per worker.
+    Gradients are disabled and the model put in eval mode up front so workers
+    never have a reason to write to the weight tensors, and gc.freeze() keeps
+    the collector from dirtying the pages of every object loaded so far.
+    """
+    global _prefork_model
+    profile = resolve_profile(profile)
+    model_size = profile['model_size']
+    start = time.perf_counter()
+    try:
+        # Quantizing here, not in the workers, keeps the int8 weights shared too.
+        model = load_whisper(model_size, quantize=profile['quantize'], threads=profile['threads'])
+    except Exception as e:
+        print(f"Pre-fork Whisper load failed, workers will load their own copy: {e}")
+        return None
+    gc.collect()
+    gc.freeze()
+    _prefork_model = model
+    print(f"Pre-fork Whisper model '{model_size}' loaded in {time.perf_counter() - start:.2f}s")
+    return model
+
+
+def build_local_whisper():
+    """Model for WHISPER_PROFILE (default 'standard'); preloaded when WHISPER_PRELOAD=1.
+
+    Reuses the model loaded in the gunicorn master when pre-fork loading is on.
+    """
+    model = LocalWhisperModel(model=_prefork_model)
+    if os.environ.get('WHISPER_PRELOAD', '1') == '1':
+        model.preload()
+    return model
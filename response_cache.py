@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from concept_index import normalize_text
+
+
+def normalize_response_text(text):
+    """The normalization generate_response scores with, plus collapsed whitespace."""
+    return ' '.join(normalize_text(text).split())
+
+
+def word_jaccard(a, b):
+    a_set, b_set = set(a.split()), set(b.split())
+    if not a_set and not b_set:
+        return 0.0
+    return len(a_set & b_set) / len(a_set | b_set)
+
+
+def attempt_bucket(attempt_count):
+    """Attempts that get the same attempt instruction in the prompt (0, 1, 2, then 3+)."""
+    return min(max(int(attempt_count or 0), 0), 3)
+
+
+def response_cache_key(concept_name, attempt_count, normalized_text, prompt_version):
+    text_hash = hashlib.sha256(normalized_text.encode('utf-8')).hexdigest()
+    return f"{prompt_version}|{concept_name}|{attempt_bucket(attempt_count)}|{text_hash}"
+
+
+class ResponseCache:
+    """Tutor replies keyed by concept, attempt bucket, normalized text and prompt version, in SQLite.
+
+    Same layout rules as TranscriptionCache: one database shared by all
+    workers, TTL expiry and LRU eviction beyond `max_entries`. With
+    `fuzzy_threshold` set, a miss falls back to the most similar cached text
+    for the same concept/bucket/version whose word Jaccard similarity reaches
+    the threshold (among the `fuzzy_candidates` most recently used).
+
+    Each entry keeps where its reply came from (`source`: model, participant,
+    session), and every reply served from the cache is recorded in the
+    `served` table with the entry it came from. Those rows are pruned with
+    their entry (TTL expiry or LRU eviction), so the table stays bounded; the
+    conversation log's SYSTEM line is the permanent record of a cached reply.
+    """
+
+    def __init__(self, path, max_entries=2000, ttl_seconds=7 * 24 * 3600, fuzzy_threshold=None,
+                 fuzzy_candidates=200):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_candidates = fuzzy_candidates
+        self._lock = threading.Lock()
+        self._counters = {'exact_hits': 0, 'fuzzy_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'errors': 0}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                ' key TEXT PRIMARY KEY, prompt_version TEXT NOT NULL, concept TEXT NOT NULL,'
+                ' bucket INTEGER NOT NULL, text TEXT NOT NULL, response TEXT NOT NULL, source TEXT,'
+                ' created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_scope ON responses (prompt_version, concept, bucket)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS served ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT, served_at REAL NOT NULL, key TEXT NOT NULL,'
+                ' tier TEXT NOT NULL, similarity REAL, concept TEXT, participant_id TEXT, session_id TEXT)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS served_key ON served (key)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def get(self, concept_name, attempt_count, user_text, prompt_version, served_to=None):
+        """Return (response, provenance) for a cached reply, or (None, None).
+
+        `served_to` ({'participant_id', 'session_id'}) is recorded with the hit.
+        """
+        normalized = normalize_response_text(user_text)
+        key = response_cache_key(concept_name, attempt_count, normalized, prompt_version)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT key, response, source, created_at, 1.0 FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                tier = 'exact'
+                if row is not None and self.ttl_seconds and now - row[3] > self.ttl_seconds:
+                    conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    conn.execute('DELETE FROM served WHERE key = ?', (key,))
+                    row = None
+                if row is None and self.fuzzy_threshold:
+                    row = self._fuzzy_match(conn, normalized, concept_name, attempt_count, prompt_version, now)
+                    tier = 'fuzzy'
+                if row is None:
+                    self._count('misses')
+                    return None, None
+                entry_key, response, source, created_at, similarity = row
+                conn.execute(
+                    'UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?', (now, entry_key)
+                )
+                served_to = served_to or {}
+                conn.execute(
+                    'INSERT INTO served (served_at, key, tier, similarity, concept, participant_id, session_id)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (now, entry_key, tier, similarity, concept_name,
+                     served_to.get('participant_id'), served_to.get('session_id'))
+                )
+        except sqlite3.Error as e:
+            print(f"Response cache read failed: {e}")
+            self._count('errors')
+            return None, None
+        self._count(f'{tier}_hits')
+        return response, {
+            'source': 'cache',
+            'tier': tier,
+            'similarity': round(similarity, 3),
+            'entry': entry_key,
+            'entry_created_at': created_at,
+            'origin': json.loads(source) if source else None,
+        }
+
+    def _fuzzy_match(self, conn, normalized, concept_name, attempt_count, prompt_version, now):
+        rows = conn.execute(
+            'SELECT key, response, source, created_at, text FROM responses'
+            ' WHERE prompt_version = ? AND concept = ? AND bucket = ? AND created_at >= ?'
+            ' ORDER BY last_used DESC LIMIT ?',
+            (prompt_version, concept_name, attempt_bucket(attempt_count),
+             now - self.ttl_seconds if self.ttl_seconds else 0, self.fuzzy_candidates)
+        ).fetchall()
+        best, best_score = None, 0.0
+        for key, response, source, created_at, text in rows:
+            score = word_jaccard(normalized, text)
+            if score > best_score:
+                best, best_score = (key, response, source, created_at, score), score
+        return best if best is not None and best_score >= self.fuzzy_threshold else None
+
+    def put(self, concept_name, attempt_count, user_text, prompt_version, response, source=None):
+        normalized = normalize_response_text(user_text)
+        key = response_cache_key(concept_name, attempt_count, normalized, prompt_version)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses'
+                    ' (key, prompt_version, concept, bucket, text, response, source, created_at, last_used, hits)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)',
+                    (key, prompt_version, concept_name, attempt_bucket(attempt_count), normalized, response,
+                     json.dumps(source) if source else None, now, now)
+                )
+                evicted = 0
+                if self.ttl_seconds:
+                    evicted += conn.execute(
+                        'DELETE FROM responses WHERE created_at < ?', (now - self.ttl_seconds,)
+                    ).rowcount
+                if self.max_entries:
+                    evicted += conn.execute(
+                        'DELETE FROM responses WHERE key IN ('
+                        ' SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                        (self.max_entries,)
+                    ).rowcount
+                if evicted:
+                    conn.execute('DELETE FROM served WHERE key NOT IN (SELECT key FROM responses)')
+            self._count('stores')
+            if evicted:
+                self._count('evictions', evicted)
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e}")
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+        hits = out['exact_hits'] + out['fuzzy_hits']
+        lookups = hits + out['misses']
+        out['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        try:
+            with self._connect() as conn:
+                out['entries'] = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+                out['served_total'] = conn.execute('SELECT COUNT(*) FROM served').fetchone()[0]
+        except sqlite3.Error:
+            out['entries'] = None
+        out['max_entries'] = self.max_entries
+        out['ttl_seconds'] = self.ttl_seconds
+        out['fuzzy_threshold'] = self.fuzzy_threshold
+        return out
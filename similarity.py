@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import Counter
+from difflib import SequenceMatcher
+
+from concept_index import char_ngrams, cosine, word_ngrams
+
+EXCELLENT_THRESHOLD = 0.8
+# Longest normalized text scored with SequenceMatcher; beyond it the
+# character score is a trigram Dice coefficient instead.
+CHAR_RATIO_MAX_CHARS = 3000
+
+
+def char_upper_bound(a_len, b_len, overlap=None):
+    """Upper bound of SequenceMatcher.ratio(): 2*matches/(len(a)+len(b)).
+
+    Matches can't exceed the shorter length (difflib's real_quick_ratio) nor
+    the multiset character overlap (its quick_ratio).
+    """
+    total = a_len + b_len
+    if not total:
+        return 1.0
+    matches = min(a_len, b_len) if overlap is None else overlap
+    return 2.0 * matches / total
+
+
+def dice(a, b):
+    """Dice coefficient of two Counters."""
+    total = sum(a.values()) + sum(b.values())
+    if not total:
+        return 0.0
+    return 2.0 * sum((a & b).values()) / total
+
+
+def _char_score(user_norm, concept, threshold, char_cap):
+    """(char ratio or None if it provably can't reach `threshold`, path)."""
+    a_len, b_len = len(user_norm), len(concept.normalized)
+    if char_upper_bound(a_len, b_len) < threshold:
+        return None, 'length_bound'
+    overlap = sum((Counter(user_norm) & concept.char_counts).values())
+    if char_upper_bound(a_len, b_len, overlap) < threshold:
+        return None, 'overlap_bound'
+    if max(a_len, b_len) > char_cap:
+        return dice(char_ngrams(user_norm, 3), concept.char_trigrams), 'char_capped'
+    try:
+        return SequenceMatcher(None, user_norm, concept.normalized).ratio(), 'char'
+    except Exception:
+        return 0.0, 'char'
+
+
+def score_explanation(user_norm, concept, threshold=EXCELLENT_THRESHOLD, char_cap=CHAR_RATIO_MAX_CHARS,
+                      detail=False):
+    """Similarity of a normalized explanation to a concept's golden answer, at linear cost.
+
+    Reaches the same `score >= threshold` decision as generate_response's
+    max(SequenceMatcher ratio, word Jaccard) without running SequenceMatcher
+    whenever a linear bound proves it can't change the outcome:
+      - word Jaccard (linear) already at the threshold decides it;
+      - otherwise the char ratio is only computed when its length bound and
+        character-overlap bound both reach the threshold, and the texts fit
+        in `char_cap` (above it a trigram Dice score stands in).
+    `concept` is a concept_index.ConceptEntry. Returns a dict with 'score',
+    'char_ratio' (None when skipped), 'word_ratio' and 'path', the step that
+    settled the score; with `detail`, also bigram Jaccard, trigram Dice and
+    TF-IDF cosine against the golden answer.
+    """
+    user_words = user_norm.split()
+    user_tokens = set(user_words)
+    union = user_tokens | concept.tokens
+    word_ratio = len(user_tokens & concept.tokens) / len(union) if union else 0.0
+    result = {'score': word_ratio, 'char_ratio': None, 'word_ratio': word_ratio, 'path': 'word'}
+
+    if word_ratio < threshold:
+        result['char_ratio'], result['path'] = _char_score(user_norm, concept, threshold, char_cap)
+        if result['char_ratio'] is not None and result['char_ratio'] > word_ratio:
+            result['score'] = result['char_ratio']
+
+    if detail:
+        bigrams = set(word_ngrams(user_words, 2))
+        union = bigrams | concept.bigrams
+        result['bigram_ratio'] = len(bigrams & concept.bigrams) / len(union) if union else 0.0
+        result['trigram_dice'] = dice(char_ngrams(user_norm, 3), concept.char_trigrams)
+        index = concept.tfidf_index
+        result['tfidf_cosine'] = cosine(index.vectorize(user_words), concept.tfidf) if index is not None else 0.0
+    return result
+
+
+class SimilarityStats:
+    """How each scoring call was settled, and the time it took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.paths = Counter()
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.max_chars = 0
+
+    def record(self, path, seconds, chars):
+        with self._lock:
+            self.paths[path] += 1
+            self.calls += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.max_chars = max(self.max_chars, chars)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'paths': dict(self.paths),
+                'mean_ms': round(1000 * self.total_seconds / self.calls, 3) if self.calls else None,
+                'max_ms': round(1000 * self.max_seconds, 3),
+                'max_chars': self.max_chars,
+            }
+
+
+def timed_score(stats, user_norm, concept, **kwargs):
+    """score_explanation, recorded in `stats` (a SimilarityStats)."""
+    start = time.perf_counter()
+    result = score_explanation(user_norm, concept, **kwargs)
+    stats.record(result['path'], time.perf_counter() - start, len(user_norm))
+    return result
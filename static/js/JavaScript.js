@@ -7,6 +7,8 @@ document.addEventListener("DOMContentLoaded", function () {
     const introAudio = document.getElementById("intro-audio");
     const conceptAudio = document.getElementById("concept-audio");
     const aiAudio = document.getElementById("ai-response-audio");
+    // Smaller Opus payloads where the browser can play them; MP3 otherwise.
+    const ttsFormat = aiAudio.canPlayType('audio/ogg; codecs="opus"') ? 'opus' : 'mp3';
     const conceptIndicator = document.getElementById("current-concept");
     const pdfCanvas = document.getElementById("pdf-canvas");
     const currentPageNum = document.getElementById("current-page-num");
@@ -18,6 +20,27 @@ document.addEventListener("DOMContentLoaded", function () {
     
     let mediaRecorder;
     let audioChunks = [];
+    // Recording timeslices are uploaded while the participant speaks so the server
+    // can transcribe incrementally; submit_message then reuses that transcript.
+    const LIVE_CHUNK_MS = 1000;
+    let liveRecordingId = null;
+    let liveChunkSeq = 0;
+    let liveChunkChain = Promise.resolve();
+    let liveUploadDisabled = false;
+
+    function sendLiveChunk(chunk) {
+        if (liveUploadDisabled || !liveRecordingId) return;
+        const body = new FormData();
+        body.append("recording_id", liveRecordingId);
+        body.append("seq", String(liveChunkSeq++));
+        body.append("chunk", chunk, "chunk.webm");
+        // Chained so chunks arrive in order and the submit can wait for the last one.
+        liveChunkChain = liveChunkChain
+            .then(() => fetch("/recording_chunk", { method: "POST", body }))
+            .then(res => res.json())
+            .then(data => { if (data.enabled === false) liveUploadDisabled = true; })
+            .catch(err => console.warn("Live chunk upload failed:", err));
+    }
     let isRecording = false;
     let currentPage = 1;
     let introPlayed = false;
@@ -457,6 +480,9 @@ document.addEventListener("DOMContentLoaded", function () {
        try {
            isRecording = true;
            audioChunks = [];
+           liveRecordingId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+           liveChunkSeq = 0;
+           liveChunkChain = Promise.resolve();
 
            await startSound.play();
                               
@@ -466,10 +492,11 @@ document.addEventListener("DOMContentLoaded", function () {
            mediaRecorder.ondataavailable = event => {
                if (event.data.size > 0) {
                    audioChunks.push(event.data);
+                   sendLiveChunk(event.data);
                }
            };
            
-           mediaRecorder.start();
+           mediaRecorder.start(LIVE_CHUNK_MS);
            
            siriOrb.style.boxShadow = "0 0 25px 5px rgba(0, 0, 0, 0.7)";
            
@@ -496,6 +523,200 @@ document.addEventListener("DOMContentLoaded", function () {
        }
    }
    
+   // Parses the server-sent events of /stream_submit_message, calling onEvent(type, data).
+   async function readTurnEvents(response, onEvent) {
+       const reader = response.body.getReader();
+       const decoder = new TextDecoder();
+       let buffer = '';
+       while (true) {
+           const { value, done } = await reader.read();
+           if (done) break;
+           buffer += decoder.decode(value, { stream: true });
+           let boundary;
+           while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+               const frame = buffer.slice(0, boundary);
+               buffer = buffer.slice(boundary + 2);
+               let type = 'message';
+               let payload = '';
+               frame.split('\n').forEach(line => {
+                   if (line.startsWith('event:')) type = line.slice(6).trim();
+                   else if (line.startsWith('data:')) payload += line.slice(5).trim();
+               });
+               if (payload) onEvent(type, JSON.parse(payload));
+           }
+       }
+   }
+
+   // Plays the reply sentence by sentence as its audio_segment events arrive;
+   // if no segment audio arrives, plays the whole reply like /submit_message did.
+   async function handleTurnResponse(response) {
+       const contentType = response.headers.get('Content-Type') || '';
+       if (!contentType.startsWith('text/event-stream')) {
+           // Validation errors come back as JSON, as from /submit_message.
+           playAIResponse(await response.json());
+           return;
+       }
+
+       let data = null;
+       let segmentCount = 0;
+       let playing = false;
+       let streamEnded = false;
+       let current = 0;
+       const queue = [];
+
+       const finishPlayback = () => {
+           siriOrb.style.boxShadow = 'none';
+           isWaitingForAIResponse = false;
+           setAudioLock(false);
+       };
+       const playNext = () => {
+           const segment = queue.shift();
+           if (!segment) {
+               playing = false;
+               if (streamEnded) finishPlayback();
+               return;
+           }
+           playing = true;
+           const id = ++current;
+           const skip = (e) => {
+               if (id !== current) return;
+               console.error('Reply segment playback failed, skipping:', e);
+               playNext();
+           };
+           aiAudio.onerror = skip;
+           ttsAudioSource(segment.text, segment.url).then(src => {
+               if (id !== current) return;
+               aiAudio.src = src;
+               return aiAudio.play();
+           }).catch(skip);
+       };
+       aiAudio.onplaying = () => {
+           activateSiriOrb();
+           siriOrb.style.boxShadow = "0 0 20px 5px rgba(0, 128, 255, 0.7)";
+       };
+       aiAudio.onended = () => playNext();
+
+       await readTurnEvents(response, (type, event) => {
+           if (type === 'transcript') {
+               console.log('Transcript:', event.text);
+           } else if (type === 'audio_segment' && event.url) {
+               if (segmentCount++ === 0) {
+                   stopMeteorOrbit();
+                   setAudioLock(true);
+               }
+               queue.push(event);
+               if (!playing) playNext();
+           } else if (type === 'response') {
+               data = event;
+           } else if (type === 'error') {
+               console.error('Streaming turn error:', event.error);
+           } else if (type === 'done' && event.turn_id) {
+               // The session cookie went out before the reply existed; store the turn now.
+               fetch(`/stream_submit_message/${event.turn_id}/commit`, { method: 'POST' })
+                   .catch(err => console.error('Failed to commit turn', err));
+           }
+       });
+
+       streamEnded = true;
+       if (!segmentCount) {
+           playAIResponse(data || {});
+       } else if (!playing) {
+           finishPlayback();
+       }
+   }
+
+   // /ai_audio_status holds a request for at most a few seconds, so keep
+   // asking while the reply file is pending (about 30 s in total).
+   function waitForAIAudio(statusUrl, attempts = 6) {
+       return fetch(statusUrl + '?wait=5').then(r => r.json()).catch(() => ({})).then(status => {
+           if (status.status === 'pending' && attempts > 1) return waitForAIAudio(statusUrl, attempts - 1);
+           return status;
+       });
+   }
+
+   // GET lets the audio element play /synthesize progressively, but gunicorn
+   // rejects request lines over 4094 bytes, so long text is POSTed instead and
+   // played once it has downloaded.
+   const MAX_TTS_GET_URL = 2000;
+   let ttsObjectUrl = null;
+   async function ttsAudioSource(text, url) {
+       url = url || '/synthesize?' + new URLSearchParams({ text: text, format: ttsFormat }).toString();
+       if (url.length <= MAX_TTS_GET_URL) return url;
+       const resp = await fetch('/synthesize', {
+           method: 'POST',
+           headers: { 'Content-Type': 'application/json' },
+           body: JSON.stringify({ text: text, format: ttsFormat })
+       });
+       if (!resp.ok) throw new Error('TTS request failed: ' + resp.status);
+       if (ttsObjectUrl) URL.revokeObjectURL(ttsObjectUrl);
+       ttsObjectUrl = URL.createObjectURL(await resp.blob());
+       return ttsObjectUrl;
+   }
+
+   // Plays a finished reply: streams /synthesize, falling back to the saved reply file.
+   function playAIResponse(data) {
+       if (data.ai_audio_url) {
+           stopMeteorOrbit();
+
+           try {
+               // Play the streamed /synthesize response through the audio element so
+               // playback starts on the first bytes instead of after the whole clip.
+               const text = data.response || '';
+               let usedFallback = false;
+               aiAudio.onplaying = () => {
+                   activateSiriOrb();
+                   siriOrb.style.boxShadow = "0 0 20px 5px rgba(0, 128, 255, 0.7)";
+               };
+               aiAudio.onended = () => { 
+                   siriOrb.style.boxShadow = 'none'; 
+                   isWaitingForAIResponse = false; 
+                   setAudioLock(false); 
+               };
+               aiAudio.onerror = (e) => { 
+                   if (usedFallback) {
+                       console.error('Fallback play error', e); 
+                       isWaitingForAIResponse = false; 
+                       setAudioLock(false); 
+                       return;
+                   }
+                   console.error('TTS/playback error, falling back to server file:', e);
+                   usedFallback = true;
+                   // Wait for the background AI audio file before loading it.
+                   const fileReady = data.ai_audio_status_url
+                       ? waitForAIAudio(data.ai_audio_status_url)
+                       : Promise.resolve({});
+                   fileReady.then(() => {
+                       aiAudio.src = data.ai_audio_url;
+                       return aiAudio.play();
+                   }).catch(err => {
+                       console.error('Fallback play failed', err); 
+                       isWaitingForAIResponse = false; 
+                       setAudioLock(false); 
+                   });
+               };
+               setAudioLock(true);
+               ttsAudioSource(text).then(src => {
+                   aiAudio.src = src;
+                   return aiAudio.play();
+               }).catch(e => { 
+                   console.error('TTS playback failed', e); 
+                   isWaitingForAIResponse = false; 
+                   setAudioLock(false); 
+               });
+           } catch (err) {
+               console.error('Error invoking synthesize:', err);
+               // Ensure UI unlock if synthesis process failed
+               setAudioLock(false);
+               stopMeteorOrbit();
+           }
+       } else {
+           console.error("AI audio URL missing from response");
+           stopMeteorOrbit();
+           isWaitingForAIResponse = false;
+           setAudioLock(false);
+       }
+   }
+
    function stopRecording() {
        if (!isRecording || !mediaRecorder) return;
        
@@ -526,76 +747,20 @@ document.addEventListener("DOMContentLoaded", function () {
                
                const currentConcept = getConceptForPage(currentPage);
                formData.append("concept_name", currentConcept);
+               formData.append("tts_format", ttsFormat);
+               // Make sure the last timeslice reached the server before submitting.
+               await liveChunkChain;
+               if (!liveUploadDisabled && liveRecordingId) {
+                   formData.append("recording_id", liveRecordingId);
+               }
                
                console.log(`Sending explanation for concept: ${currentConcept}`);
                
-               const response = await fetch("/submit_message", {
+               const response = await fetch("/stream_submit_message", {
                    method: "POST",
                    body: formData
                });
-               
-               const data = await response.json();
-               
-               if (data.ai_audio_url) {
-                   stopMeteorOrbit();
-
-                   try {
-                       const text = data.response || '';
-                       fetch('/synthesize', {
-                           method: 'POST',
-                           headers: { 'Content-Type': 'application/json' },
-                           body: JSON.stringify({ text: text, format: 'mp3' })
-                       }).then(res => {
-                           if (!res.ok) throw new Error('TTS request failed');
-                           return res.arrayBuffer();
-                       }).then(arrayBuffer => {
-                           const audioCtx = new (window.AudioContext || window.webkitAudioContext)();
-                           return audioCtx.decodeAudioData(arrayBuffer).then(audioBuffer => ({ audioCtx, audioBuffer }));
-                       }).then(({ audioCtx, audioBuffer }) => {
-                           const src = audioCtx.createBufferSource();
-                           src.buffer = audioBuffer;
-                           src.connect(audioCtx.destination);
-                           setAudioLock(true);
-                           src.onended = () => {
-                               siriOrb.style.boxShadow = 'none';
-                               isWaitingForAIResponse = false;
-                               setAudioLock(false);
-                           };
-                           activateSiriOrb();
-                           siriOrb.style.boxShadow = "0 0 20px 5px rgba(0, 128, 255, 0.7)";
-                           src.start(0);
-                       }).catch(err => {
-                           console.error('TTS/playback error, falling back to server file:', err);
-                           aiAudio.src = data.ai_audio_url;
-                           aiAudio.onended = () => { 
-                               siriOrb.style.boxShadow = 'none'; 
-                               isWaitingForAIResponse = false; 
-                               setAudioLock(false); 
-                           };
-                           aiAudio.onerror = (e) => { 
-                               console.error('Fallback play error', e); 
-                               isWaitingForAIResponse = false; 
-                               setAudioLock(false); 
-                           };
-                           setAudioLock(true);
-                           aiAudio.play().catch(e => { 
-                               console.error('Fallback play failed', e); 
-                               isWaitingForAIResponse = false; 
-                               setAudioLock(false); 
-                           });
-                       });
-                   } catch (err) {
-                       console.error('Error invoking synthesize:', err);
-                       // Ensure UI unlock if synthesis process failed
-                       setAudioLock(false);
-                       stopMeteorOrbit();
-                   }
-               } else {
-                   console.error("AI audio URL missing from response");
-                   stopMeteorOrbit();
-                   isWaitingForAIResponse = false;
-                   setAudioLock(false);
-               }
+               await handleTurnResponse(response);
             } catch (error) {
                 console.error("Error processing recording:", error);
                 stopMeteorOrbit();
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60)
+
+
+class LatencyHistogram:
+    """Bucketed latency counts plus a window of recent samples for percentiles."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=500):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+            self._counts[index] += 1
+            self._recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, q):
+        with self._lock:
+            recent = sorted(self._recent)
+        if not recent:
+            return None
+        return recent[min(len(recent) - 1, int(len(recent) * q / 100))]
+
+    def samples(self):
+        with self._lock:
+            return len(self._recent)
+
+    def stats(self):
+        with self._lock:
+            labels = [f"le_{b}" for b in self.buckets] + ['gt_' + str(self.buckets[-1])]
+            out = {
+                'count': self.count,
+                'mean': round(self.total / self.count, 3) if self.count else None,
+                'buckets': dict(zip(labels, self._counts)),
+            }
+        for q in (50, 95, 99):
+            value = self.percentile(q)
+            out[f'p{q}'] = round(value, 3) if value is not None else None
+        return out
+
+
+class HedgedTranscriber:
+    """Run the primary STT backend and hedge with the secondary if it is slow.
+
+    The secondary starts when the primary has not answered within the
+    `percentile` latency of its recent successful calls (clamped to
+    [min_delay, max_delay]; `default_delay` until `min_samples` are seen), or
+    immediately if the primary fails. The first successful result wins; the
+    loser is cancelled if it hasn't started and otherwise ignored, but its
+    latency is still recorded.
+    """
+
+    def __init__(self, pool, primary='openai', secondary='local', percentile=95, default_delay=4.0,
+                 min_delay=1.0, max_delay=15.0, min_samples=20):
+        self.pool = pool
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.latency = {primary: LatencyHistogram(), secondary: LatencyHistogram()}
+        self._lock = threading.Lock()
+        self._counters = {
+            'requests': 0, 'hedged': 0, 'hedge_won': 0, 'primary_won': 0,
+            'primary_failed': 0, 'secondary_failed': 0, 'both_failed': 0, 'secondary_unavailable': 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def hedge_delay(self):
+        histogram = self.latency[self.primary]
+        if histogram.samples() < self.min_samples:
+            return self.default_delay
+        return min(max(histogram.percentile(self.percentile), self.min_delay), self.max_delay)
+
+    def _submit(self, name, fn):
+        start = time.perf_counter()
+
+        def timed():
+            result = fn()
+            self.latency[name].observe(time.perf_counter() - start)
+            return result
+
+        future = self.pool.submit(timed)
+        future.backend = name
+        return future
+
+    def run(self, primary_fn, secondary_fn, secondary_ready=lambda: True):
+        """Return (result, backend_name). Raises the primary's error if neither backend succeeds.
+
+        The raised exception has `secondary_tried` set when the secondary ran
+        too, so callers don't retry it.
+        """
+        self._count('requests')
+        primary = self._submit(self.primary, primary_fn)
+        done, _ = wait([primary], timeout=self.hedge_delay())
+        if done and primary.exception() is None:
+            self._count('primary_won')
+            return primary.result(), self.primary
+
+        if not secondary_ready():
+            self._count('secondary_unavailable')
+            try:
+                result = primary.result()
+            except Exception:
+                self._count('primary_failed')
+                raise
+            self._count('primary_won')
+            return result, self.primary
+
+        self._count('hedged')
+        secondary = self._submit(self.secondary, secondary_fn)
+        pending = {primary, secondary}
+        errors = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    self._count('hedge_won' if future.backend == self.secondary else 'primary_won')
+                    return future.result(), future.backend
+                errors[future.backend] = future.exception()
+                self._count('primary_failed' if future.backend == self.primary else 'secondary_failed')
+
+        self._count('both_failed')
+        error = errors.get(self.primary) or errors.get(self.secondary)
+        error.secondary_tried = True
+        raise error
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+        out['hedge_delay_seconds'] = round(self.hedge_delay(), 3)
+        out['latency'] = {name: histogram.stats() for name, histogram in self.latency.items()}
+        return out
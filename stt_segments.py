@@ -0,0 +1,67 @@
+import numpy as np
+
+from vad import frame_energy_db
+
+
+def plan_segments(samples, sample_rate=16000, max_seconds=30.0, min_seconds=10.0, frame_ms=30, smooth_ms=300):
+    """Cut points for splitting int16 `samples` into spans of at most `max_seconds`.
+
+    Each cut is placed at the quietest point (lowest energy averaged over
+    `smooth_ms`) between `min_seconds` and `max_seconds` after the previous
+    cut, so chunks end in pauses rather than mid-word. Returns a list of
+    (start_sample, end_sample).
+    """
+    total = len(samples)
+    max_len = int(max_seconds * sample_rate)
+    if total <= max_len:
+        return [(0, total)]
+
+    frame_len = int(sample_rate * frame_ms / 1000)
+    energy = frame_energy_db(samples, frame_len)
+    width = max(1, int(smooth_ms / frame_ms))
+    smoothed = np.convolve(energy, np.ones(width) / width, mode='same')
+
+    spans = []
+    start = 0
+    while total - start > max_len:
+        lo = (start + int(min_seconds * sample_rate)) // frame_len
+        hi = min((start + max_len) // frame_len, len(smoothed))
+        if hi <= lo:
+            cut = start + max_len
+        else:
+            # Latest of equally quiet frames, so chunks stay as long as allowed.
+            cut = (hi - 1 - int(np.argmin(smoothed[lo:hi][::-1]))) * frame_len + frame_len // 2
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, total))
+    return spans
+
+
+def transcribe_segmented(samples, transcribe_segment, pool, sample_rate=16000, max_seconds=30.0, min_seconds=10.0):
+    """Transcribe long audio as silence-bounded chunks in parallel and stitch them in order.
+
+    `transcribe_segment(chunk_samples)` returns (text, backend). Returns a dict
+    with the joined 'text' and 'segments' ({'index', 'start', 'end', 'text',
+    'backend'}, times in seconds from the start of `samples`).
+    """
+    spans = plan_segments(samples, sample_rate, max_seconds=max_seconds, min_seconds=min_seconds)
+    futures = [pool.submit(transcribe_segment, samples[start:end]) for start, end in spans]
+    segments = []
+    try:
+        for index, ((start, end), future) in enumerate(zip(spans, futures)):
+            text, backend = future.result()
+            segments.append({
+                'index': index,
+                'start': round(start / sample_rate, 2),
+                'end': round(end / sample_rate, 2),
+                'text': (text or '').strip(),
+                'backend': backend,
+            })
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+    return {
+        'text': ' '.join(s['text'] for s in segments if s['text']),
+        'segments': segments,
+    }
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# PCM every clip is normalized to before hashing, so the same speech gets the
+# same key whatever container/codec/bitrate the browser uploaded it in.
+PCM_SAMPLE_RATE = 16000
+
+
+def decode_pcm(audio_file_path):
+    """Decode an audio file to 16 kHz mono signed 16-bit PCM bytes (via pydub/ffmpeg)."""
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(audio_file_path)
+    return segment.set_frame_rate(PCM_SAMPLE_RATE).set_channels(1).set_sample_width(2).raw_data
+
+
+def pcm_hash(pcm_bytes):
+    return hashlib.sha256(pcm_bytes).hexdigest()
+
+
+def audio_content_hash(audio_file_path):
+    """Hash of the normalized PCM of a file, or of its raw bytes if it cannot be decoded."""
+    try:
+        return 'pcm:' + pcm_hash(decode_pcm(audio_file_path))
+    except Exception as e:
+        print(f"Could not decode {audio_file_path} for hashing, using file bytes: {e}")
+        with open(audio_file_path, 'rb') as f:
+            return 'file:' + hashlib.sha256(f.read()).hexdigest()
+
+
+def transcription_cache_key(content_hash, backend, language):
+    return f"{content_hash}|{backend}|{language or ''}"
+
+
+class TranscriptionCache:
+    """Transcripts keyed by audio content hash + backend + language, in SQLite.
+
+    The database file is shared by every gunicorn worker (WAL mode, one short
+    connection per call). Entries older than `ttl_seconds` are dropped, and
+    beyond `max_entries` the least recently used ones are evicted. Counters
+    are per process.
+    """
+
+    def __init__(self, path, max_entries=5000, ttl_seconds=30 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'errors': 0}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS transcripts ('
+                ' key TEXT PRIMARY KEY, text TEXT NOT NULL,'
+                ' created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS transcripts_last_used ON transcripts (last_used)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def get_any(self, keys):
+        """Return the transcript for the first key present (counted as one lookup), else None."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                for key in keys:
+                    row = conn.execute(
+                        'SELECT text, created_at FROM transcripts WHERE key = ?', (key,)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                        conn.execute('DELETE FROM transcripts WHERE key = ?', (key,))
+                        continue
+                    conn.execute(
+                        'UPDATE transcripts SET last_used = ?, hits = hits + 1 WHERE key = ?', (now, key)
+                    )
+                    self._count('hits')
+                    return row[0]
+        except sqlite3.Error as e:
+            print(f"Transcription cache read failed: {e}")
+            self._count('errors')
+            return None
+        self._count('misses')
+        return None
+
+    def get(self, key):
+        return self.get_any([key])
+
+    def put(self, key, text):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO transcripts (key, text, created_at, last_used, hits) VALUES (?, ?, ?, ?, 0)',
+                    (key, text, now, now)
+                )
+                evicted = 0
+                if self.ttl_seconds:
+                    evicted += conn.execute(
+                        'DELETE FROM transcripts WHERE created_at < ?', (now - self.ttl_seconds,)
+                    ).rowcount
+                if self.max_entries:
+                    evicted += conn.execute(
+                        'DELETE FROM transcripts WHERE key IN ('
+                        ' SELECT key FROM transcripts ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                        (self.max_entries,)
+                    ).rowcount
+            self._count('stores')
+            if evicted:
+                self._count('evictions', evicted)
+        except sqlite3.Error as e:
+            print(f"Transcription cache write failed: {e}")
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+        lookups = out['hits'] + out['misses']
+        out['hit_rate'] = round(out['hits'] / lookups, 4) if lookups else 0.0
+        try:
+            with self._connect() as conn:
+                out['entries'] = conn.execute('SELECT COUNT(*) FROM transcripts').fetchone()[0]
+        except sqlite3.Error:
+            out['entries'] = None
+        out['max_entries'] = self.max_entries
+        out['ttl_seconds'] = self.ttl_seconds
+        return out
@@ -0,0 +1,153 @@
+import threading
+from collections import Counter
+
+from concept_index import cosine, normalize_text
+
+EMPTY = 'empty'
+OFF_TOPIC = 'off_topic'
+QUESTION = 'question'
+ATTEMPT = 'attempt'
+TRIAGE_CLASSES = (EMPTY, OFF_TOPIC, QUESTION, ATTEMPT)
+
+# What speech_to_text and the STT backends return instead of a transcript.
+STT_FAILURE_TEXTS = {
+    'audio file not found',
+    'audio processing failed',
+    'whisper model not available',
+    'transcription failed',
+}
+
+FILLER_WORDS = {
+    'um', 'umm', 'uh', 'uhh', 'uhm', 'erm', 'er', 'ah', 'hmm', 'hm', 'mm', 'mhm', 'oh', 'okay', 'ok',
+    'yeah', 'yes', 'no', 'so', 'well', 'like', 'right', 'alright', 'anyway', 'basically', 'actually',
+}
+STOP_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'but', 'if', 'then', 'of', 'to', 'in', 'on', 'at', 'by', 'for', 'with',
+    'from', 'as', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'it', 'its', 'this', 'that', 'these',
+    'those', 'there', 'here', 'i', 'im', 'me', 'my', 'we', 'you', 'your', 'he', 'she', 'they', 'them',
+    'their', 'our', 'do', 'does', 'did', 'have', 'has', 'had', 'will', 'would', 'can', 'could', 'should',
+    'not', 'dont', 'just', 'about', 'what', 'which', 'who', 'how', 'why', 'when', 'where', 'some', 'any',
+    'all', 'more', 'most', 'very', 'also', 'too', 'than', 'into', 'out', 'up', 'down', 'one', 'two',
+}
+# A question needs a '?' or inverted word order: an auxiliary before its
+# subject ("is correlation ...", "does it ...") or a wh-word directly followed
+# by one ("what is ...", "how does ...", "which variable is ..."). A leading wh-word alone is not
+# enough: "when study hours increase, grades go up" is an explanation.
+AUXILIARIES = {
+    'is', 'are', 'was', 'were', 'am', 'do', 'does', 'did', 'have', 'has', 'had', 'can', 'could', 'would',
+    'should', 'will', 'shall', 'may', 'might', 'must', 'isnt', 'arent', 'wasnt', 'dont', 'doesnt', 'didnt',
+    'cant', 'couldnt', 'wouldnt', 'shouldnt', 'wont',
+}
+WH_WORDS = {'what', 'why', 'how', 'when', 'where', 'who', 'which'}
+# Contractions that already carry the auxiliary ("what's", "how's").
+WH_CONTRACTIONS = {'whats', 'whys', 'hows', 'wheres', 'whos'}
+# Words that can't be the subject right after an opening auxiliary.
+NON_SUBJECTS = AUXILIARIES | {'not', 'also', 'just', 'really', 'basically', 'actually', 'so', 'very'}
+
+TEMPLATES = {
+    EMPTY: "I didn't catch an explanation there. Could you try again and explain {concept} in your own words?",
+    OFF_TOPIC: "Let's get back to {concept}. How would you explain it in your own words?",
+}
+
+
+def is_question(raw, words):
+    """True if the utterance has a '?' or opens with inverted (question) word order."""
+    if '?' in raw:
+        return True
+    first, second = words[0], words[1] if len(words) > 1 else None
+    if first in WH_CONTRACTIONS:
+        return True
+    if first in WH_WORDS:
+        # The auxiliary may follow what the wh-word asks about: "which variable is ...",
+        # "how much does ...", "how many hours are ...".
+        if first == 'which' and second not in AUXILIARIES:
+            return len(words) > 2 and words[2] in AUXILIARIES
+        if second in ('much', 'many', 'often', 'long'):
+            return any(w in AUXILIARIES for w in words[2:4])
+        return second in AUXILIARIES
+    return first in AUXILIARIES and second is not None and second not in NON_SUBJECTS
+
+
+def stem(word):
+    """Crude prefix stem, enough to match 'variables'/'variable' or 'correlated'/'correlation'."""
+    return word[:6]
+
+
+class TurnTriage:
+    """Cheap local classification of a turn before any LLM call.
+
+    Classes: 'empty' (no transcript, an STT failure message or only filler),
+    'off_topic' (a real utterance sharing no content word stem with any
+    concept and no TF-IDF overlap with the current one), 'question' and
+    'attempt'. Empty and off-topic turns get a templated reply on the first
+    two attempts; the final attempt always goes to the LLM so the golden
+    answer is still revealed then. Questions (see is_question) and attempts
+    always go to the LLM.
+    """
+
+    def __init__(self, min_off_topic_words=6, max_off_topic_cosine=0.05, max_question_words=30,
+                 templated_attempts=2):
+        self.min_off_topic_words = min_off_topic_words
+        self.max_off_topic_cosine = max_off_topic_cosine
+        self.max_question_words = max_question_words
+        self.templated_attempts = templated_attempts
+        self._lock = threading.Lock()
+        self.classified = Counter()
+        self.llm_avoided = Counter()
+
+    def classify(self, text, concept, index=None):
+        """Return (class, features) for a turn's text against a concept_index.ConceptEntry.
+
+        `index` (the ConceptIndex) widens the topic vocabulary to every
+        concept, so explaining a neighbouring concept is not off-topic.
+        """
+        raw = (text or '').strip()
+        normalized = ' '.join(normalize_text(raw).split())
+        words = normalized.split()
+        content = [w for w in words if w not in STOP_WORDS and w not in FILLER_WORDS]
+        features = {'words': len(words), 'content_words': len(content)}
+
+        if not content or normalized in STT_FAILURE_TEXTS:
+            return EMPTY, features
+
+        entries = index.entries if index is not None else [concept]
+        vocabulary = {stem(w) for e in entries for w in (e.tokens | e.name_tokens) if w not in STOP_WORDS}
+        features['topic_hits'] = sum(1 for w in content if stem(w) in vocabulary)
+        features['tfidf_cosine'] = 0.0
+        if concept.tfidf_index is not None:
+            features['tfidf_cosine'] = round(cosine(concept.tfidf_index.vectorize(words), concept.tfidf), 4)
+
+        if (len(content) >= self.min_off_topic_words and not features['topic_hits']
+                and features['tfidf_cosine'] < self.max_off_topic_cosine):
+            return OFF_TOPIC, features
+        if len(words) <= self.max_question_words and is_question(raw, words):
+            return QUESTION, features
+        return ATTEMPT, features
+
+    def reply(self, turn_class, concept_name, attempt_count):
+        """The templated reply for this class, or None if the turn should go to the LLM."""
+        template = TEMPLATES.get(turn_class)
+        if template is None or attempt_count >= self.templated_attempts:
+            return None
+        return template.format(concept=concept_name)
+
+    def triage(self, text, concept, attempt_count, index=None):
+        """Classify a turn and count it; returns (class, templated reply or None, features)."""
+        turn_class, features = self.classify(text, concept, index)
+        reply = self.reply(turn_class, concept.name, attempt_count)
+        with self._lock:
+            self.classified[turn_class] += 1
+            if reply is not None:
+                self.llm_avoided[turn_class] += 1
+        return turn_class, reply, features
+
+    def template_texts(self, concept_names):
+        return [template.format(concept=name) for name in concept_names for template in TEMPLATES.values()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'classified': {c: self.classified[c] for c in TRIAGE_CLASSES},
+                'llm_avoided': {c: self.llm_avoided[c] for c in TRIAGE_CLASSES},
+                'llm_avoided_total': sum(self.llm_avoided.values()),
+            }
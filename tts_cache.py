@@ -0,0 +1,232 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+
+
+def normalize_tts_text(text):
+    """Normalize text for cache keying: NFC, no markup, collapsed whitespace."""
+    text = unicodedata.normalize('NFC', text or '')
+    text = re.sub(r"<[^>]+>", " ", text)
+    text = text.replace('\u200b', ' ')
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def tts_cache_key(text, voice='alloy', fmt='mp3', engine='openai'):
+    """Content address for one rendering of (normalized text, voice, format, engine)."""
+    raw = '\x1f'.join([normalize_tts_text(text), (voice or '').lower(), (fmt or '').lower(), engine or ''])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TTSAudioCache:
+    """Two-tier cache of synthesized audio.
+
+    A hot in-memory LRU holds recently used clips; every clip is also written to
+    `directory`, which is kept under `max_disk_bytes` by evicting the least
+    recently used files. Pinned keys (the canned replies) are never evicted.
+
+    The directory is shared by all workers, so the disk index is rebuilt from
+    it (sizes, and file mtimes as recency, which every hit refreshes) at
+    least every `rescan_seconds` before evicting; the budget then holds for
+    the directory as a whole, not per worker.
+    """
+
+    def __init__(self, directory, max_disk_bytes=256 * 1024 * 1024, max_memory_bytes=32 * 1024 * 1024,
+                 rescan_seconds=10):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.rescan_seconds = rescan_seconds
+        self._scanned_at = 0.0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_disk_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.type")
+
+    def _load_disk_index(self):
+        entries = self._scan_disk()
+        with self._lock:
+            self._disk = OrderedDict((key, size) for _, key, size in entries)
+            self._disk_bytes = sum(size for _, _, size in entries)
+            self._scanned_at = time.time()
+
+    def _scan_disk(self):
+        """(mtime, key, size) of every clip in the directory, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        return sorted(entries)
+
+    def get(self, key):
+        """Return (audio_bytes, content_type) or None."""
+        return self.get_any([key])
+
+    def get_any(self, keys):
+        """Return the first cached entry among `keys` (one lookup for the hit-rate stats)."""
+        return self.lookup(keys)[1]
+
+    def lookup(self, keys):
+        """Like get_any, but return (key, entry) so callers know which key hit; (None, None) on a miss."""
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    self._memory.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return key, entry
+
+        for key in keys:
+            entry = self._read_disk(key)
+            if entry is not None:
+                with self._lock:
+                    self._counters['disk_hits'] += 1
+                    self._remember_locked(key, entry)
+                return key, entry
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None, None
+
+    def put(self, key, audio_bytes, content_type, pin=False):
+        if not audio_bytes:
+            return
+        entry = (audio_bytes, content_type)
+        self._write_disk(key, entry)
+        if time.time() - self._scanned_at >= self.rescan_seconds:
+            # Other workers write to the same directory; count their clips too.
+            self._load_disk_index()
+        with self._lock:
+            if pin:
+                self._pinned.add(key)
+            self._counters['stores'] += 1
+            self._remember_locked(key, entry)
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_bytes -= old
+            self._disk[key] = len(audio_bytes)
+            self._disk_bytes += len(audio_bytes)
+            victims = self._evict_disk_locked()
+        self._remove_files(victims)
+
+    def pin(self, key):
+        with self._lock:
+            self._pinned.add(key)
+
+    def is_pinned(self, key):
+        with self._lock:
+            return key in self._pinned
+
+    def _remove_files(self, keys):
+        for key in keys:
+            for path in (self._path(key), self._meta_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _remember_locked(self, key, entry):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old[0])
+        self._memory[key] = entry
+        self._memory_bytes += len(entry[0])
+        for k in list(self._memory):
+            if self._memory_bytes <= self.max_memory_bytes:
+                break
+            if k in self._pinned or k == key:
+                continue
+            evicted = self._memory.pop(k)
+            self._memory_bytes -= len(evicted[0])
+            self._counters['memory_evictions'] += 1
+
+    def _evict_disk_locked(self):
+        victims = []
+        for k in list(self._disk):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if k in self._pinned:
+                continue
+            self._disk_bytes -= self._disk.pop(k)
+            victims.append(k)
+            self._counters['disk_evictions'] += 1
+        return victims
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                audio_bytes = f.read()
+            with open(self._meta_path(key), 'r') as f:
+                content_type = f.read().strip() or 'audio/mpeg'
+        except OSError:
+            # Another worker may have evicted it; forget it here as well.
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            return None
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            else:
+                self._disk[key] = len(audio_bytes)
+                self._disk_bytes += len(audio_bytes)
+        return audio_bytes, content_type
+
+    def _write_disk(self, key, entry):
+        audio_bytes, content_type = entry
+        try:
+            for path, data, mode in ((self._meta_path(key), content_type, 'w'), (self._path(key), audio_bytes, 'wb')):
+                tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp, mode) as f:
+                    f.write(data)
+                os.replace(tmp, path)
+        except OSError as e:
+            print(f"TTS cache write failed for {key}: {e}")
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            hits = out['memory_hits'] + out['disk_hits']
+            lookups = hits + out['misses']
+            out['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+            out['memory_entries'] = len(self._memory)
+            out['memory_bytes'] = self._memory_bytes
+            out['disk_entries'] = len(self._disk)
+            out['disk_bytes'] = self._disk_bytes
+            out['pinned'] = len(self._pinned)
+            return out
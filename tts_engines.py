@@ -0,0 +1,269 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+import requests
+
+from audio_formats import TTS_FORMATS, transcode
+from tts_pipeline import SegmentMetrics, split_sentences, synthesize_pipelined
+
+OPENAI_TTS_URL = os.environ.get('OPENAI_TTS_URL', 'https://api.openai.com/v1/audio/speech')
+TTS_STREAM_CHUNK_BYTES = int(os.environ.get('TTS_STREAM_CHUNK_BYTES', 4096))
+
+
+def synthesize_with_openai(text, voice='alloy', fmt='mp3', stream=None):
+    """Synthesize `text` with OpenAI TTS and return (audio_bytes, content_type).
+
+    `fmt` must be a TTS_FORMATS key the API emits natively (see its 'openai' field).
+    The response body is read in chunks; when `stream` is given (a file-like
+    such as tts_jobs.AudioStream) each chunk is written to it as soon as it
+    arrives, so callers can start sending audio before synthesis finishes.
+    """
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        raise RuntimeError('OpenAI API key not configured')
+    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
+    spec = TTS_FORMATS[fmt]
+    if not spec['openai']:
+        raise ValueError(f"OpenAI TTS cannot emit {fmt} natively")
+    payload = {'model': 'gpt-4o-mini-tts', 'voice': voice, 'input': text, 'response_format': spec['openai']}
+    content_type = spec['content_type']
+
+    out = stream if stream is not None else BytesIO()
+    timeout = float(os.environ.get('OPENAI_TTS_TIMEOUT', 60))
+    with requests.post(OPENAI_TTS_URL, headers=headers, json=payload, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        if stream is not None:
+            stream.content_type = content_type
+        for chunk in resp.iter_content(chunk_size=TTS_STREAM_CHUNK_BYTES):
+            out.write(chunk)
+    return out.getvalue(), content_type
+
+
+def synthesize_with_gtts(text, stream=None):
+    """Synthesize `text` with gTTS and return (audio_bytes, 'audio/mpeg').
+
+    gTTS writes each decoded response part through write_to_fp, so with a
+    `stream` the first part is available before the rest is fetched.
+    """
+    from gtts import gTTS
+
+    out = stream if stream is not None else BytesIO()
+    if stream is not None:
+        stream.content_type = 'audio/mpeg'
+    gTTS(text=text, lang='en').write_to_fp(out)
+    return out.getvalue(), 'audio/mpeg'
+
+
+def synthesize_with_espeak(text, voice=None, stream=None):
+    """Synthesize `text` locally with espeak-ng (no network) and return (wav_bytes, 'audio/wav')."""
+    binary = shutil.which('espeak-ng') or shutil.which('espeak')
+    if not binary:
+        raise RuntimeError('espeak-ng is not installed')
+    voice = voice or os.environ.get('ESPEAK_VOICE', 'en-us')
+    speed = os.environ.get('ESPEAK_SPEED', '165')
+    result = subprocess.run(
+        [binary, '--stdout', '-v', voice, '-s', speed, '--stdin'],
+        input=text.encode('utf-8'), capture_output=True, timeout=60, check=True
+    )
+    if stream is not None:
+        stream.content_type = 'audio/wav'
+        stream.write(result.stdout)
+    return result.stdout, 'audio/wav'
+
+
+class TTSBackend(ABC):
+    """One speech synthesis engine.
+
+    Subclasses set `name`, `native_formats` (TTS_FORMATS keys the engine emits
+    directly, first one preferred) and implement _synthesize(). Formats outside
+    native_formats are produced by transcoding the preferred native output.
+    """
+    name = None
+    native_formats = ('mp3',)
+
+    def available(self):
+        return True
+
+    @abstractmethod
+    def _synthesize(self, text, voice, fmt, stream):
+        """Return (audio_bytes, content_type) in `fmt`, one of native_formats."""
+
+    def synthesize(self, text, voice='alloy', fmt='mp3', stream=None):
+        """Return (audio_bytes, content_type) in `fmt`, writing to `stream` as audio arrives."""
+        if fmt in self.native_formats:
+            return self._synthesize(text, voice, fmt, stream)
+        native = self.native_formats[0]
+        audio_bytes, _ = self._synthesize(text, voice, native, None)
+        audio_bytes = transcode(audio_bytes, native, fmt)
+        content_type = TTS_FORMATS[fmt]['content_type']
+        if stream is not None:
+            stream.content_type = content_type
+            stream.write(audio_bytes)
+        return audio_bytes, content_type
+
+
+class OpenAITTSBackend(TTSBackend):
+    name = 'openai'
+    native_formats = tuple(f for f, spec in TTS_FORMATS.items() if spec['openai'])
+
+    def available(self):
+        return bool(os.environ.get('OPENAI_API_KEY'))
+
+    def _synthesize(self, text, voice, fmt, stream):
+        return synthesize_with_openai(text, voice=voice, fmt=fmt, stream=stream)
+
+
+class GTTSBackend(TTSBackend):
+    """gTTS (remote Google service).
+
+    Long texts are split into chunks of at most `max_chars` that are
+    synthesized concurrently on `pool` (a dedicated bounded pool, not the app
+    executor), each retried with backoff, and reassembled in order.
+    """
+    name = 'gtts'
+    native_formats = ('mp3',)
+
+    def __init__(self, pool, max_chars=500, retries=None, backoff=None):
+        self.pool = pool
+        self.max_chars = max_chars
+        self.retries = int(os.environ.get('GTTS_CHUNK_RETRIES', 2)) if retries is None else retries
+        self.backoff = float(os.environ.get('GTTS_CHUNK_BACKOFF', 0.5)) if backoff is None else backoff
+        self.chunk_metrics = SegmentMetrics()
+
+    def _synthesize(self, text, voice, fmt, stream):
+        if len(split_sentences(text, max_chars=self.max_chars)) > 1:
+            if stream is not None:
+                stream.content_type = 'audio/mpeg'
+            audio_bytes = synthesize_pipelined(
+                text,
+                lambda segment: synthesize_with_gtts(segment)[0],
+                self.pool,
+                out=stream,
+                max_chars=self.max_chars,
+                retries=self.retries,
+                backoff=self.backoff,
+                metrics=self.chunk_metrics
+            )
+            return audio_bytes, 'audio/mpeg'
+        return synthesize_with_gtts(text, stream=stream)
+
+
+class EspeakTTSBackend(TTSBackend):
+    """Local espeak-ng engine: robotic but instant and fully offline."""
+    name = 'espeak'
+    native_formats = ('wav',)
+
+    def available(self):
+        return bool(shutil.which('espeak-ng') or shutil.which('espeak'))
+
+    def _synthesize(self, text, voice, fmt, stream):
+        # OpenAI voice names mean nothing to espeak; it uses ESPEAK_VOICE.
+        return synthesize_with_espeak(text, stream=stream)
+
+
+class TTSEngineRouter:
+    """Choose the order in which TTS backends are tried.
+
+    selection='fixed' uses the configured order as is. selection='latency'
+    keeps the configured (quality) order but moves a backend behind the others
+    while its moving-average latency exceeds `latency_budget` seconds, or for
+    `failure_cooldown` seconds after it fails, so requests stop waiting on a
+    slow or timing-out engine. selection='fastest' orders purely by observed
+    latency.
+    """
+
+    def __init__(self, backends, selection='latency', latency_budget=8.0, failure_cooldown=60, alpha=0.3):
+        self.backends = list(backends)
+        self.selection = selection
+        self.latency_budget = latency_budget
+        self.failure_cooldown = failure_cooldown
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._stats = {b.name: {'ewma_seconds': None, 'successes': 0, 'failures': 0, 'last_failure': None}
+                       for b in self.backends}
+
+    @property
+    def names(self):
+        return [b.name for b in self.backends]
+
+    def preferred(self):
+        """Configured backends up to and including the first available one, by name.
+
+        Audio from these is the best the router can currently produce. Audio
+        from any other backend is a fallback render: callers serve it but
+        shouldn't persist it, so it's replaced once the preferred engine
+        recovers.
+        """
+        names = []
+        for backend in self.backends:
+            names.append(backend.name)
+            if backend.available():
+                break
+        return names
+
+    def cooling(self, name):
+        """True while `name` is in its failure cooldown."""
+        with self._lock:
+            last_failure = self._stats[name]['last_failure']
+        return last_failure is not None and time.time() - last_failure < self.failure_cooldown
+
+    def ordered(self):
+        candidates = [b for b in self.backends if b.available()]
+        if self.selection not in ('latency', 'fastest'):
+            return candidates
+        now = time.time()
+        with self._lock:
+            def score(item):
+                position, backend = item
+                stats = self._stats[backend.name]
+                cooling = stats['last_failure'] is not None and now - stats['last_failure'] < self.failure_cooldown
+                ewma = stats['ewma_seconds'] or 0.0
+                if self.selection == 'fastest':
+                    return (cooling, ewma, position)
+                return (cooling, ewma > self.latency_budget, position)
+            return [b for _, b in sorted(enumerate(candidates), key=score)]
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            stats = self._stats[name]
+            if ok:
+                stats['successes'] += 1
+                prev = stats['ewma_seconds']
+                stats['ewma_seconds'] = seconds if prev is None else self.alpha * seconds + (1 - self.alpha) * prev
+            else:
+                stats['failures'] += 1
+                stats['last_failure'] = time.time()
+
+    def stats(self):
+        with self._lock:
+            out = {name: dict(stats) for name, stats in self._stats.items()}
+        for backend in self.backends:
+            out[backend.name]['available'] = backend.available()
+            if hasattr(backend, 'chunk_metrics'):
+                out[backend.name]['chunks'] = backend.chunk_metrics.stats()
+        out['order'] = [b.name for b in self.ordered()]
+        out['preferred'] = self.preferred()
+        out['selection'] = self.selection
+        return out
+
+
+def build_tts_router(pool, order=None, selection=None):
+    """Router over the backends named in TTS_ENGINE_ORDER (default 'openai,gtts,espeak')."""
+    registry = {
+        'openai': OpenAITTSBackend,
+        'gtts': lambda: GTTSBackend(pool),
+        'espeak': EspeakTTSBackend,
+    }
+    order = order or os.environ.get('TTS_ENGINE_ORDER', 'openai,gtts,espeak')
+    backends = [registry[name.strip()]() for name in order.split(',') if name.strip() in registry]
+    return TTSEngineRouter(
+        backends,
+        selection=selection or os.environ.get('TTS_ENGINE_SELECTION', 'latency'),
+        latency_budget=float(os.environ.get('TTS_ENGINE_LATENCY_BUDGET', 8)),
+        failure_cooldown=float(os.environ.get('TTS_ENGINE_FAILURE_COOLDOWN', 60))
+    )
@@ -0,0 +1,310 @@
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+
+def tts_job_key(text, voice='alloy', fmt='mp3'):
+    """Hash of (text, voice, format) identifying one synthesis."""
+    raw = '\x1f'.join([(text or '').strip(), (voice or '').lower(), (fmt or '').lower()])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AudioStream:
+    """Audio bytes of one synthesis as they arrive from the engine.
+
+    The producing engine writes into it like a file; any number of readers can
+    follow along with iter_chunks() while the synthesis is still running.
+    """
+
+    def __init__(self):
+        self.content_type = None
+        # Backend that produced the audio, set by the synthesis function if it knows.
+        self.engine = None
+        self._chunks = []
+        self._size = 0
+        self._done = False
+        self._error = None
+        self._cond = threading.Condition()
+
+    def write(self, data):
+        if not data:
+            return 0
+        with self._cond:
+            self._chunks.append(bytes(data))
+            self._size += len(data)
+            self._cond.notify_all()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    @property
+    def bytes_written(self):
+        with self._cond:
+            return self._size
+
+    def getvalue(self):
+        with self._cond:
+            return b''.join(self._chunks)
+
+    def finish(self):
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def fail(self, exc):
+        with self._cond:
+            self._error = exc
+            self._done = True
+            self._cond.notify_all()
+
+    def wait_for_data(self, timeout=None):
+        """Block until the first bytes (or the end) arrive; raise if the job failed with no output."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._chunks or self._done, timeout=timeout):
+                raise TimeoutError('No audio received before timeout')
+            if self._error is not None and not self._chunks:
+                raise self._error
+
+    def iter_chunks(self, timeout=None):
+        """Yield chunks from the start of the stream, waiting for new ones until it finishes."""
+        index = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: index < len(self._chunks) or self._done, timeout=timeout):
+                    raise TimeoutError('Audio stream stalled')
+                pending = self._chunks[index:]
+                done, error = self._done, self._error
+            for chunk in pending:
+                yield chunk
+            index += len(pending)
+            if done and index >= len(self._chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class TTSJob(Future):
+    """Future for one synthesis, resolving to (audio_bytes, content_type), with a live AudioStream."""
+
+    def __init__(self):
+        super().__init__()
+        self.stream = AudioStream()
+
+
+class TTSJobRegistry:
+    """Registry of running and recently finished TTS syntheses.
+
+    submit_message starts the reply audio in the background and the browser then
+    POSTs the same text to /synthesize. Both go through this registry, so the
+    second caller attaches to the running job (or gets the finished bytes)
+    instead of paying for another synthesis.
+    """
+
+    def __init__(self, ttl_seconds=600, max_entries=128):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'started': 0,
+            'deduplicated_running': 0,
+            'deduplicated_finished': 0,
+            'failed': 0,
+        }
+
+    def start(self, key, fn, *args, executor=None, **kwargs):
+        """Return (job, started) for `key`, starting `fn` only if no live job exists.
+
+        `fn` is called with `stream=job.stream` and must return
+        (audio_bytes, content_type). With an executor the job runs in the
+        background; otherwise it runs in the calling thread before this returns.
+        """
+        with self._lock:
+            self._evict_locked()
+            entry = self._jobs.get(key)
+            if entry is not None:
+                future = entry['future']
+                if future.done():
+                    self._counters['deduplicated_finished'] += 1
+                else:
+                    self._counters['deduplicated_running'] += 1
+                return future, False
+
+            future = TTSJob()
+            future.set_running_or_notify_cancel()
+            self._jobs[key] = {'future': future, 'created_at': time.time()}
+            self._counters['started'] += 1
+
+        if executor is not None:
+            try:
+                executor.submit(self._run, key, future, fn, args, kwargs)
+            except Exception as e:
+                self._fail(key, future, e)
+        else:
+            self._run(key, future, fn, args, kwargs)
+        return future, True
+
+    def get(self, key):
+        """Return the live future for `key`, or None."""
+        with self._lock:
+            entry = self._jobs.get(key)
+            return entry['future'] if entry else None
+
+    def _run(self, key, future, fn, args, kwargs):
+        try:
+            result = fn(*args, stream=future.stream, **kwargs)
+        except Exception as e:
+            self._fail(key, future, e)
+            return
+        if future.stream.bytes_written == 0:
+            future.stream.content_type = result[1]
+            future.stream.write(result[0])
+        future.stream.finish()
+        future.set_result(result)
+
+    def _fail(self, key, future, exc):
+        # Failed jobs are dropped so that the next request retries the synthesis.
+        with self._lock:
+            entry = self._jobs.get(key)
+            if entry is not None and entry['future'] is future:
+                del self._jobs[key]
+            self._counters['failed'] += 1
+        future.stream.fail(exc)
+        if not future.done():
+            future.set_exception(exc)
+
+    def _evict_locked(self):
+        now = time.time()
+        expired = [k for k, e in self._jobs.items()
+                   if e['future'].done() and now - e['created_at'] > self.ttl_seconds]
+        for k in expired:
+            del self._jobs[k]
+
+        if len(self._jobs) > self.max_entries:
+            finished = sorted((e['created_at'], k) for k, e in self._jobs.items() if e['future'].done())
+            for _, k in finished[:len(self._jobs) - self.max_entries]:
+                del self._jobs[k]
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out['deduplicated'] = out['deduplicated_running'] + out['deduplicated_finished']
+            out['in_flight'] = sum(1 for e in self._jobs.values() if not e['future'].done())
+            out['retained'] = len(self._jobs)
+            return out
+
+
+class SingleFlight:
+    """Coalesce concurrent work on the same key (e.g. an output file path).
+
+    The first caller for a key becomes the leader and does the work; callers
+    arriving while it is in progress wait for the leader's result instead of
+    repeating it. The key is released as soon as the work completes.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._counters = {'led': 0, 'coalesced': 0}
+
+    def begin(self, key):
+        """Return (future, leader). Only the leader must call complete() for the key."""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self._counters['coalesced'] += 1
+                return future, False
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._flights[key] = future
+            self._counters['led'] += 1
+            return future, True
+
+    def complete(self, key, future, fn, *args, **kwargs):
+        """Run fn as the leader for `key` and publish its result (or exception) to all waiters."""
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._release(key, future)
+            future.set_exception(e)
+            return
+        self._release(key, future)
+        future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn for `key` unless it is already running, and return the shared result."""
+        future, leader = self.begin(key)
+        if leader:
+            self.complete(key, future, fn, *args, **kwargs)
+        return future.result()
+
+    def _release(self, key, future):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out['in_flight'] = len(self._flights)
+            return out
+
+
+class JobTracker:
+    """Status of background jobs by id, so clients can poll for completion.
+
+    A job is 'pending' until its future finishes, then 'ready' if it returned a
+    truthy result and 'failed' otherwise. Extra fields (URLs, backup results)
+    can be attached with update().
+    """
+
+    def __init__(self, ttl_seconds=3600):
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def track(self, future, info=None):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            now = time.time()
+            for k in [k for k, e in self._jobs.items() if now - e['created_at'] > self.ttl_seconds]:
+                del self._jobs[k]
+            self._jobs[job_id] = {'future': future, 'info': dict(info or {}), 'created_at': now}
+        return job_id
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is not None:
+                entry['info'].update(fields)
+
+    def status(self, job_id, wait=0):
+        """Return the job's status dict (waiting up to `wait` seconds for it to finish), or None."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is None:
+            return None
+        future = entry['future']
+        if wait and not future.done():
+            try:
+                future.result(timeout=wait)
+            except Exception:
+                pass
+        if not future.done():
+            state = 'pending'
+        elif future.exception() is None and future.result():
+            state = 'ready'
+        else:
+            state = 'failed'
+        with self._lock:
+            out = dict(entry['info'])
+        out.update({'job_id': job_id, 'status': state})
+        return out
+
+    def stats(self):
+        with self._lock:
+            futures = [e['future'] for e in self._jobs.values()]
+        return {'tracked': len(futures), 'pending': sum(1 for f in futures if not f.done())}
@@ -0,0 +1,205 @@
+import random
+import re
+import threading
+import time
+from collections import deque
+from io import BytesIO
+
+# Bitrates (kbps) indexed by [version_is_mpeg1][layer][bitrate_index]; layer 1..3.
+_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_sentences(text, max_chars=500):
+    """Split text into segments on sentence boundaries, each at most `max_chars`.
+
+    Sentences are packed together up to the limit; a single sentence longer
+    than the limit is split between words rather than mid-word.
+    """
+    text = re.sub(r'\s+', ' ', text or '').strip()
+    if not text:
+        return []
+
+    pieces = []
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    segments = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            segments.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _frame_length(header):
+    """Length in bytes of the MPEG audio frame starting with `header`, or 0 if it is not one."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return 0
+    version = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = (header[2] >> 4) & 0x0F
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return 0
+
+    mpeg1 = version == 3
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def mp3_frames(data):
+    """Return only the MPEG audio frames of an MP3 file.
+
+    ID3v2/ID3v1 tags and the Xing/Info/VBRI header frame are dropped, so
+    the output of several files can be concatenated into one valid stream
+    without decoding. If no frames are found the data is returned unchanged.
+    """
+    pos = 0
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = ((data[6] & 0x7F) << 21) | ((data[7] & 0x7F) << 14) | ((data[8] & 0x7F) << 7) | (data[9] & 0x7F)
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    out = BytesIO()
+    first = True
+    found = False
+    while pos + 4 <= len(data):
+        length = _frame_length(data[pos:pos + 4])
+        if not length or pos + length > len(data):
+            if found:
+                break
+            pos += 1
+            continue
+        frame = data[pos:pos + length]
+        if not (first and (b'Xing' in frame[:64] or b'Info' in frame[:64] or b'VBRI' in frame[:64])):
+            out.write(frame)
+        first = False
+        found = True
+        pos += length
+    return out.getvalue() if found else data
+
+
+class SegmentMetrics:
+    """Latency and retry counters for individual synthesized segments (chunks)."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.segments = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+
+    def record(self, seconds, attempts, ok):
+        with self._lock:
+            self.segments += 1
+            self.attempts += attempts
+            self.retries += attempts - 1
+            if ok:
+                self._latencies.append(seconds)
+            else:
+                self.failures += 1
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            out = {
+                'segments': self.segments,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'failures': self.failures,
+            }
+        if latencies:
+            out['latency_ms'] = {
+                'p50': round(latencies[len(latencies) // 2] * 1000, 1),
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                'max': round(latencies[-1] * 1000, 1),
+                'mean': round(sum(latencies) / len(latencies) * 1000, 1),
+                'window': len(latencies),
+            }
+        return out
+
+
+def with_retries(fn, segment, retries=2, backoff=0.5, metrics=None):
+    """Call fn(segment), retrying up to `retries` times with exponential backoff and jitter."""
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = fn(segment)
+        except Exception as e:
+            if attempt > retries:
+                if metrics is not None:
+                    metrics.record(time.perf_counter() - start, attempt, False)
+                raise
+            delay = backoff * (2 ** (attempt - 1)) * (0.5 + random.random())
+            print(f"Segment synthesis failed (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+            time.sleep(delay)
+            continue
+        if metrics is not None:
+            metrics.record(time.perf_counter() - start, attempt, True)
+        return result
+
+
+def synthesize_pipelined(text, synthesize_segment, pool, out=None, max_chars=500,
+                         retries=0, backoff=0.5, metrics=None):
+    """Synthesize `text` segment by segment on `pool` and join the MP3 frames in order.
+
+    All segments are submitted at once; as each one finishes (in order) its
+    frames are written to `out`, so a listener can start on the first sentence
+    while later ones are still being synthesized. A failing segment is retried
+    `retries` times before the whole synthesis fails. Returns the joined bytes.
+    """
+    segments = split_sentences(text, max_chars=max_chars)
+    if not segments:
+        raise ValueError('No text to synthesize')
+
+    futures = [
+        pool.submit(with_retries, synthesize_segment, segment, retries, backoff, metrics)
+        for segment in segments
+    ]
+    joined = BytesIO()
+    try:
+        for future in futures:
+            frames = mp3_frames(future.result())
+            joined.write(frames)
+            if out is not None:
+                out.write(frames)
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+    return joined.getvalue()
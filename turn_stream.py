@@ -0,0 +1,145 @@
+import json
+import re
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+_SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s')
+
+
+def sse_event(event, data):
+    """One server-sent event frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SentenceChunker:
+    """Cut streamed LLM text into complete sentences as the tokens arrive.
+
+    feed() returns the sentences completed by a token (a sentence is complete
+    once its terminator is followed by whitespace); flush() returns whatever
+    is left when the stream ends.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._consumed = 0
+
+    def feed(self, token):
+        self.text += token
+        sentences = []
+        while True:
+            match = _SENTENCE_BOUNDARY.search(self.text, self._consumed)
+            if not match:
+                return sentences
+            sentence = self.text[self._consumed:match.end()].strip()
+            self._consumed = match.end()
+            if sentence:
+                sentences.append(sentence)
+
+    def flush(self):
+        rest = self.text[self._consumed:].strip()
+        self._consumed = len(self.text)
+        return [rest] if rest else []
+
+
+class PendingTurnUpdates:
+    """Session changes of streamed turns, held until they can be written to the session.
+
+    A streamed response sends its session cookie with the headers, before the
+    AI reply exists, so each turn's conversation history and move-on state
+    are parked as a row of `model` (database.PendingTurnUpdate) under its
+    turn_id. The rows live in the app database, so any worker (or the same
+    one after a restart) can apply them: the client's commit call applies
+    its own turn, and the participant's next turn applies whatever is left.
+    If the database write fails, the update is kept in this process instead
+    (`local`), so the turn is still applied by a commit call or next turn
+    that reaches the same worker. Must be used inside an app context.
+    """
+
+    def __init__(self, db, model, ttl_seconds=6 * 3600):
+        self.db = db
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._local = {}
+        self.added = 0
+        self.applied = 0
+        self.expired = 0
+        self.errors = 0
+        self.local = 0
+
+    def _count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def add(self, owner, update):
+        """Store `update` for participant `owner` and return its turn_id."""
+        turn_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.ttl_seconds)
+        with self._lock:
+            for key in [k for k, e in self._local.items() if e['created_at'] < cutoff]:
+                del self._local[key]
+                self.expired += 1
+        try:
+            expired = self.model.query.filter(self.model.created_at < cutoff).delete(synchronize_session=False)
+            self.db.session.add(self.model(turn_id=turn_id, participant_id=owner, session_update=update,
+                                           created_at=now))
+            self.db.session.commit()
+        except Exception as e:
+            print(f"Failed to store streamed turn update, keeping it in this worker: {e}")
+            self.db.session.rollback()
+            with self._lock:
+                self._local[turn_id] = {'owner': owner, 'update': update, 'created_at': now}
+                self.errors += 1
+                self.local += 1
+            return turn_id
+        self._count('added')
+        if expired:
+            self._count('expired', expired)
+        return turn_id
+
+    def pop(self, owner, turn_id=None):
+        """Remove and return `owner`'s pending updates (only `turn_id`'s if given), oldest first.
+
+        Each row is claimed with its own DELETE, so when two workers race for
+        the same turn only one of them applies it.
+        """
+        with self._lock:
+            keys = [k for k, e in self._local.items() if e['owner'] == owner and turn_id in (None, k)]
+            entries = [self._local.pop(k) for k in keys]
+        found = [(e['created_at'], e['update']) for e in entries]
+        try:
+            query = self.model.query.filter_by(participant_id=owner)
+            if turn_id is not None:
+                query = query.filter_by(turn_id=turn_id)
+            rows = [(row.turn_id, row.created_at, row.session_update) for row in query.order_by(self.model.id).all()]
+            for row_turn_id, created_at, update in rows:
+                claimed = self.model.query.filter_by(turn_id=row_turn_id).delete(synchronize_session=False)
+                self.db.session.commit()
+                if claimed:
+                    found.append((created_at, update))
+        except Exception as e:
+            print(f"Failed to load streamed turn updates: {e}")
+            self.db.session.rollback()
+            self._count('errors')
+        found.sort(key=lambda item: item[0] or datetime.min)
+        self._count('applied', len(found))
+        return [update for _, update in found]
+
+    def stats(self):
+        try:
+            pending = self.model.query.count()
+        except Exception:
+            self.db.session.rollback()
+            pending = None
+        with self._lock:
+            return {
+                'pending': pending,
+                'added': self.added,
+                'applied': self.applied,
+                'expired': self.expired,
+                'errors': self.errors,
+                'local': self.local,
+                'local_pending': len(self._local),
+            }
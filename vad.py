@@ -0,0 +1,121 @@
+import threading
+
+import numpy as np
+
+
+def frame_energy_db(samples, frame_len):
+    """RMS energy of each full frame of int16 `samples`, in dBFS."""
+    count = len(samples) // frame_len
+    frames = samples[:count * frame_len].reshape(count, frame_len).astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def speech_mask(energy_db, margin_db=12.0, floor_db=-55.0, headroom_db=25.0):
+    """Frames that are louder than the recording's noise floor by `margin_db`.
+
+    The noise floor is the 10th percentile of frame energy. The threshold is
+    capped at the loudest frame minus `headroom_db`, so clips that are almost
+    all speech keep their quieter words, but never drops below `floor_db`, so
+    a recording of only room noise has no speech at all.
+    """
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(min(noise_floor + margin_db, energy_db.max() - headroom_db), floor_db)
+    return energy_db > threshold
+
+
+def _dilate(mask, frames):
+    """Extend every speech frame by `frames` on both sides (onset/hangover padding)."""
+    if frames <= 0 or not mask.any():
+        return mask
+    kernel = np.ones(2 * frames + 1, dtype=np.int32)
+    return np.convolve(mask.astype(np.int32), kernel, mode='same') > 0
+
+
+def trim_silence(samples, sample_rate=16000, frame_ms=30, pad_ms=250, max_pause_ms=0,
+                 margin_db=12.0, floor_db=-55.0):
+    """Drop leading/trailing silence from int16 `samples`; optionally shorten long pauses.
+
+    Speech frames are padded by `pad_ms` so word onsets and tails survive. With
+    `max_pause_ms` > 0, internal silences longer than that are cut down to it.
+    Returns (samples, info). If no speech is found the input is returned as is.
+    """
+    samples = np.asarray(samples, dtype=np.int16)
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    original_seconds = len(samples) / sample_rate
+    info = {
+        'original_seconds': round(original_seconds, 3),
+        'speech_seconds': round(original_seconds, 3),
+        'trimmed_seconds': 0.0,
+        'leading_seconds': 0.0,
+        'trailing_seconds': 0.0,
+        'squashed_seconds': 0.0,
+        'speech_detected': False,
+    }
+    energy = frame_energy_db(samples, frame_len)
+    voiced = speech_mask(energy, margin_db=margin_db, floor_db=floor_db)
+    if not voiced.any():
+        return samples, info
+
+    keep = _dilate(voiced, int(pad_ms / frame_ms))
+    speech = np.flatnonzero(keep)
+    first, last = speech[0], speech[-1]
+    keep[first:last + 1] = True
+
+    squashed_frames = 0
+    max_pause = int(max_pause_ms / frame_ms)
+    if max_pause > 0:
+        silent = ~_dilate(voiced, int(pad_ms / frame_ms))[first:last + 1]
+        edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+        for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            if end - start > max_pause:
+                keep[first + start + max_pause // 2:first + end - (max_pause - max_pause // 2)] = False
+                squashed_frames += end - start - max_pause
+
+    # The partial frame at the end follows the last full frame.
+    sample_keep = np.repeat(keep, frame_len)
+    sample_keep = np.concatenate((sample_keep, np.full(len(samples) - len(sample_keep), keep[-1])))
+    out = samples[sample_keep]
+
+    frame_seconds = frame_len / sample_rate
+    info.update({
+        'speech_seconds': round(len(out) / sample_rate, 3),
+        'trimmed_seconds': round(original_seconds - len(out) / sample_rate, 3),
+        'leading_seconds': round(float(first * frame_seconds), 3),
+        'trailing_seconds': round(float(max(0.0, original_seconds - (last + 1) * frame_seconds)), 3),
+        'squashed_seconds': round(float(squashed_frames * frame_seconds), 3),
+        'speech_detected': True,
+    })
+    return out, info
+
+
+class VADStats:
+    """Totals of audio seen and trimmed before transcription."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recordings = 0
+        self.no_speech = 0
+        self.original_seconds = 0.0
+        self.speech_seconds = 0.0
+
+    def record(self, info):
+        with self._lock:
+            self.recordings += 1
+            self.no_speech += int(not info['speech_detected'])
+            self.original_seconds += info['original_seconds']
+            self.speech_seconds += info['speech_seconds']
+
+    def stats(self):
+        with self._lock:
+            trimmed = self.original_seconds - self.speech_seconds
+            return {
+                'recordings': self.recordings,
+                'no_speech': self.no_speech,
+                'original_seconds': round(self.original_seconds, 1),
+                'speech_seconds': round(self.speech_seconds, 1),
+                'trimmed_seconds': round(trimmed, 1),
+                'trimmed_fraction': round(trimmed / self.original_seconds, 4) if self.original_seconds else 0.0,
+            }
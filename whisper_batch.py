@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from stt_segments import plan_segments
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+class WhisperBatchWorker:
+    """Single inference thread that micro-batches concurrent local transcriptions.
+
+    submit() queues a clip (16 kHz float32 samples) and returns a Future for
+    its text. The worker takes the first waiting clip, gathers more for up to
+    `max_wait` seconds or until `max_batch_size` clips, cuts every clip at
+    pauses into chunks of at most `chunk_seconds` (Whisper's 30 s window) and
+    decodes the chunks `max_batch_size` at a time with `decode_batch`, so the
+    mel spectrograms, the encoder and the decoder each run once per batch
+    instead of once per request. Texts are stitched back per clip in order.
+    """
+
+    def __init__(self, decode_batch, max_batch_size=8, max_wait=0.05, chunk_seconds=30.0):
+        self.decode_batch = decode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.chunk_seconds = chunk_seconds
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'batches': 0, 'chunks': 0, 'failures': 0,
+                          'queue_wait_seconds': 0.0, 'decode_seconds': 0.0}
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='whisper-batch', daemon=True)
+                self._thread.start()
+
+    def submit(self, samples):
+        future = Future()
+        self._queue.put((np.asarray(samples, dtype=np.float32), future, time.perf_counter()))
+        self._ensure_thread()
+        return future
+
+    def transcribe(self, samples, timeout=None):
+        return self.submit(samples).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception as e:
+                print(f"Whisper batch worker error: {e}")
+                self._count('failures')
+                # Fail whatever _process didn't get to, so callers don't sit out their timeout.
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        chunks, owners, requests = [], [], []
+        for samples, future, queued_at in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            index = len(requests)
+            requests.append(future)
+            self._count('queue_wait_seconds', started - queued_at)
+            pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+            max_seconds = self.chunk_seconds
+            for start, end in plan_segments(pcm, WHISPER_SAMPLE_RATE, max_seconds=max_seconds,
+                                            min_seconds=max_seconds / 3):
+                chunks.append(samples[start:end])
+                owners.append(index)
+        if not requests:
+            return
+
+        texts = []
+        try:
+            for i in range(0, len(chunks), self.max_batch_size):
+                texts.extend(self.decode_batch(chunks[i:i + self.max_batch_size]))
+                self._count('batches')
+        except Exception as e:
+            self._count('failures')
+            for future in requests:
+                future.set_exception(e)
+            return
+        self._count('decode_seconds', time.perf_counter() - started)
+        self._count('requests', len(requests))
+        self._count('chunks', len(chunks))
+
+        parts = [[] for _ in requests]
+        for owner, text in zip(owners, texts):
+            if text:
+                parts[owner].append(text)
+        for future, pieces in zip(requests, parts):
+            future.set_result(' '.join(pieces))
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+        wait_total = out.pop('queue_wait_seconds')
+        decode_total = out.pop('decode_seconds')
+        out['queue_depth'] = self._queue.qsize()
+        out['max_batch_size'] = self.max_batch_size
+        out['max_wait_ms'] = round(self.max_wait * 1000, 1)
+        out['avg_chunks_per_batch'] = round(out['chunks'] / out['batches'], 2) if out['batches'] else None
+        out['avg_queue_wait_ms'] = round(wait_total / out['requests'] * 1000, 1) if out['requests'] else None
+        out['decode_seconds_total'] = round(decode_total, 2)
+        return out